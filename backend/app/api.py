@@ -6,10 +6,26 @@ from app.model import (
     SummarizeFileRequest,
 )
 from app.tooling import don_tools
-from lib.constants import DEFAULT_MATCH_THRESHOLD
-from lib.supabase.util import get_supabase_client
+from lib.constants import DEFAULT_MATCH_THRESHOLD, SUMMARY_DIRECT_MAX_CHARS, PRESUMMARIZE_ENABLED
+from lib.database import get_database_client
 from lib.util.db_process import push_to_db
+from lib.util.folder_extraction import hash_file
 from app.tooling.generation import generate_text_stream
+from app.tooling.summarization import (
+    build_summary_prompt,
+    content_hash,
+    extract_file_content,
+    summarize_long_content,
+)
+from app.tooling.summary_cache import (
+    SYNTHESIS,
+    get_summary,
+    metadata_summary,
+    put_summary,
+    synthesis_key,
+    track_file_hash,
+)
+from app.tooling.presummarization import enqueue_files, interactive_generation
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
@@ -56,6 +72,9 @@ async def post_directory_path(payload: StoreAssetRequest) -> dict:
 
     for folder_path in folder_paths:
         result = push_to_db(folder_path)
+        if PRESUMMARIZE_ENABLED:
+            # Summarize the new files in the background while the app is idle
+            enqueue_files(result["processed_files"])
         results.append({
             "folderPath": folder_path,
             "status": result["status"],
@@ -92,7 +111,7 @@ async def query_files(
     """
     print(f"Query received: {query_text}")
     match_threshold = threshold
-    client = get_supabase_client()
+    client = get_database_client()
 
     # Parse archived folders JSON array if provided
     archived_folder_list = []
@@ -216,7 +235,7 @@ async def delete_folder(payload: DeleteFolderRequest) -> dict:
     folder_path = payload.folderPath
     print(f"Deleting all files from folder: {folder_path}")
 
-    client = get_supabase_client()
+    client = get_database_client()
     deleted_count = client.delete_files_by_folder(folder_path)
 
     print(f"Deleted {deleted_count} files from {folder_path}")
@@ -297,7 +316,7 @@ async def get_folders_with_files() -> dict:
     Returns:
         dict: Contains a list of folder groups, each with folder name, path, and files
     """
-    client = get_supabase_client()
+    client = get_database_client()
     files = client.get_all_files()
 
     # Group files by their parent directory path
@@ -508,7 +527,7 @@ async def run_agent(payload: AgentRequest):
         print(f"Detected summarize intent for topic: {topic}")
 
         # Search for relevant documents
-        client = get_supabase_client()
+        client = get_database_client()
         results = client.query_files(
             query=topic,
             match_threshold=DEFAULT_MATCH_THRESHOLD,
@@ -532,14 +551,20 @@ async def run_agent(payload: AgentRequest):
 
         # Build context from search results
         documents = []
+        chunk_ids = []
         for result in results:
             file_name = result.get("file_name", "Unknown")
             content = result.get("content", "")
             if content:
                 documents.append((file_name, content))
+                chunk_ids.append(result["chunk_id"])
 
         print(f"Found {len(documents)} relevant document chunks")
 
+        # The same topic over the same chunks was synthesized before: replay it
+        summary_key = synthesis_key(topic, chunk_ids)
+        cached_summary = get_summary(summary_key, SYNTHESIS)
+
         # Create synthesis prompt
         combined_text = "\n\n".join([f"Document: {name}\nContent: {content}" for name, content in documents])
         synthesis_prompt = (
@@ -551,11 +576,18 @@ async def run_agent(payload: AgentRequest):
 
         def stream_synthesis():
             # First send metadata about the search
-            yield f"data: {json.dumps({'metadata': {'topic': topic, 'documentsFound': len(documents)}})}\n\n"
+            yield f"data: {json.dumps({'metadata': {'topic': topic, 'documentsFound': len(documents), 'cached': cached_summary is not None}})}\n\n"
 
-            # Stream the generated content
-            for chunk in generate_text_stream(synthesis_prompt):
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
+            if cached_summary is not None:
+                yield f"data: {json.dumps({'content': cached_summary})}\n\n"
+            else:
+                # Stream the generated content
+                parts = []
+                with interactive_generation():
+                    for chunk in generate_text_stream(synthesis_prompt):
+                        parts.append(chunk)
+                        yield f"data: {json.dumps({'content': chunk})}\n\n"
+                put_summary(summary_key, "".join(parts), SYNTHESIS)
 
             yield f"data: {json.dumps({'done': True})}\n\n"
 
@@ -576,57 +608,14 @@ async def run_agent(payload: AgentRequest):
     }
 
 
-def get_file_type(file_name: str) -> str:
-    """Determine file type from extension."""
-    ext = file_name.lower().split('.')[-1] if '.' in file_name else ''
-
-    if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'bmp', 'tiff', 'heic']:
-        return 'image'
-    elif ext == 'pdf':
-        return 'pdf'
-    elif ext in ['mp3', 'wav', 'ogg', 'm4a', 'aac', 'flac', 'wma', 'aiff']:
-        return 'audio'
-    else:
-        return 'text'
-
-
-def extract_file_content(file_path: str, file_name: str) -> tuple[str, str]:
-    """
-    Extract content from a file based on its type.
-
-    Returns:
-        Tuple of (content, content_type_description)
-    """
-    file_type = get_file_type(file_name)
-
-    if file_type == 'pdf':
-        from lib.util.preprocessing.pdf import _extract_full_text
-        full_text, _ = _extract_full_text(file_path)
-        return full_text, "PDF document"
-
-    elif file_type == 'image':
-        from lib.util.preprocessing.image import generateImageCaption
-        caption = generateImageCaption(file_path)
-        return caption, "image (AI-generated caption)"
-
-    elif file_type == 'audio':
-        from lib.util.preprocessing.audio import _get_audio_transcript
-        transcription = _get_audio_transcript(file_path)
-        full_text = transcription.get('text', '')
-        return full_text, "audio transcription"
-
-    else:
-        # Text file - read directly
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        return content, "text file"
-
-
 @app.post("/summarize-file/", tags=["agent"])
 async def summarize_file(payload: SummarizeFileRequest):
     """Summarize a single file's content with streaming response.
 
     Supports text files, PDFs, images (via caption), and audio (via transcription).
+    Content longer than SUMMARY_DIRECT_MAX_CHARS is summarized map-reduce:
+    'partial' events carry each section summary as it finishes, then the
+    combined summary streams as 'content' events.
 
     Args:
         payload: Request containing file name and either content or file path
@@ -638,13 +627,17 @@ async def summarize_file(payload: SummarizeFileRequest):
     file_path = payload.filePath
     content = payload.content
     content_type_desc = "text file"
+    file_hash = None
 
     print(f"Summarizing file: {file_name}")
 
     # If we have a file path, extract content based on file type
     if file_path and not content:
         try:
-            content, content_type_desc = extract_file_content(file_path, file_name)
+            file_hash = hash_file(file_path)
+            track_file_hash(file_path, file_hash)
+            content, content_type_desc = extract_file_content(
+                file_path, file_name, file_hash)
         except Exception as e:
             print(f"Error extracting content from {file_path}: {e}")
             def error_stream():
@@ -671,45 +664,46 @@ async def summarize_file(payload: SummarizeFileRequest):
         )
 
     # Create summarization prompt based on content type
-    file_type = get_file_type(file_name)
-
-    if file_type == 'image':
-        summary_prompt = (
-            f"Based on the following AI-generated caption of an image, provide a brief description "
-            f"and any insights about what the image might contain.\n\n"
-            f"Image file: {file_name}\n"
-            f"Caption: {content}\n\n"
-            f"Description:"
-        )
-    elif file_type == 'audio':
-        summary_prompt = (
-            f"Please provide a clear and concise summary of the following audio transcription.\n\n"
-            f"Audio file: {file_name}\n\n"
-            f"Transcription:\n{content}\n\n"
-            f"Summary:"
-        )
-    elif file_type == 'pdf':
-        summary_prompt = (
-            f"Please provide a clear and concise summary of the following PDF document.\n\n"
-            f"Document: {file_name}\n\n"
-            f"Content:\n{content}\n\n"
-            f"Summary:"
-        )
-    else:
-        summary_prompt = (
-            f"Please provide a clear and concise summary of the following file.\n\n"
-            f"File: {file_name}\n\n"
-            f"Content:\n{content}\n\n"
-            f"Summary:"
-        )
+    summary_prompt = build_summary_prompt(file_name, content)
+
+    # Summaries are stored per file hash (content hash for inline content)
+    summary_key = file_hash or content_hash(content)
+    cached_summary = get_summary(summary_key)
+    if cached_summary is None and file_hash:
+        # Generated by background pre-summarization after indexing
+        file = get_database_client().get_file(file_hash=file_hash)
+        cached_summary = metadata_summary(file["metadata"] if file else None)
 
     def stream_summary():
         # Send metadata
-        yield f"data: {json.dumps({'metadata': {'fileName': file_name, 'fileType': content_type_desc}})}\n\n"
+        yield f"data: {json.dumps({'metadata': {'fileName': file_name, 'fileType': content_type_desc, 'cached': cached_summary is not None}})}\n\n"
+
+        if cached_summary is not None:
+            yield f"data: {json.dumps({'content': cached_summary})}\n\n"
+            yield f"data: {json.dumps({'done': True})}\n\n"
+            return
+
+        parts = []
+        with interactive_generation():
+            if len(content) > SUMMARY_DIRECT_MAX_CHARS:
+                # Too long for one prompt: summarize sections, then combine them
+                for event in summarize_long_content(
+                    content,
+                    file_name=file_name,
+                    description=content_type_desc,
+                    cache_key=summary_key,
+                ):
+                    if "content" in event:
+                        parts.append(event["content"])
+                    yield f"data: {json.dumps(event)}\n\n"
+            else:
+                # Stream the generated summary
+                for chunk in generate_text_stream(summary_prompt):
+                    parts.append(chunk)
+                    yield f"data: {json.dumps({'content': chunk})}\n\n"
 
-        # Stream the generated summary
-        for chunk in generate_text_stream(summary_prompt):
-            yield f"data: {json.dumps({'content': chunk})}\n\n"
+        # Only a summary that finished streaming is stored
+        put_summary(summary_key, "".join(parts))
 
         yield f"data: {json.dumps({'done': True})}\n\n"
 
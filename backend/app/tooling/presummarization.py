@@ -0,0 +1,140 @@
+# Background pre-summarization of newly indexed files.
+#
+# After /dir/ indexes a folder, each new file is queued here and a single daemon thread
+# summarizes it with generate_text. The summary is stored in files.metadata and in the
+# summary cache, so a later /summarize-file/ on the same file replays it instead of
+# waiting for Ollama.
+#
+# The worker yields to interactive requests: a job only starts once no interactive
+# generation has run for PRESUMMARIZE_IDLE_SEC. Long files are summarized one section
+# at a time and the job is put back in the queue as soon as an interactive request
+# arrives; finished sections are cached, so it resumes where it stopped.
+
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+from app.tooling.generation import generate_text
+from app.tooling.summarization import build_summary_prompt, extract_file_content, summarize_long_content
+from app.tooling.summary_cache import get_summary, put_summary, metadata_summary, summary_metadata
+from lib.constants import PRESUMMARIZE_IDLE_SEC, PRESUMMARIZE_PAUSE_SEC, SUMMARY_DIRECT_MAX_CHARS
+from lib.database import get_database_client
+
+_queue: queue.Queue[dict] = queue.Queue()
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+
+_state_lock = threading.Lock()
+_interactive_count = 0
+_last_interactive = 0.0
+
+
+@contextmanager
+def interactive_generation():
+    """Mark an interactive generation as running, so background summaries hold off."""
+    global _interactive_count, _last_interactive
+    with _state_lock:
+        _interactive_count += 1
+    try:
+        yield
+    finally:
+        with _state_lock:
+            _interactive_count -= 1
+            _last_interactive = time.monotonic()
+
+
+def _interactive_busy() -> bool:
+    with _state_lock:
+        return _interactive_count > 0
+
+
+def _wait_until_idle() -> None:
+    """Block until no interactive generation has run for PRESUMMARIZE_IDLE_SEC."""
+    while True:
+        with _state_lock:
+            busy = _interactive_count > 0
+            idle_for = time.monotonic() - _last_interactive
+        if not busy and idle_for >= PRESUMMARIZE_IDLE_SEC:
+            return
+        time.sleep(max(PRESUMMARIZE_IDLE_SEC - idle_for, PRESUMMARIZE_PAUSE_SEC))
+
+
+def _summarize(job: dict) -> bool:
+    """
+    Summarize one indexed file and store the result.
+
+    Returns:
+        False if the job was interrupted by an interactive request and should be retried
+    """
+    file_hash = job["file_hash"]
+    client = get_database_client()
+
+    file = client.get_file(file_id=job["file_id"])
+    if file is None or metadata_summary(file.get("metadata")) is not None:
+        return True  # deleted since indexing, or already summarized
+
+    summary = get_summary(file_hash)
+    if summary is None:
+        content, description = extract_file_content(
+            job["file_path"], job["file_name"], file_hash)
+        if not content or not content.strip():
+            return True
+
+        if len(content) <= SUMMARY_DIRECT_MAX_CHARS:
+            summary = generate_text(build_summary_prompt(job["file_name"], content))
+        else:
+            events = summarize_long_content(
+                content,
+                file_name=job["file_name"],
+                description=description,
+                cache_key=file_hash,
+                max_parallel=1,
+            )
+            parts = []
+            for event in events:
+                if "partial" in event and _interactive_busy():
+                    events.close()
+                    return False
+                if "content" in event:
+                    parts.append(event["content"])
+            summary = "".join(parts)
+
+        summary = summary.strip()
+        put_summary(file_hash, summary)
+
+    if summary:
+        client.update_file_metadata(job["file_id"], summary_metadata(summary))
+    return True
+
+
+def _run() -> None:
+    while True:
+        job = _queue.get()
+        _wait_until_idle()
+        try:
+            if _summarize(job):
+                print(f"✓ Pre-summarized {job['file_path']}")
+            else:
+                _queue.put(job)
+        except Exception as e:
+            print(f"✗ Failed to pre-summarize {job['file_path']}: {e}")
+        time.sleep(PRESUMMARIZE_PAUSE_SEC)
+
+
+def enqueue_files(files: list[dict]) -> None:
+    """
+    Queue indexed files for background summarization.
+
+    Args:
+        files: Dicts with file_id, file_path, file_name and file_hash,
+            as in push_to_db's "processed_files"
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(
+                target=_run, name="presummarization", daemon=True)
+            _worker.start()
+    for file in files:
+        _queue.put(file)
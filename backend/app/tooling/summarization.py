@@ -0,0 +1,254 @@
+# Summarization of single files for /summarize-file/ and background pre-summarization.
+#
+# Files too long for one prompt are summarized map-reduce: the content is split into
+# sections on sentence boundaries, sections are summarized concurrently (at most
+# SUMMARY_MAX_PARALLEL requests against Ollama at once), and the section summaries are
+# reduced into one summary, in several rounds if they are still too long for a single
+# prompt. Section summaries are cached per file hash.
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Generator
+
+from app.tooling.generation import generate_text, generate_text_stream
+from app.tooling.summary_cache import SECTION_SUMMARIES, cache_kind
+from lib.constants import (
+    ARTIFACT_CACHE_ENABLED,
+    SUMMARY_DIRECT_MAX_CHARS,
+    SUMMARY_SECTION_CHARS,
+    SUMMARY_MAX_PARALLEL,
+)
+from lib.util.artifact_cache import get_artifact_cache
+from lib.util.preprocessing.sentence_segmentation import get_segmenter
+
+SECTION_PROMPT = (
+    "Summarize section {index} of {total} of the {description} \"{file_name}\". "
+    "Keep the key facts, names, numbers and definitions.\n\n"
+    "Section:\n{section}\n\n"
+    "Section summary:"
+)
+
+REDUCE_PROMPT = (
+    "The following are summaries of consecutive sections of the {description} \"{file_name}\". "
+    "Combine them into one clear and concise summary.\n\n"
+    "{summaries}\n\n"
+    "Summary:"
+)
+
+
+def get_file_type(file_name: str) -> str:
+    """Determine file type from extension."""
+    ext = file_name.lower().split('.')[-1] if '.' in file_name else ''
+
+    if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'bmp', 'tiff', 'heic']:
+        return 'image'
+    elif ext == 'pdf':
+        return 'pdf'
+    elif ext in ['mp3', 'wav', 'ogg', 'm4a', 'aac', 'flac', 'wma', 'aiff']:
+        return 'audio'
+    else:
+        return 'text'
+
+
+def extract_file_content(file_path: str, file_name: str, file_hash: str | None = None) -> tuple[str, str]:
+    """
+    Extract content from a file based on its type.
+
+    PDF text, captions and transcripts come from the artifact cache when
+    ingestion (or an earlier summary) already extracted the same file.
+
+    Returns:
+        Tuple of (content, content_type_description)
+    """
+    file_type = get_file_type(file_name)
+
+    if file_type == 'pdf':
+        from lib.util.preprocessing.pdf import extract_pdf_full_text
+        full_text, _ = extract_pdf_full_text(file_path, file_hash)
+        return full_text, "PDF document"
+
+    elif file_type == 'image':
+        from lib.util.preprocessing.image import generateImageCaption
+        caption = generateImageCaption(file_path, file_hash)
+        return caption, "image (AI-generated caption)"
+
+    elif file_type == 'audio':
+        from lib.util.preprocessing.audio import _get_audio_transcript
+        transcription = _get_audio_transcript(file_path, file_hash)
+        full_text = transcription.get('text', '')
+        return full_text, "audio transcription"
+
+    else:
+        # Text file - read directly
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        return content, "text file"
+
+
+def build_summary_prompt(file_name: str, content: str) -> str:
+    """Single-prompt summary request for a file's extracted content."""
+    file_type = get_file_type(file_name)
+
+    if file_type == 'image':
+        return (
+            f"Based on the following AI-generated caption of an image, provide a brief description "
+            f"and any insights about what the image might contain.\n\n"
+            f"Image file: {file_name}\n"
+            f"Caption: {content}\n\n"
+            f"Description:"
+        )
+    elif file_type == 'audio':
+        return (
+            f"Please provide a clear and concise summary of the following audio transcription.\n\n"
+            f"Audio file: {file_name}\n\n"
+            f"Transcription:\n{content}\n\n"
+            f"Summary:"
+        )
+    elif file_type == 'pdf':
+        return (
+            f"Please provide a clear and concise summary of the following PDF document.\n\n"
+            f"Document: {file_name}\n\n"
+            f"Content:\n{content}\n\n"
+            f"Summary:"
+        )
+    else:
+        return (
+            f"Please provide a clear and concise summary of the following file.\n\n"
+            f"File: {file_name}\n\n"
+            f"Content:\n{content}\n\n"
+            f"Summary:"
+        )
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of text, for content that did not come from a file on disk."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def split_sections(content: str, section_chars: int = SUMMARY_SECTION_CHARS) -> list[str]:
+    """
+    Split content into sections of at most section_chars, on sentence boundaries.
+
+    A single sentence longer than section_chars is cut into pieces.
+    """
+    sections = []
+    start = end = None
+    for sentence_start, sentence_end in get_segmenter("regex").span_tokenize(content):
+        if start is None:
+            start = sentence_start
+        elif sentence_end - start > section_chars:
+            sections.append(content[start:end])
+            start = sentence_start
+        end = sentence_end
+        while end - start > section_chars:
+            sections.append(content[start:start + section_chars])
+            start += section_chars
+    if start is not None and start < end:
+        sections.append(content[start:end])
+    return sections
+
+
+def _reduce_prompt(summaries: list[str], file_name: str, description: str) -> str:
+    return REDUCE_PROMPT.format(
+        description=description,
+        file_name=file_name,
+        summaries="\n\n".join(summaries),
+    )
+
+
+def _group_summaries(summaries: list[str], max_chars: int) -> list[list[str]]:
+    """Pack consecutive summaries into groups that fit one reduce prompt (at least two per group)."""
+    groups = []
+    current = []
+    size = 0
+    for summary in summaries:
+        if len(current) >= 2 and size + len(summary) > max_chars:
+            groups.append(current)
+            current = []
+            size = 0
+        current.append(summary)
+        size += len(summary)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def summarize_long_content(
+    content: str,
+    file_name: str,
+    description: str,
+    cache_key: str | None = None,
+    section_chars: int = SUMMARY_SECTION_CHARS,
+    max_parallel: int = SUMMARY_MAX_PARALLEL,
+) -> Generator[dict, None, None]:
+    """
+    Summarize long content with map-reduce, streaming progress.
+
+    Args:
+        content: Extracted text of the file
+        file_name: Name shown to the model
+        description: Kind of content, e.g. "PDF document"
+        cache_key: File hash the section summaries are cached under (default: hash of content)
+        section_chars: Characters per section in the map step
+        max_parallel: Concurrent generation requests
+
+    Yields:
+        SSE payloads: one {'partial': {...}} per section summary as it finishes
+        (cached ones first), then {'content': ...} pieces of the final summary
+    """
+    sections = split_sections(content, section_chars)
+    total = len(sections)
+
+    cache = get_artifact_cache() if ARTIFACT_CACHE_ENABLED else None
+    cache_key = cache_key or content_hash(content)
+    kind = cache_kind(SECTION_SUMMARIES, section_chars)
+    cached = (cache.get_json(cache_key, kind) if cache is not None else None) or {}
+    summaries: list[str | None] = [cached.get(str(i)) for i in range(total)]
+
+    for i, summary in enumerate(summaries):
+        if summary is not None:
+            yield {"partial": {"section": i + 1, "total": total, "content": summary, "cached": True}}
+
+    # Map: summarize the remaining sections concurrently
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    if missing:
+        executor = ThreadPoolExecutor(max_workers=max_parallel)
+        try:
+            futures = {
+                executor.submit(generate_text, SECTION_PROMPT.format(
+                    index=i + 1,
+                    total=total,
+                    description=description,
+                    file_name=file_name,
+                    section=sections[i],
+                )): i
+                for i in missing
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                summaries[i] = future.result().strip()
+                if cache is not None:
+                    # Written as sections finish, so an interrupted summary resumes
+                    cache.put_json(cache_key, kind, {
+                        str(j): summary for j, summary in enumerate(summaries) if summary is not None
+                    })
+                yield {"partial": {"section": i + 1, "total": total, "content": summaries[i], "cached": False}}
+        finally:
+            # A client that disconnects mid-stream should not keep Ollama busy
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # Reduce: combine groups of summaries until they fit one prompt
+    while len(summaries) > 1 and sum(len(s) for s in summaries) > SUMMARY_DIRECT_MAX_CHARS:
+        groups = _group_summaries(summaries, SUMMARY_DIRECT_MAX_CHARS)
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            summaries = [
+                summary.strip()
+                for summary in executor.map(
+                    generate_text,
+                    [_reduce_prompt(group, file_name, description)
+                     for group in groups],
+                )
+            ]
+
+    for chunk in generate_text_stream(_reduce_prompt(summaries, file_name, description)):
+        yield {"content": chunk}
@@ -0,0 +1,86 @@
+# Persistent store of generated summaries, so unchanged files are not summarized twice.
+# Entries live in the artifact cache and are keyed by what the summary was generated
+# from: the file hash for /summarize-file/, or the topic and sorted chunk IDs for /agent/
+# syntheses. The artifact name carries MODEL_NAME and SUMMARY_PROMPT_VERSION, so a new
+# model or prompt template never serves an old summary.
+
+import re
+import hashlib
+
+from app.tooling.generation import MODEL_NAME
+from lib.constants import ARTIFACT_CACHE_ENABLED, SUMMARY_PROMPT_VERSION
+from lib.util.artifact_cache import get_artifact_cache
+
+# Artifact name prefixes of everything generated from one file's content
+FILE_SUMMARY = "summary"
+SECTION_SUMMARIES = "section_summaries"
+SYNTHESIS = "synthesis"
+
+# Remembers the last hash seen for a path, to drop summaries of replaced versions
+_PATH_POINTER = "summary_path"
+
+
+def cache_kind(name: str, *params) -> str:
+    """Artifact name for a generated artifact under the current model and prompt version."""
+    model = re.sub(r"[^A-Za-z0-9_.-]", "_", MODEL_NAME)
+    return ".".join([name, model, f"v{SUMMARY_PROMPT_VERSION}", *map(str, params)])
+
+
+def synthesis_key(topic: str, chunk_ids: list[str]) -> str:
+    """Key of a topic synthesis: the topic and the set of chunks it was generated from."""
+    return hashlib.sha256("\n".join([topic, *sorted(chunk_ids)]).encode("utf-8")).hexdigest()
+
+
+def get_summary(key: str, name: str = FILE_SUMMARY) -> str | None:
+    """Get a stored summary, or None if it was never generated (or was evicted)."""
+    if not ARTIFACT_CACHE_ENABLED:
+        return None
+    entry = get_artifact_cache().get_json(key, cache_kind(name))
+    return entry["summary"] if entry else None
+
+
+def put_summary(key: str, summary: str, name: str = FILE_SUMMARY) -> None:
+    """Store a fully generated summary."""
+    if ARTIFACT_CACHE_ENABLED and summary.strip():
+        get_artifact_cache().put_json(
+            key, cache_kind(name), {"summary": summary})
+
+
+def track_file_hash(file_path: str, file_hash: str) -> None:
+    """
+    Record the current hash of a file, deleting summaries of its previous contents.
+
+    Summaries are keyed by hash, so an edited file never hits a stale entry;
+    this only stops the old entries from taking up space until eviction.
+    """
+    if not ARTIFACT_CACHE_ENABLED:
+        return
+    cache = get_artifact_cache()
+    path_key = hashlib.sha256(file_path.encode("utf-8")).hexdigest()
+    pointer = cache.get_json(path_key, _PATH_POINTER)
+    if pointer and pointer["file_hash"] != file_hash:
+        cache.delete(pointer["file_hash"], FILE_SUMMARY)
+        cache.delete(pointer["file_hash"], SECTION_SUMMARIES)
+    if not pointer or pointer["file_hash"] != file_hash:
+        cache.put_json(path_key, _PATH_POINTER, {"file_hash": file_hash})
+
+
+def summary_metadata(summary: str) -> dict:
+    """files.metadata keys recording a summary and what generated it."""
+    return {
+        "summary": summary,
+        "summary_model": MODEL_NAME,
+        "summary_prompt_version": SUMMARY_PROMPT_VERSION,
+    }
+
+
+def metadata_summary(metadata: dict | None) -> str | None:
+    """Summary stored in files.metadata, or None if absent or from another model or prompt version."""
+    metadata = metadata or {}
+    if (
+        metadata.get("summary")
+        and metadata.get("summary_model") == MODEL_NAME
+        and metadata.get("summary_prompt_version") == SUMMARY_PROMPT_VERSION
+    ):
+        return metadata["summary"]
+    return None
@@ -1,3 +1,8 @@
+from pathlib import Path
+
+# Local, machine-specific state (caches, fitted projections); not committed
+LOCAL_DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
 AUDIO_TARGET_DURATION_SEC = 60  # 60 second chunks
 AUDIO_OVERLAP_DURATION_SEC = 15  # 15 second overlap
 
@@ -24,3 +29,125 @@ SUPPORTED_MIME_TYPES = {
     'image/png',       # .png
     'image/webp',      # .webp
 }
+
+# Embedding storage profile for chunks:
+#   "full"    - chunks.embedding vector(768), the original schema
+#   "halfvec" - chunks.embedding_half halfvec(768), half the index size
+#   "pca"     - chunks.embedding_pca halfvec(EMBEDDING_PCA_DIMENSION), PCA fitted on the corpus
+# chunks.embedding is always written so profiles can be re-projected later; only the
+# active profile's column is written and indexed. Switch profiles by running
+# `python -m lib.scripts.migrate_embedding_storage --profile <profile>` before changing
+# this value: it fills the column and swaps the ANN index (a compact profile drops the
+# full-precision one).
+EMBEDDING_STORAGE_PROFILE = "full"
+EMBEDDING_PCA_DIMENSION = 256  # must match chunks.embedding_pca in the migration
+EMBEDDING_PCA_PATH = LOCAL_DATA_DIR / "embedding_pca.npz"
+
+# Vector search access path:
+#   "ann"           - ivfflat search on the storage profile's column
+#   "binary_rerank" - Hamming scan over sign-bit codes of chunks.embedding, then
+#                     exact cosine rerank of match_count * BINARY_CANDIDATE_MULTIPLIER candidates
+VECTOR_SEARCH_MODE = "ann"
+BINARY_CANDIDATE_MULTIPLIER = 4
+
+# Multi-process embedding pool, used only by large ingestion jobs
+EMBEDDING_POOL_MIN_FILES = 50  # jobs with fewer files embed in-process
+EMBEDDING_POOL_MIN_TEXTS = 64  # smaller batches are not worth the IPC
+EMBEDDING_POOL_THREADS_PER_WORKER = 4  # torch intra-op threads per worker process
+EMBEDDING_POOL_IDLE_TIMEOUT_SEC = 120  # workers exit after this long without work
+
+# Local write-through cache of chunk embeddings keyed by (model, content hash)
+EMBEDDING_STORE_ENABLED = True
+EMBEDDING_STORE_DIR = LOCAL_DATA_DIR / "embedding_store"
+
+# Sentence segmenter used by the semantic chunker: "punkt" or "regex" (faster)
+SENTENCE_SEGMENTER = "punkt"
+
+# Where chunk text is stored:
+#   "inline"    - every chunk row carries its own text, overlap included
+#   "reference" - the file's text is stored once, compressed, in file_contents and
+#                 chunks keep only char_start/char_end offsets into it
+CHUNK_CONTENT_STORAGE = "inline"
+
+# PDF text extraction: PDFs with at least this many pages are split across processes
+PDF_PARALLEL_MIN_PAGES = 64
+PDF_EXTRACT_MAX_WORKERS = 8
+
+# Disk cache of extraction artifacts (PDF text, captions, transcripts) keyed by file hash
+ARTIFACT_CACHE_ENABLED = True
+ARTIFACT_CACHE_DIR = LOCAL_DATA_DIR / "artifact_cache"
+ARTIFACT_CACHE_MAX_BYTES = 2 * 1024 ** 3  # least recently used artifacts are evicted past this
+
+# Map-reduce summarization of long files (/summarize-file/)
+SUMMARY_DIRECT_MAX_CHARS = 12_000  # content up to this size is summarized in one prompt
+SUMMARY_SECTION_CHARS = 6_000  # content per section summary in the map step
+SUMMARY_MAX_PARALLEL = 2  # concurrent requests against Ollama
+SUMMARY_PROMPT_VERSION = 1  # bump when summary prompts change, so cached summaries are regenerated
+
+# Background pre-summarization of newly indexed files (stored in files.metadata)
+PRESUMMARIZE_ENABLED = False
+PRESUMMARIZE_IDLE_SEC = 15  # start only after this long without an interactive generation
+PRESUMMARIZE_PAUSE_SEC = 2  # pause between background summaries
+
+# Image captioning (BLIP stays loaded; ingestion captions new images in batches)
+IMAGE_CAPTION_MODEL = "Salesforce/blip-image-captioning-base"  # around 1 GB download size
+IMAGE_CAPTION_MAX_NEW_TOKENS = 30  # more tokens, longer caption
+IMAGE_CAPTION_BATCH_SIZE = 8
+IMAGE_DECODE_WORKERS = 4  # threads decoding and resizing images ahead of the model
+# Captioner precision:
+#   "auto" - fp16 on CUDA; on CPU bf16 where the CPU supports it natively, else fp32
+#   "fp32", "bf16", "fp16" (CUDA only)
+#   "int8" - dynamic int8 quantization of the Linear layers (CPU only)
+IMAGE_CAPTION_PRECISION = "auto"
+IMAGE_CAPTION_THREADS = None  # torch intra-op threads when the captioner loads (None: torch default)
+
+# Near-duplicate images (by perceptual hash) reuse the caption and embedding of the original
+IMAGE_DEDUP_ENABLED = True
+IMAGE_DEDUP_MAX_DISTANCE = 6  # differing bits out of 64
+IMAGE_DEDUP_MIN_STDDEV = 8  # grey levels (0-255) in the hash thumbnail; flatter images are never deduplicated
+
+# Audio transcription (Whisper stays loaded; long recordings are split across processes)
+# Whisper model size: a fixed size, or None to opt into picking by recording length with
+# WHISPER_MODEL_POLICY ((max seconds, size) in order; longer recordings get WHISPER_MODEL_LONG)
+WHISPER_MODEL = "base"
+WHISPER_MODEL_POLICY = ((300, "small"), (3600, "base"))
+WHISPER_MODEL_LONG = "tiny"
+# Whisper precision:
+#   "auto" - fp16 on CUDA, fp32 on CPU
+#   "fp32", "fp16" (CUDA only)
+#   "int8" - dynamic int8 quantization of the Linear layers (CPU only)
+WHISPER_PRECISION = "auto"
+WHISPER_THREADS = None  # torch intra-op threads for in-process transcription (None: torch default)
+AUDIO_PARALLEL_MIN_SEC = 600  # recordings at least this long are transcribed in windows
+AUDIO_WINDOW_SEC = 300  # audio per window handed to a worker
+AUDIO_WINDOW_OVERLAP_SEC = 10  # shared between neighbouring windows, so no word is cut
+AUDIO_TRANSCRIBE_MAX_WORKERS = 4
+
+# Energy-based voice activity detection: silence is cut out before transcription
+AUDIO_VAD_ENABLED = True
+AUDIO_VAD_FRAME_SEC = 0.03
+AUDIO_VAD_SILENCE_DB = -60  # frames quieter than this (dBFS) are always silence
+AUDIO_VAD_MIN_RANGE_DB = 15  # below this loudness range there is no clear silence to cut
+AUDIO_VAD_MIN_SILENCE_SEC = 1.0  # shorter pauses are kept
+AUDIO_VAD_PAD_SEC = 0.3  # audio kept around each speech region
+
+# Decoded audio (16 kHz mono PCM) cached per file hash, so ffmpeg runs once per recording
+AUDIO_PCM_CACHE_ENABLED = True
+AUDIO_PCM_CACHE_DIR = LOCAL_DATA_DIR / "audio_pcm_cache"
+AUDIO_PCM_CACHE_MAX_BYTES = 4 * 1024 ** 3  # about 18 hours of float32 audio
+AUDIO_PCM_CACHE_DTYPE = "float32"  # read zero-copy; "int16" halves disk use but converts on read
+
+# Vector search backend behind query_files:
+#   "supabase" - pgvector through the query_file_chunks* database functions
+#   "local"    - in-process index under LOCAL_VECTOR_STORE_DIR (exact scan, IVF when large)
+VECTOR_STORE = "supabase"
+LOCAL_VECTOR_STORE_DIR = LOCAL_DATA_DIR / "vector_index"
+LOCAL_VECTOR_IVF_MIN_ROWS = 20_000  # smaller indexes are scanned exactly
+LOCAL_VECTOR_IVF_NPROBE = 8  # IVF lists searched per query
+
+# Where files, chunks and stored file contents live (see lib/database.py):
+#   "supabase" - Postgres through PostgREST
+#   "sqlite"   - embedded database at SQLITE_DB_PATH, always searched through the
+#                local vector index regardless of VECTOR_STORE
+METADATA_STORE = "supabase"
+SQLITE_DB_PATH = LOCAL_DATA_DIR / "file_finder.db"
@@ -0,0 +1,18 @@
+# Selects the database client named by METADATA_STORE. Both clients have the same
+# methods; the backends are imported lazily so a SQLite deployment never needs the
+# Supabase packages or credentials.
+
+from lib.constants import METADATA_STORE
+
+METADATA_STORES = ("supabase", "sqlite")
+
+
+def get_database_client(backend: str = METADATA_STORE):
+    """Get the singleton client of the configured database backend."""
+    if backend == "sqlite":
+        from lib.sqlite.util import get_sqlite_client
+        return get_sqlite_client()
+    if backend == "supabase":
+        from lib.supabase.util import get_supabase_client
+        return get_supabase_client()
+    raise ValueError(f"Unknown metadata store '{backend}', expected one of {METADATA_STORES}")
@@ -0,0 +1,145 @@
+"""
+Benchmark BLIP captioning precisions on the bundled images.
+
+Each precision is loaded once and warmed up on the first image. Then every
+image is captioned one at a time (latency) and all images are captioned in
+batches (throughput). Captions are compared with the fp32 captions: exact
+match rate and mean word overlap (Jaccard).
+
+Decoding is timed separately: full-size decode as before vs open_image's
+reduced-size decode, each followed by the processor's resize.
+
+Usage:
+    python -m lib.scripts.bench_image_captioning [FILES...] [--precisions fp32 bf16 int8]
+        [--threads N] [--batch-size N]
+"""
+
+from lib.util.preprocessing.image import (
+    CAPTION_PRECISIONS,
+    caption_images,
+    open_image,
+    resolve_caption_config,
+    _caption_image,
+    _get_captioner,
+)
+import sys
+import time
+import argparse
+import statistics
+import torch
+from PIL import Image
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEFAULT_FILES = sorted(
+    str(p) for p in (Path(__file__).parent.parent.parent / "test_files" / "image").iterdir()
+    if p.suffix.lower() in {".jpg", ".jpeg", ".png"})
+
+
+def word_overlap(a: str, b: str) -> float:
+    words_a, words_b = set(a.lower().split()), set(b.lower().split())
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def time_decode(files: list[str]) -> None:
+    """Per-image decode + resize time, full-size decode vs open_image."""
+    processor, _ = _get_captioner("fp32")
+    size = processor.image_processor.size
+    size = (size["width"], size["height"])
+
+    print(f"{'image':<24} {'pixels':>11} {'full ms':>8} {'reduced ms':>11}")
+    print("-" * 57)
+    for path in files:
+        start = time.perf_counter()
+        image = Image.open(path).convert("RGB")
+        processor(images=image, return_tensors="pt")
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        processor(images=open_image(path, size), return_tensors="pt")
+        reduced_time = time.perf_counter() - start
+        print(f"{Path(path).name:<24} {image.width * image.height:>11,} "
+              f"{full_time * 1000:>8.0f} {reduced_time * 1000:>11.0f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark BLIP captioning precisions")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES,
+                        help="Images to caption (default: test_files/image)")
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "bf16", "int8"],
+                        choices=CAPTION_PRECISIONS,
+                        help="Precisions to compare, the first one is the reference")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch intra-op threads (default: torch default)")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Images per generate call for the throughput run")
+
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    print(f"{len(args.files)} images, {torch.get_num_threads()} torch threads\n")
+    time_decode(args.files)
+
+    results = {}
+    for precision in args.precisions:
+        try:
+            device, resolved = resolve_caption_config(precision)
+        except ValueError as e:
+            print(f"Skipping {precision}: {e}")
+            continue
+
+        start = time.perf_counter()
+        _get_captioner(precision)
+        load_time = time.perf_counter() - start
+        _caption_image(args.files[0], precision)  # warm-up
+
+        latencies = []
+        captions = []
+        for path in args.files:
+            start = time.perf_counter()
+            captions.append(_caption_image(path, precision))
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        caption_images(args.files, batch_size=args.batch_size, precision=precision)
+        batch_time = time.perf_counter() - start
+
+        results[precision] = {
+            "label": f"{resolved}/{device}",
+            "load": load_time,
+            "median": statistics.median(latencies),
+            "max": max(latencies),
+            "throughput": len(args.files) / batch_time,
+            "captions": captions,
+        }
+
+    if not results:
+        sys.exit("No precision could run on this machine")
+
+    reference = results[next(iter(results))]["captions"]
+    print(f"\n{'precision':<12} {'load s':>7} {'median ms':>10} {'max ms':>8} "
+          f"{'images/s':>9} {'exact':>6} {'overlap':>8}")
+    print("-" * 66)
+    for result in results.values():
+        exact = sum(a == b for a, b in zip(result["captions"], reference)) / len(reference)
+        overlap = statistics.mean(
+            word_overlap(a, b) for a, b in zip(result["captions"], reference))
+        print(f"{result['label']:<12} {result['load']:>7.1f} {result['median'] * 1000:>10.0f} "
+              f"{result['max'] * 1000:>8.0f} {result['throughput']:>9.2f} "
+              f"{exact:>6.0%} {overlap:>8.2f}")
+
+    print("\nCaptions:")
+    for i, path in enumerate(args.files):
+        print(f"  {Path(path).name}")
+        for result in results.values():
+            print(f"    {result['label']:<12} {result['captions'][i]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark page-parallel PDF text extraction against the serial path.
+
+Each PDF is extracted once serially in this process and then through the
+process pool at each worker count. Throughput is reported in pages/s, and
+the parallel output must be byte-identical to the serial output. Worker
+start-up is excluded by a warm-up run per worker count.
+
+Usage:
+    python -m lib.scripts.bench_pdf_extraction [FILES...] [--workers 2 4 8] [--repeat N]
+"""
+
+from lib.util.preprocessing.pdf_pages import extract_pages, get_page_count, shutdown_pool
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEFAULT_FILES = sorted(
+    str(p) for p in (Path(__file__).parent.parent.parent / "test_files" / "pdf").glob("*.pdf"))
+
+
+def serialize(pages: list[tuple[int, str]]) -> bytes:
+    """Extraction output as bytes, for the identity check."""
+    return b"".join(f"{page_num}\x00".encode() + text.encode("utf-8") + b"\x00"
+                    for page_num, text in pages)
+
+
+def best_time(fn, repeat: int) -> tuple[float, list[tuple[int, str]]]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark page-parallel PDF extraction")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES,
+                        help="PDFs to extract (default: test_files/pdf)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({2, 4, os.cpu_count() or 1} - {1}),
+                        help="Worker counts to compare against serial")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per configuration, best time is reported")
+
+    args = parser.parse_args()
+
+    page_counts = {path: get_page_count(path) for path in args.files}
+    total_pages = sum(page_counts.values())
+    print(f"{len(args.files)} PDFs, {total_pages} pages\n")
+
+    def run(num_workers: int) -> list[list[tuple[int, str]]]:
+        # min_parallel_pages=1 so every PDF goes through the pool
+        return [extract_pages(path, num_workers=num_workers, min_parallel_pages=1)
+                for path in args.files]
+
+    serial_time, serial = best_time(lambda: run(1), args.repeat)
+    serial_bytes = [serialize(pages) for pages in serial]
+
+    print(f"{'workers':>7} {'seconds':>8} {'pages/s':>9} {'speedup':>8} {'identical':>9}")
+    print("-" * 46)
+    print(f"{'serial':>7} {serial_time:>8.3f} {total_pages / serial_time:>9.1f} "
+          f"{1.0:>7.1f}x {'-':>9}")
+
+    all_identical = True
+    for num_workers in args.workers:
+        run(num_workers)  # start the workers outside the timed runs
+        elapsed, result = best_time(lambda: run(num_workers), args.repeat)
+        identical = [serialize(pages) for pages in result] == serial_bytes
+        all_identical &= identical
+        print(f"{num_workers:>7} {elapsed:>8.3f} {total_pages / elapsed:>9.1f} "
+              f"{serial_time / elapsed:>7.1f}x {str(identical):>9}")
+        shutdown_pool()
+
+    if not all_identical:
+        sys.exit("Parallel extraction output differs from the serial path")
+
+
+if __name__ == "__main__":
+    main()
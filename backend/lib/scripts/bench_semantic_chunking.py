@@ -0,0 +1,131 @@
+"""
+Benchmark the semantic chunker's split loop against the original implementation.
+
+Sentences of each text fixture are split and embedded once, then both the
+original list-based loop (np.mean over the chunk for every sentence) and
+the running-sum _ChunkBoundaries are timed on the same embeddings. The
+chunk output of both must be identical.
+
+Usage:
+    python -m lib.scripts.bench_semantic_chunking [FILES...] [--repeat N]
+"""
+
+from lib.util.preprocessing.semantic_chunking import _ChunkBoundaries, read_txt_file
+from lib.util.preprocessing.sentence_segmentation import get_segmenter
+from sentence_transformers import SentenceTransformer
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEFAULT_FILES = sorted(
+    str(p) for p in (Path(__file__).parent.parent.parent / "test_files" / "text").glob("*.txt"))
+
+PARAMS = {
+    "similarity_threshold": 0.7,
+    "min_sentences_per_chunk": 4,
+    "max_sentences_per_chunk": 20,
+    "overlap_sentences": 2,
+    "shift_patience": 2,
+}
+
+
+def reference_chunks(sentences: list[str], embeddings: np.ndarray) -> list[str]:
+    """The chunking loop as it was before the running-sum rewrite."""
+    chunks = []
+    current_chunk = [sentences[0]]
+    current_embeddings = [embeddings[0]]
+    shift_count = 0
+    overlap = PARAMS["overlap_sentences"]
+
+    for i in range(1, len(sentences)):
+        centroid = np.mean(current_embeddings, axis=0)
+        similarity = float(np.dot(centroid, embeddings[i]))
+
+        if (
+            similarity < PARAMS["similarity_threshold"]
+            and len(current_chunk) >= PARAMS["min_sentences_per_chunk"]
+        ):
+            shift_count += 1
+        else:
+            shift_count = 0
+
+        if (
+            shift_count >= PARAMS["shift_patience"]
+            or len(current_chunk) >= PARAMS["max_sentences_per_chunk"]
+        ):
+            chunks.append(" ".join(current_chunk))
+            current_chunk = current_chunk[-overlap:] if overlap > 0 else []
+            current_embeddings = current_embeddings[-overlap:] if overlap > 0 else []
+            shift_count = 0
+
+        current_chunk.append(sentences[i])
+        current_embeddings.append(embeddings[i])
+
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def running_sum_chunks(sentences: list[str], embeddings: np.ndarray) -> list[str]:
+    boundaries = _ChunkBoundaries(**PARAMS)
+    ranges = boundaries.feed(embeddings)
+    last = boundaries.flush()
+    if last:
+        ranges.append(last)
+    chunks = [" ".join(sentences[start:end]) for start, end in ranges]
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def best_time(fn, repeat: int) -> tuple[float, list[str]]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the semantic chunker split loop")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES,
+                        help="Text files to chunk (default: test_files/text)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per implementation, best time is reported")
+
+    args = parser.parse_args()
+
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+
+    print(f"{'file':<24} {'sentences':>9} {'chunks':>7} {'original ms':>12} "
+          f"{'running ms':>11} {'speedup':>8} {'identical':>9}")
+    print("-" * 86)
+    all_identical = True
+    for path in args.files:
+        sentences = get_segmenter("punkt").tokenize(read_txt_file(path))
+        if not sentences:
+            continue
+        embeddings = model.encode(
+            sentences, normalize_embeddings=True, batch_size=32, show_progress_bar=False)
+
+        old_time, old_chunks = best_time(
+            lambda: reference_chunks(sentences, embeddings), args.repeat)
+        new_time, new_chunks = best_time(
+            lambda: running_sum_chunks(sentences, embeddings), args.repeat)
+
+        identical = old_chunks == new_chunks
+        all_identical &= identical
+        print(f"{Path(path).name:<24} {len(sentences):>9} {len(new_chunks):>7} "
+              f"{old_time * 1000:>12.2f} {new_time * 1000:>11.2f} "
+              f"{old_time / new_time:>7.1f}x {str(identical):>9}")
+
+    if not all_identical:
+        sys.exit("Chunk output differs from the original implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark sentence segmenters and report how closely they agree.
+
+Every segmenter runs on the bundled text fixtures and the extracted text of
+the bundled PDFs. Throughput is reported in MB/s and sentences found; the
+agreement of each segmenter with the reference (punkt) is reported as
+precision/recall/F1 over sentence end offsets.
+
+Usage:
+    python -m lib.scripts.bench_sentence_segmentation [--reference punkt] [--no-pdf] [--repeat N]
+"""
+
+from lib.util.preprocessing.sentence_segmentation import SEGMENTERS, get_segmenter
+from lib.util.preprocessing.pdf import _extract_full_text
+from lib.util.preprocessing.semantic_chunking import read_txt_file
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+TEST_FILES_DIR = Path(__file__).parent.parent.parent / "test_files"
+
+
+def load_corpus(include_pdf: bool) -> list[tuple[str, str]]:
+    """(name, text) for every bundled text fixture and, optionally, PDF."""
+    corpus = [(p.name, read_txt_file(str(p)))
+              for p in sorted((TEST_FILES_DIR / "text").glob("*.txt"))]
+    if include_pdf:
+        for p in sorted((TEST_FILES_DIR / "pdf").glob("*.pdf")):
+            text, _ = _extract_full_text(p)
+            if text.strip():
+                corpus.append((p.name, text))
+    return corpus
+
+
+def agreement(reference: list[tuple[int, int]], candidate: list[tuple[int, int]]) -> tuple[float, float, float]:
+    """Precision, recall and F1 of candidate sentence ends against reference ends."""
+    reference_ends = {end for _, end in reference}
+    candidate_ends = {end for _, end in candidate}
+    matched = len(reference_ends & candidate_ends)
+    precision = matched / len(candidate_ends) if candidate_ends else 1.0
+    recall = matched / len(reference_ends) if reference_ends else 1.0
+    f1 = 2 * precision * recall / \
+        (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark sentence segmenters")
+    parser.add_argument("--reference", choices=SEGMENTERS, default="punkt",
+                        help="Segmenter the others are compared against")
+    parser.add_argument("--no-pdf", action="store_true",
+                        help="Skip the bundled PDFs")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per segmenter, best time is reported")
+
+    args = parser.parse_args()
+
+    corpus = load_corpus(include_pdf=not args.no_pdf)
+    total_mb = sum(len(text.encode("utf-8")) for _, text in corpus) / 1e6
+    print(f"Corpus: {len(corpus)} documents, {total_mb:.2f} MB\n")
+
+    spans = {}
+    print(f"{'segmenter':<10} {'sentences':>10} {'seconds':>8} {'MB/s':>8}")
+    print("-" * 40)
+    for name in SEGMENTERS:
+        segmenter = get_segmenter(name)  # model load is not timed
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = [segmenter.span_tokenize(text) for _, text in corpus]
+            best = min(best, time.perf_counter() - start)
+        spans[name] = result
+        count = sum(len(doc) for doc in result)
+        print(f"{name:<10} {count:>10} {best:>8.3f} {total_mb / best:>8.2f}")
+
+    print(f"\nAgreement with {args.reference} (sentence end offsets):")
+    print(f"{'segmenter':<10} {'document':<40} {'prec':>6} {'recall':>6} {'f1':>6}")
+    print("-" * 72)
+    for name in SEGMENTERS:
+        if name == args.reference:
+            continue
+        scores = []
+        for (doc_name, _), reference, candidate in zip(corpus, spans[args.reference], spans[name]):
+            scores.append(agreement(reference, candidate))
+            precision, recall, f1 = scores[-1]
+            print(f"{name:<10} {doc_name[:40]:<40} {precision:>6.3f} {recall:>6.3f} {f1:>6.3f}")
+        mean = [sum(values) / len(values) for values in zip(*scores)]
+        print(f"{name:<10} {'(mean)':<40} {mean[0]:>6.3f} {mean[1]:>6.3f} {mean[2]:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Micro-benchmarks for text sanitation and offset-to-page lookup on the bundled PDFs.
+
+    sanitize  - the original per-character generator vs sanitize_text (str.translate)
+    page map  - the original linear scan over page boundaries vs PageIndex (bisect)
+
+Raw page text of every bundled PDF is concatenated and repeated until the
+corpus has at least --pages pages, so the page lookup is measured at the
+scale of a long textbook. Both pairs of implementations must agree.
+
+Usage:
+    python -m lib.scripts.bench_text_normalization [--pages 1000] [--chunk-chars 1500] [--repeat N]
+"""
+
+from lib.util.preprocessing.text_normalization import sanitize_text
+from lib.util.preprocessing.pdf import PageIndex
+import sys
+import time
+import argparse
+import fitz  # PyMuPDF
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+PDF_DIR = Path(__file__).parent.parent.parent / "test_files" / "pdf"
+
+
+def reference_sanitize(text: str) -> str:
+    """_sanitize_text as it was before the translate table."""
+    text = text.replace('\x00', '')
+    text = ''.join(char for char in text if char == '\n' or char ==
+                   '\t' or char == '\r' or not (0 <= ord(char) < 32))
+    return text
+
+
+def reference_page_for_position(position: int, page_boundaries: list[tuple[int, int]]) -> int:
+    """_find_page_for_position as it was before PageIndex."""
+    page_num = 1
+    for boundary_page, boundary_offset in page_boundaries:
+        if position >= boundary_offset:
+            page_num = boundary_page
+        else:
+            break
+    return page_num
+
+
+def load_pages(min_pages: int) -> list[str]:
+    """Raw (unsanitized) page text of the bundled PDFs, repeated up to min_pages."""
+    pages = []
+    for path in sorted(PDF_DIR.glob("*.pdf")):
+        with fitz.open(str(path)) as doc:
+            pages.extend(page.get_text() for page in doc)
+    if not pages:
+        sys.exit(f"No PDFs found in {PDF_DIR}")
+    repeats = -(-min_pages // len(pages))
+    return pages * repeats
+
+
+def best_time(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark text sanitation and page lookup")
+    parser.add_argument("--pages", type=int, default=1000,
+                        help="Minimum number of pages in the corpus")
+    parser.add_argument("--chunk-chars", type=int, default=1500,
+                        help="Spacing of looked-up offsets (about one chunk)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per implementation, best time is reported")
+
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    total_mb = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    print(f"Corpus: {len(pages)} pages, {total_mb:.2f} MB\n")
+
+    print(f"{'benchmark':<10} {'original ms':>12} {'new ms':>9} {'speedup':>8} {'identical':>9}")
+    print("-" * 52)
+
+    old_time, old_pages = best_time(
+        lambda: [reference_sanitize(page) for page in pages], args.repeat)
+    new_time, new_pages = best_time(
+        lambda: [sanitize_text(page) for page in pages], args.repeat)
+    sanitize_identical = old_pages == new_pages
+    print(f"{'sanitize':<10} {old_time * 1000:>12.2f} {new_time * 1000:>9.2f} "
+          f"{old_time / new_time:>7.1f}x {str(sanitize_identical):>9}")
+
+    page_boundaries = []
+    offset = 0
+    for page_num, page in enumerate(new_pages, start=1):
+        page_boundaries.append((page_num, offset))
+        offset += len(page) + 1
+    # Chunk start and end offsets, as the PDF chunker looks them up
+    positions = list(range(0, offset, args.chunk_chars))
+
+    old_time, old_result = best_time(
+        lambda: [reference_page_for_position(p, page_boundaries) for p in positions], args.repeat)
+    index = PageIndex(page_boundaries)
+    new_time, new_result = best_time(
+        lambda: [index.page_at(p) for p in positions], args.repeat)
+    lookup_identical = old_result == new_result
+    print(f"{'page map':<10} {old_time * 1000:>12.2f} {new_time * 1000:>9.2f} "
+          f"{old_time / new_time:>7.1f}x {str(lookup_identical):>9}")
+    print(f"\n({len(positions)} offset lookups over {len(page_boundaries)} pages)")
+
+    if not (sanitize_identical and lookup_identical):
+        sys.exit("New implementation output differs from the original")
+
+
+if __name__ == "__main__":
+    main()
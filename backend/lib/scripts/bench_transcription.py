@@ -0,0 +1,118 @@
+"""
+Benchmark Whisper model sizes and precisions on recordings.
+
+Each configuration (MODEL:PRECISION) is loaded and warmed up on the first
+30 seconds, then transcribes every file in this process. Reported per
+configuration: load time, number of int8-quantized Linear layers (0 means
+the model runs in float), real-time factor (transcription time / audio
+duration, lower is faster) and word error rate against the first
+configuration, which serves as the reference transcript.
+
+Usage:
+    python -m lib.scripts.bench_transcription FILES...
+        [--configs base:fp32 base:int8 tiny:fp32 tiny:int8] [--threads N]
+"""
+
+from lib.util.preprocessing.audio_transcription import (
+    SAMPLE_RATE,
+    get_whisper_model,
+    resolve_whisper_config,
+    transcribe,
+)
+import re
+import sys
+import time
+import argparse
+import torch
+import whisper
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def normalize_words(text: str) -> list[str]:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance divided by the reference length."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, start=1):
+            current.append(min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + (ref_word != hyp_word),  # substitution
+            ))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark Whisper model sizes and precisions")
+    parser.add_argument("files", nargs="+",
+                        help="Recordings to transcribe")
+    parser.add_argument("--configs", nargs="+",
+                        default=["base:fp32", "base:int8", "tiny:fp32", "tiny:int8"],
+                        help="MODEL:PRECISION pairs, the first one is the reference")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch intra-op threads (default: torch default)")
+
+    args = parser.parse_args()
+
+    missing = [path for path in args.files if not Path(path).exists()]
+    if missing:
+        sys.exit(f"Audio files not found: {', '.join(missing)}")
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    audios = [whisper.load_audio(path) for path in args.files]
+    duration = sum(len(audio) for audio in audios) / SAMPLE_RATE
+    print(f"{len(audios)} files, {duration:.0f}s of audio, "
+          f"{torch.get_num_threads()} torch threads\n")
+
+    results = {}
+    for config in args.configs:
+        model_name, _, precision = config.partition(":")
+        precision = precision or "auto"
+        try:
+            device, resolved = resolve_whisper_config(precision)
+        except ValueError as e:
+            print(f"Skipping {config}: {e}")
+            continue
+
+        start = time.perf_counter()
+        model = get_whisper_model(model_name, precision)
+        load_time = time.perf_counter() - start
+        transcribe(audios[0][:30 * SAMPLE_RATE], model_name, precision, num_workers=1)  # warm-up
+
+        start = time.perf_counter()
+        texts = [transcribe(audio, model_name, precision, num_workers=1)["text"]
+                 for audio in audios]
+        elapsed = time.perf_counter() - start
+
+        results[config] = {
+            "label": f"{model_name}/{resolved}/{device}",
+            "load": load_time,
+            "int8_layers": sum(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in model.modules()),
+            "rtf": elapsed / duration,
+            "text": " ".join(texts),
+        }
+
+    if not results:
+        sys.exit("No configuration could run on this machine")
+
+    reference = results[next(iter(results))]["text"]
+    print(f"\n{'configuration':<20} {'load s':>7} {'int8 layers':>11} {'RTF':>6} {'WER vs ref':>11}")
+    print("-" * 59)
+    for result in results.values():
+        print(f"{result['label']:<20} {result['load']:>7.1f} {result['int8_layers']:>11} "
+              f"{result['rtf']:>6.3f} {word_error_rate(reference, result['text']):>11.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Build the local vector index from the chunks stored in the database.
+
+Run it once before switching VECTOR_STORE to "local" (or METADATA_STORE to
+"sqlite") on a machine that already has an indexed corpus, or to rebuild the
+index from scratch. Chunks are read from the METADATA_STORE backend. It then
+times a few searches against the index.
+
+Usage:
+    python -m lib.scripts.build_local_vector_index [--batch-size N] [--queries N]
+"""
+
+from lib.database import get_database_client
+from lib.util.vector_store import get_local_vector_store
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the local vector index from the database")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="Rows added to the index at a time")
+    parser.add_argument("--queries", type=int, default=100,
+                        help="Searches timed after the build (stored embeddings as queries)")
+
+    args = parser.parse_args()
+
+    client = get_database_client()
+    print("Fetching chunks...")
+    start = time.perf_counter()
+    rows = client.get_chunk_rows()
+    print(f"  Fetched {len(rows)} chunks in {time.perf_counter() - start:.1f}s")
+
+    store = get_local_vector_store()
+    store.clear()
+    start = time.perf_counter()
+    for offset in range(0, len(rows), args.batch_size):
+        batch = rows[offset:offset + args.batch_size]
+        store.add([row for row, _ in batch], [embedding for _, embedding in batch])
+        print(f"  {min(offset + args.batch_size, len(rows))}/{len(rows)}")
+    print(f"Indexed {len(store)} chunks in {time.perf_counter() - start:.1f}s "
+          f"at {store.directory}")
+
+    if not rows or args.queries <= 0:
+        return
+    rng = np.random.default_rng(0)
+    queries = [rows[i][1] for i in rng.choice(len(rows), min(args.queries, len(rows)), replace=False)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query, match_threshold=0.0, match_count=10)
+        latencies.append(time.perf_counter() - start)
+    print(f"Search: median {np.median(latencies) * 1000:.2f} ms, "
+          f"p95 {np.percentile(latencies, 95) * 1000:.2f} ms over {len(queries)} queries")
+
+
+if __name__ == "__main__":
+    main()
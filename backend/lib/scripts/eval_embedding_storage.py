@@ -0,0 +1,136 @@
+"""
+Evaluate embedding storage profiles and search access paths against exact search.
+
+Ground truth is an exact cosine top-k computed locally over every stored
+full-precision embedding. Each access path's database search function is
+then run for the same queries and scored on recall@k and latency:
+
+    full     - ivfflat on chunks.embedding (the original schema)
+    halfvec  - ivfflat on chunks.embedding_half
+    pca      - ivfflat on chunks.embedding_pca
+    binary   - Hamming prefilter on sign-bit codes, exact cosine rerank
+
+Only the active profile has an ivfflat index (migrate_embedding_storage
+swaps it), and the other ann paths fall back to an exact scan. Switch
+profiles between runs and compare one ann path at a time.
+
+Usage:
+    python -m lib.scripts.eval_embedding_storage [--k 10] [--queries-file FILE] [--paths full halfvec pca binary]
+"""
+
+from lib.supabase.util import get_supabase_client
+from lib.util.embedding import get_embeddings
+from lib.util.embedding_storage import query_function_args
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Access path name -> (storage profile, search mode)
+ACCESS_PATHS = {
+    "full": ("full", "ann"),
+    "halfvec": ("halfvec", "ann"),
+    "pca": ("pca", "ann"),
+    "binary": ("full", "binary_rerank"),
+}
+
+DEFAULT_QUERIES = [
+    "eigenvalues and eigenvectors",
+    "Jordan canonical form",
+    "Cayley Hamilton theorem",
+    "positive operators and unitary matrices",
+    "homework solutions",
+    "a bird sitting on a branch",
+    "a car parked on the street",
+    "city skyline at night",
+    "food on a plate",
+    "recursive fibonacci function",
+]
+
+
+def exact_top_k(query_embeddings: np.ndarray, embeddings: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k most cosine-similar rows for each query."""
+    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = query_embeddings / \
+        np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+    scores = queries @ embeddings.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run_access_path(client, path: str, query_embeddings: np.ndarray, k: int) -> tuple[list[list[str]], list[float]]:
+    """Run every query through an access path's search function."""
+    profile, search_mode = ACCESS_PATHS[path]
+    results, latencies = [], []
+    for query_embedding in query_embeddings:
+        start = time.perf_counter()
+        function_name, params = query_function_args(
+            query_embedding.tolist(), profile, search_mode)
+        rows = client._client.rpc(
+            function_name,
+            {
+                **params,
+                "match_threshold": -1.0,  # no threshold, rank only
+                "match_count": k,
+            }
+        ).execute().data or []
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([row["chunk_id"] for row in rows])
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report recall@k and latency of vector search access paths")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--queries-file", type=str,
+                        help="File with one query per line (default: built-in queries)")
+    parser.add_argument("--paths", nargs="+", default=list(ACCESS_PATHS),
+                        choices=list(ACCESS_PATHS), help="Access paths to evaluate")
+
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    client = get_supabase_client()
+
+    print("Fetching chunk embeddings...")
+    rows = client.get_chunk_embeddings()
+    if not rows:
+        print("No embeddings found. Seed the database first.")
+        return
+    chunk_ids = [chunk_id for chunk_id, _ in rows]
+    embeddings = np.asarray([embedding for _, embedding in rows], dtype=np.float32)
+    print(f"  {len(chunk_ids)} chunks, {len(queries)} queries, k={args.k}\n")
+
+    query_embeddings = np.asarray(get_embeddings(queries), dtype=np.float32)
+    truth = [
+        {chunk_ids[i] for i in row}
+        for row in exact_top_k(query_embeddings, embeddings, args.k)
+    ]
+
+    print(f"{'path':<10} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print("-" * 38)
+    for path in args.paths:
+        try:
+            results, latencies = run_access_path(
+                client, path, query_embeddings, args.k)
+        except Exception as e:
+            print(f"{path:<10} skipped: {e}")
+            continue
+
+        recalls = [
+            len(truth_ids.intersection(result)) / len(truth_ids)
+            for truth_ids, result in zip(truth, results)
+        ]
+        print(f"{path:<10} {np.mean(recalls):>9.3f} "
+              f"{np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 95):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Switch the chunks table to an embedding storage profile.
+
+Fills the profile's column from the full-precision embeddings, then builds
+the profile's ivfflat index on the filled column and drops the other
+profiles' indexes (a compact profile drops the full-precision one):
+
+    full     only rebuilds the index on chunks.embedding
+    halfvec  casts the chunks that have no embedding_half yet
+    pca      fits a projection on the stored embeddings, saves it to
+             EMBEDDING_PCA_PATH and re-projects every chunk
+
+Run it before setting EMBEDDING_STORAGE_PROFILE to the same profile. Run
+it again with --profile pca after large ingestions to refit on the grown
+corpus.
+
+Usage:
+    python -m lib.scripts.migrate_embedding_storage --profile {full,halfvec,pca} [--batch-size N]
+"""
+
+from lib.constants import EMBEDDING_PCA_DIMENSION, EMBEDDING_PCA_PATH
+from lib.supabase.util import get_supabase_client
+from lib.util.embedding_storage import STORAGE_PROFILES, fit_pca
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def migrate_pca(batch_size: int = 500) -> None:
+    """Fit the PCA projection on the corpus and re-project every chunk."""
+    client = get_supabase_client()
+
+    print("Fetching chunk embeddings...")
+    start = time.perf_counter()
+    rows = client.get_chunk_embeddings()
+    print(f"  Fetched {len(rows)} embeddings in {time.perf_counter() - start:.1f}s")
+
+    if not rows:
+        print("No embeddings found, nothing to migrate.")
+        return
+
+    chunk_ids = [chunk_id for chunk_id, _ in rows]
+    embeddings = np.asarray([embedding for _, embedding in rows], dtype=np.float32)
+
+    print(f"Fitting PCA ({embeddings.shape[1]} -> {EMBEDDING_PCA_DIMENSION} dims)...")
+    projection = fit_pca(embeddings, EMBEDDING_PCA_DIMENSION)
+    projection.save(EMBEDDING_PCA_PATH)
+    print(f"  Explained variance: {projection.explained_variance_ratio:.3f}")
+    print(f"  Saved projection to {EMBEDDING_PCA_PATH}")
+
+    reduced = projection.project(embeddings)
+
+    print("Writing reduced embeddings...")
+    updated = 0
+    for offset in range(0, len(chunk_ids), batch_size):
+        updated += client.update_chunk_pca_embeddings(
+            chunk_ids[offset:offset + batch_size],
+            reduced[offset:offset + batch_size].tolist(),
+        )
+        print(f"  {updated}/{len(chunk_ids)}")
+
+    print(f"Updated {updated} chunks.")
+
+
+def migrate_halfvec(batch_size: int = 5000) -> None:
+    """Fill embedding_half for every chunk written while another profile was active."""
+    client = get_supabase_client()
+
+    print("Writing half-precision embeddings...")
+    updated = 0
+    while True:
+        batch = client.backfill_chunk_half_embeddings(batch_size)
+        if not batch:
+            break
+        updated += batch
+        print(f"  {updated}")
+    print(f"Updated {updated} chunks.")
+
+
+def rebuild_index(profile: str) -> None:
+    """Build the profile's ANN index on the filled column (ivfflat lists are trained at build time)."""
+    print(f"Rebuilding the {profile} index...")
+    start = time.perf_counter()
+    lists = get_supabase_client().rebuild_chunk_embedding_index(profile)
+    print(f"  Built with {lists} lists in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Switch chunk embeddings to a storage profile")
+    parser.add_argument("--profile", choices=STORAGE_PROFILES, required=True,
+                        help="Profile to switch to")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Rows updated per request (default: 500 for pca, 5000 for halfvec)")
+
+    args = parser.parse_args()
+
+    if args.profile == "pca":
+        migrate_pca(args.batch_size or 500)
+    elif args.profile == "halfvec":
+        migrate_halfvec(args.batch_size or 5000)
+    rebuild_index(args.profile)
+    print(f"Done! Set EMBEDDING_STORAGE_PROFILE = \"{args.profile}\".")
+
+
+if __name__ == "__main__":
+    main()
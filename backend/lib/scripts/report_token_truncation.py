@@ -0,0 +1,61 @@
+"""
+Report how much stored chunk text the embedding model never sees.
+
+Every chunk in the database is tokenized with the embedding model's
+tokenizer; tokens past the model's window are truncated at embedding time,
+so they take up storage without influencing search. Chunks written by the
+token-aware chunker should report zero.
+
+Usage:
+    python -m lib.scripts.report_token_truncation [--all]
+"""
+
+from lib.database import get_database_client
+from lib.util.embedding import count_tokens, get_token_budget
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report chunk tokens truncated by the embedding model")
+    parser.add_argument("--all", action="store_true",
+                        help="List every document, not only those with truncated chunks")
+
+    args = parser.parse_args()
+
+    client = get_database_client()
+    budget = get_token_budget()
+    files = sorted(client.get_all_files(), key=lambda f: f["file_path"])
+    print(f"Token budget: {budget} tokens per chunk\n")
+
+    print(f"{'document':<40} {'chunks':>6} {'over':>5} {'tokens':>8} {'truncated':>9} {'%':>6}")
+    print("-" * 80)
+    total_chunks = total_over = total_tokens = total_truncated = 0
+    for file in files:
+        chunks = client.get_chunks(file["id"])
+        counts = count_tokens([chunk["content"] for chunk in chunks])
+        truncated = [max(0, count - budget) for count in counts]
+        over = sum(1 for t in truncated if t)
+
+        total_chunks += len(chunks)
+        total_over += over
+        total_tokens += sum(counts)
+        total_truncated += sum(truncated)
+
+        if over or args.all:
+            share = 100 * sum(truncated) / sum(counts) if counts else 0.0
+            print(f"{file['file_name'][:40]:<40} {len(chunks):>6} {over:>5} "
+                  f"{sum(counts):>8} {sum(truncated):>9} {share:>5.1f}%")
+
+    print("-" * 80)
+    share = 100 * total_truncated / total_tokens if total_tokens else 0.0
+    print(f"{'total':<40} {total_chunks:>6} {total_over:>5} "
+          f"{total_tokens:>8} {total_truncated:>9} {share:>5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ Database seeding script for testing.
 This script processes files from the test_files directory and inserts them
 into the database with embeddings for testing the query_file_chunks function.
 
+Embeddings are read back from the local embedding store when the same chunk
+text was embedded before, so re-seeding after --clear skips model inference.
+
 Usage:
     python -m scripts.seed_database [--clear] [--folder PATH]
 
@@ -12,14 +15,18 @@ Options:
     --folder    Path to folder to process (default: test_files/test_suite(all_types))
 """
 
-from lib.supabase.util import get_supabase_client
+from lib.database import get_database_client
 from lib.util.preprocessing.audio import transcribe_audio
-from lib.util.preprocessing.pdf import extract_pdf_text
+from lib.util.preprocessing.pdf import extract_pdf_document
 from lib.util.folder_extraction import get_valid_file_from_folder, getFileProperties, read_text_file_content
 from lib.util.embedding import get_embeddings
-from lib.util.preprocessing.semantic_chunking import semantic_chunk_text
+from lib.util.embedding_pool import bulk_embedding
+from lib.util.embedding_store import get_embedding_store
+from lib.constants import EMBEDDING_POOL_MIN_FILES, EMBEDDING_STORE_ENABLED
+from lib.util.preprocessing.semantic_chunking import iter_semantic_chunks
 import sys
 import argparse
+from contextlib import nullcontext
 from pathlib import Path
 
 # Add backend directory to path
@@ -43,32 +50,32 @@ SUPPORTED_MIME_TYPES = {
 }
 
 
-def process_text_file(file_path: str) -> list[dict]:
-    """Process a plain text file into chunks."""
+def process_text_file(file_path: str) -> tuple[list[dict], str]:
+    """Process a plain text file into chunks with character offsets."""
     content = read_text_file_content(file_path)
-    chunks = semantic_chunk_text(content, overlap_sentences=2)
+    chunks = iter_semantic_chunks([content], overlap_sentences=2)
 
     return [
         {
             "chunk_index": i,
-            "content": chunk,
+            "content": chunk.content,
             "chunk_metadata": {
-                "char_start": 0,  # Could calculate actual positions if needed
-                "char_end": len(chunk),
+                "char_start": chunk.char_start,
+                "char_end": chunk.char_end,
             }
         }
         for i, chunk in enumerate(chunks)
-    ]
+    ], content
 
 
-def process_pdf_file(file_path: str) -> list[dict]:
+def process_pdf_file(file_path: str, file_hash: str | None = None) -> tuple[list[dict], str]:
     """Process a PDF file into chunks with page metadata."""
-    return extract_pdf_text(file_path)
+    return extract_pdf_document(file_path, file_hash)
 
 
-def process_audio_file(file_path: str) -> list[dict]:
+def process_audio_file(file_path: str, file_hash: str | None = None) -> tuple[list[dict], None]:
     """Process an audio file into transcript chunks with timestamp metadata."""
-    return transcribe_audio(file_path)
+    return transcribe_audio(file_path, file_hash), None
 
 
 # Audio MIME types
@@ -78,21 +85,25 @@ AUDIO_MIME_TYPES = {
 }
 
 
-def process_file(file_path: str, mime_type: str) -> list[dict]:
+def process_file(file_path: str, mime_type: str, file_hash: str | None = None) -> tuple[list[dict], str | None]:
     """
     Process a file based on its MIME type.
 
-    Returns list of chunk dicts with content, chunk_index, chunk_metadata.
+    Extracted PDF text and transcripts are written to the artifact cache
+    under file_hash for later reuse.
+
+    Returns list of chunk dicts with content, chunk_index, chunk_metadata,
+    and the source text their char offsets point into (None for audio).
     """
     if mime_type == 'text/plain':
         return process_text_file(file_path)
     elif mime_type == 'application/pdf':
-        return process_pdf_file(file_path)
+        return process_pdf_file(file_path, file_hash)
     elif mime_type in AUDIO_MIME_TYPES:
-        return process_audio_file(file_path)
+        return process_audio_file(file_path, file_hash)
     else:
         print(f"  Unsupported MIME type: {mime_type}")
-        return []
+        return [], None
 
 
 def seed_database(folder_path: str, clear_existing: bool = False):
@@ -103,7 +114,7 @@ def seed_database(folder_path: str, clear_existing: bool = False):
         folder_path: Path to folder containing test files
         clear_existing: If True, delete all existing data first
     """
-    client = get_supabase_client()
+    client = get_database_client()
 
     # Optionally clear existing data
     if clear_existing:
@@ -124,60 +135,70 @@ def seed_database(folder_path: str, clear_existing: bool = False):
     skip_count = 0
     fail_count = 0
 
-    for file_path in sorted(file_paths):
-        file_name = Path(file_path).name
-        print(f"Processing: {file_name}")
-
-        try:
-            # Get file properties
-            file_props = getFileProperties(file_path)
-
-            # Check if file already exists
-            if client.file_exists(file_hash=file_props.file_hash):
-                print(f"  Skipped (already exists)\n")
-                skip_count += 1
-                continue
-
-            # Process file into chunks
-            chunks = process_file(file_path, file_props.mime_type)
-
-            if not chunks:
-                print(f"  Skipped (no content extracted)\n")
-                skip_count += 1
-                continue
-
-            print(f"  Extracted {len(chunks)} chunks")
-
-            # Generate embeddings for all chunks
-            chunk_contents = [c["content"] for c in chunks]
-            embeddings = get_embeddings(chunk_contents)
-            print(f"  Generated {len(embeddings)} embeddings")
-
-            # Prepare metadata
-            metadata = {
-                "source": "seed_script",
-                "chunk_count": len(chunks),
-            }
+    # Large seeds spread embedding over a process pool that exits when done
+    embedding_context = (
+        bulk_embedding()
+        if len(file_paths) >= EMBEDDING_POOL_MIN_FILES
+        else nullcontext()
+    )
 
-            # Insert into database
-            file_id = client.process_file(
-                file_path=file_props.path,
-                file_name=file_props.file_name,
-                mime_type=file_props.mime_type,
-                file_hash=file_props.file_hash,
-                last_modified_at=file_props.last_modified,
-                chunks=chunks,
-                embeddings=embeddings,
-                file_size=file_props.file_size,
-                metadata=metadata,
-            )
-
-            print(f"  Inserted with ID: {file_id}\n")
-            success_count += 1
-
-        except Exception as e:
-            print(f"  ERROR: {e}\n")
-            fail_count += 1
+    with embedding_context:
+        for file_path in sorted(file_paths):
+            file_name = Path(file_path).name
+            print(f"Processing: {file_name}")
+
+            try:
+                # Get file properties
+                file_props = getFileProperties(file_path)
+
+                # Check if file already exists
+                if client.file_exists(file_hash=file_props.file_hash):
+                    print(f"  Skipped (already exists)\n")
+                    skip_count += 1
+                    continue
+
+                # Process file into chunks
+                chunks, content = process_file(
+                    file_path, file_props.mime_type, file_props.file_hash)
+
+                if not chunks:
+                    print(f"  Skipped (no content extracted)\n")
+                    skip_count += 1
+                    continue
+
+                print(f"  Extracted {len(chunks)} chunks")
+
+                # Generate embeddings for all chunks
+                chunk_contents = [c["content"] for c in chunks]
+                embeddings = get_embeddings(chunk_contents)
+                print(f"  Generated {len(embeddings)} embeddings")
+
+                # Prepare metadata
+                metadata = {
+                    "source": "seed_script",
+                    "chunk_count": len(chunks),
+                }
+
+                # Insert into database
+                file_id = client.process_file(
+                    file_path=file_props.path,
+                    file_name=file_props.file_name,
+                    mime_type=file_props.mime_type,
+                    file_hash=file_props.file_hash,
+                    last_modified_at=file_props.last_modified,
+                    chunks=chunks,
+                    embeddings=embeddings,
+                    file_size=file_props.file_size,
+                    metadata=metadata,
+                    content=content,
+                )
+
+                print(f"  Inserted with ID: {file_id}\n")
+                success_count += 1
+
+            except Exception as e:
+                print(f"  ERROR: {e}\n")
+                fail_count += 1
 
     # Summary
     print("=" * 50)
@@ -185,6 +206,10 @@ def seed_database(folder_path: str, clear_existing: bool = False):
     print(f"  Successful: {success_count}")
     print(f"  Skipped: {skip_count}")
     print(f"  Failed: {fail_count}")
+    if EMBEDDING_STORE_ENABLED:
+        store = get_embedding_store()
+        print(f"  Embedding store: {store.hits} reused, {store.misses} computed "
+              f"({len(store)} stored)")
 
 
 def main():
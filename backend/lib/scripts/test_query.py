@@ -1,5 +1,5 @@
 """
-Test the query_file_chunks function after seeding.
+Test vector search over the seeded chunks (query_files on the configured database).
 
 Usage:
     python -m scripts.test_query "your search query here"
@@ -7,9 +7,8 @@ Usage:
     python -m scripts.test_query "your search query" --md output.md
 """
 
-from lib.constants import DEFAULT_MATCH_THRESHOLD
-from lib.supabase.util import get_supabase_client
-from lib.util.embedding import get_embedding
+from lib.constants import DEFAULT_MATCH_THRESHOLD, VECTOR_SEARCH_MODE
+from lib.database import get_database_client
 import json
 import sys
 from pathlib import Path
@@ -18,7 +17,7 @@ from datetime import datetime
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
-def query_chunks(query: str, match_threshold: float = DEFAULT_MATCH_THRESHOLD, match_count: int = 10) -> list[dict]:
+def query_chunks(query: str, match_threshold: float = DEFAULT_MATCH_THRESHOLD, match_count: int = 10, search_mode: str = VECTOR_SEARCH_MODE) -> list[dict]:
     """
     Query the database for matching chunks.
 
@@ -26,25 +25,14 @@ def query_chunks(query: str, match_threshold: float = DEFAULT_MATCH_THRESHOLD, m
         query: Natural language search query
         match_threshold: Minimum similarity score (0-1)
         match_count: Maximum number of results
+        search_mode: "ann" or "binary_rerank"
 
     Returns:
         List of matching chunk records
     """
-    # Generate embedding for query
-    query_embedding = get_embedding(query)
-
-    # Call the database function
-    client = get_supabase_client()
-    result = client._client.rpc(
-        "query_file_chunks",
-        {
-            "query_embedding": query_embedding,
-            "match_threshold": match_threshold,
-            "match_count": match_count,
-        }
-    ).execute()
-
-    return result.data or []
+    # query_files fills in the text of chunks stored by reference
+    client = get_database_client()
+    return client.query_files(query, match_threshold, match_count, search_mode=search_mode)
 
 
 def print_results(query: str, results: list[dict], threshold: float, count: int):
@@ -146,6 +134,8 @@ def main():
                         help="Minimum similarity threshold (0-1)")
     parser.add_argument("--count", type=int, default=10,
                         help="Maximum number of results")
+    parser.add_argument("--search-mode", choices=["ann", "binary_rerank"], default=VECTOR_SEARCH_MODE,
+                        help="Vector search access path")
     parser.add_argument("--json", type=str, help="Export results to JSON file")
     parser.add_argument(
         "--md", type=str, help="Export results to Markdown file")
@@ -153,7 +143,8 @@ def main():
     args = parser.parse_args()
 
     print("Generating query embedding...")
-    results = query_chunks(args.query, args.threshold, args.count)
+    results = query_chunks(args.query, args.threshold,
+                           args.count, args.search_mode)
 
     print_results(args.query, results, args.threshold, args.count)
 
@@ -0,0 +1,47 @@
+"""
+Vendor NLTK's Punkt sentence tokenizer data into the repository.
+
+Downloads punkt_tab once (on a machine with network access) and copies the
+requested languages into lib/util/preprocessing/nltk_data, where
+PunktSegmenter loads it from. Commit the result so air-gapped hosts never
+need nltk.download.
+
+Usage:
+    python -m lib.scripts.vendor_punkt_data [--languages english ...]
+"""
+
+from lib.util.preprocessing.sentence_segmentation import VENDORED_NLTK_DATA_DIR
+import sys
+import shutil
+import argparse
+import tempfile
+import nltk
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Vendor Punkt tokenizer data for offline use")
+    parser.add_argument("--languages", nargs="+", default=["english"],
+                        help="Punkt languages to vendor (default: english)")
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as download_dir:
+        if not nltk.download("punkt_tab", download_dir=download_dir, quiet=True):
+            sys.exit("Failed to download punkt_tab")
+
+        source = Path(download_dir) / "tokenizers" / "punkt_tab"
+        target = VENDORED_NLTK_DATA_DIR / "tokenizers" / "punkt_tab"
+        for language in args.languages:
+            if not (source / language).is_dir():
+                sys.exit(f"punkt_tab has no data for '{language}'")
+            shutil.rmtree(target / language, ignore_errors=True)
+            shutil.copytree(source / language, target / language)
+            print(f"Vendored punkt_tab/{language} -> {target / language}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,589 @@
+# SQLite database utility functions for inserting and querying files/chunks.
+# An embedded drop-in for SupabaseClient (same methods, same row shapes) for
+# single-machine deployments: metadata lives in one SQLite file in WAL mode and search
+# goes through the local vector index, so nothing waits on PostgREST.
+
+import json
+import uuid
+import zlib
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+
+from lib.constants import DEFAULT_MATCH_THRESHOLD, VECTOR_SEARCH_MODE, CHUNK_CONTENT_STORAGE, SQLITE_DB_PATH
+from lib.util.embedding import get_embedding
+from lib.util.vector_store import get_local_vector_store
+from lib.util.content_storage import CONTENT_STORAGE_MODES, has_offsets, hydrate_chunks
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    file_size INTEGER,
+    mime_type TEXT NOT NULL,
+    file_hash TEXT NOT NULL UNIQUE,
+    last_modified_at TEXT NOT NULL,
+    uploaded_at TEXT NOT NULL,
+    processed_at TEXT,
+    processing_status TEXT DEFAULT 'pending',
+    metadata TEXT NOT NULL
+);
+-- Serves exact path lookups and folder (path prefix) range scans
+CREATE INDEX IF NOT EXISTS idx_files_file_path ON files (file_path);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    content TEXT,
+    embedding BLOB,
+    chunk_metadata TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    UNIQUE (file_id, chunk_index)
+);
+
+CREATE TABLE IF NOT EXISTS file_contents (
+    file_id TEXT PRIMARY KEY REFERENCES files (id) ON DELETE CASCADE,
+    content BLOB NOT NULL,
+    char_count INTEGER NOT NULL
+);
+"""
+
+# Upper bound for a path prefix range: sorts after any continuation of the prefix
+_PREFIX_END = "\U0010ffff"
+
+
+def _file_row(row: sqlite3.Row) -> dict:
+    file = dict(row)
+    file["metadata"] = json.loads(file["metadata"])
+    return file
+
+
+def _chunk_row(row: sqlite3.Row) -> dict:
+    chunk = dict(row)
+    chunk["chunk_metadata"] = json.loads(chunk["chunk_metadata"])
+    if chunk.get("embedding") is not None:
+        # Same text form as pgvector values read through PostgREST, e.g. "[0.1,0.2]"
+        chunk["embedding"] = json.dumps(np.frombuffer(chunk["embedding"], dtype=np.float32).tolist())
+    return chunk
+
+
+class SQLiteClient:
+    """Client for the embedded SQLite database, with the same methods as SupabaseClient."""
+
+    _instance: "SQLiteClient | None" = None
+
+    def __init__(self, db_path: Path | str = SQLITE_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection per thread: WAL lets readers run while a writer commits
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+        self._vector_store = get_local_vector_store()
+
+    @classmethod
+    def get_instance(cls) -> "SQLiteClient":
+        """Get singleton instance of the client."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # -------------------------------------------------------------------------
+    # File Operations
+    # -------------------------------------------------------------------------
+
+    def get_file(
+        self,
+        *,
+        file_id: str | None = None,
+        file_hash: str | None = None,
+        file_path: str | None = None,
+    ) -> dict | None:
+        """
+        Get a file record by ID, hash, or path.
+
+        Args:
+            file_id: UUID of the file
+            file_hash: SHA256 hash of the file
+            file_path: Path to the file
+
+        Returns:
+            File record dict or None if not found
+        """
+        if file_id:
+            column, value = "id", file_id
+        elif file_hash:
+            column, value = "file_hash", file_hash
+        elif file_path:
+            column, value = "file_path", file_path
+        else:
+            raise ValueError("Must provide file_id, file_hash, or file_path")
+
+        row = self._connection().execute(
+            f"SELECT * FROM files WHERE {column} = ? LIMIT 1", (value,)).fetchone()
+        return _file_row(row) if row else None
+
+    def get_all_files(self) -> list[dict]:
+        """
+        Get all file records from the database.
+
+        Returns:
+            List of file record dicts
+        """
+        rows = self._connection().execute("SELECT * FROM files").fetchall()
+        return [_file_row(row) for row in rows]
+
+    def file_exists(
+        self,
+        *,
+        file_id: str | None = None,
+        file_hash: str | None = None,
+        file_path: str | None = None,
+    ) -> bool:
+        """
+        Check if a file exists by ID, hash, or path.
+
+        Args:
+            file_id: UUID of the file
+            file_hash: SHA256 hash of the file
+            file_path: Path to the file
+
+        Returns:
+            True if file exists, False otherwise
+        """
+        return self.get_file(file_id=file_id, file_hash=file_hash, file_path=file_path) is not None
+
+    def insert_file(
+        self,
+        file_path: str,
+        file_name: str,
+        mime_type: str,
+        file_hash: str,
+        last_modified_at: datetime,
+        file_size: int | None = None,
+        metadata: dict | None = None,
+    ) -> str:
+        """
+        Insert a file record into the database.
+
+        Args:
+            file_path: Full path to the file
+            file_name: Name of the file
+            mime_type: MIME type of the file
+            file_hash: SHA256 hash of the file
+            last_modified_at: When the file was last modified
+            file_size: Size of the file in bytes
+            metadata: Additional metadata as dict (stored as JSON)
+
+        Returns:
+            The UUID of the inserted file record
+        """
+        file_id = str(uuid.uuid4())
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO files (id, file_path, file_name, mime_type, file_hash, file_size, "
+                "last_modified_at, uploaded_at, processing_status, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'processing', ?)",
+                (file_id, file_path, file_name, mime_type, file_hash, file_size,
+                 last_modified_at.isoformat(), datetime.now().isoformat(),
+                 json.dumps(metadata or {})),
+            )
+        return file_id
+
+    def update_file_status(
+        self,
+        file_id: str,
+        status: str,
+        processed_at: datetime | None = None,
+    ) -> None:
+        """
+        Update the processing status of a file.
+
+        Args:
+            file_id: UUID of the file
+            status: New status ('pending', 'processing', 'completed', 'failed')
+            processed_at: When processing completed (optional)
+        """
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE files SET processing_status = ?, "
+                "processed_at = COALESCE(?, processed_at) WHERE id = ?",
+                (status, processed_at.isoformat() if processed_at else None, file_id),
+            )
+
+    def update_file_metadata(self, file_id: str, metadata: dict) -> dict:
+        """
+        Merge keys into a file's metadata.
+
+        Args:
+            file_id: UUID of the file
+            metadata: Keys to add or replace in the metadata
+
+        Returns:
+            The updated metadata
+
+        Raises:
+            ValueError: If the file does not exist
+        """
+        file = self.get_file(file_id=file_id)
+        if file is None:
+            raise ValueError(f"File {file_id} not found")
+
+        merged = {**(file.get("metadata") or {}), **metadata}
+        with self._connection() as conn:
+            conn.execute("UPDATE files SET metadata = ? WHERE id = ?",
+                         (json.dumps(merged), file_id))
+        return merged
+
+    def delete_file(
+        self,
+        *,
+        file_id: str | None = None,
+        file_hash: str | None = None,
+        file_path: str | None = None,
+    ) -> bool:
+        """
+        Delete a file and all its associated chunks by ID, hash, or path.
+
+        Chunks are automatically deleted due to CASCADE on foreign key.
+
+        Args:
+            file_id: UUID of the file to delete
+            file_hash: SHA256 hash of the file to delete
+            file_path: Path of the file to delete
+
+        Returns:
+            True if file was deleted, False if not found
+        """
+        file = self.get_file(file_id=file_id, file_hash=file_hash, file_path=file_path)
+        if file is None:
+            return False
+        with self._connection() as conn:
+            conn.execute("DELETE FROM files WHERE id = ?", (file["id"],))
+        self._vector_store.delete_files([file["id"]])
+        return True
+
+    def delete_all_files(self) -> int:
+        """
+        Delete all files and chunks from the database.
+
+        Use this to reset a study session or clear all data.
+
+        Returns:
+            Number of files deleted
+        """
+        with self._connection() as conn:
+            deleted = conn.execute("DELETE FROM files").rowcount
+        self._vector_store.clear()
+        return deleted
+
+    def delete_files_by_folder(self, folder_path: str) -> int:
+        """
+        Delete all files and their chunks from a specific folder.
+
+        Deletes all files whose file_path starts with the given folder_path.
+        Chunks are automatically deleted due to CASCADE on foreign key.
+
+        Args:
+            folder_path: Root folder path to delete files from
+
+        Returns:
+            Number of files deleted
+        """
+        # A range on the file_path index instead of LIKE, which SQLite cannot index
+        # case-sensitively
+        conn = self._connection()
+        file_ids = [
+            row["id"] for row in conn.execute(
+                "SELECT id FROM files WHERE file_path >= ? AND file_path < ?",
+                (folder_path, folder_path + _PREFIX_END),
+            )
+        ]
+        if not file_ids:
+            return 0
+
+        with conn:
+            conn.executemany("DELETE FROM files WHERE id = ?",
+                             [(file_id,) for file_id in file_ids])
+        self._vector_store.delete_files(file_ids)
+        return len(file_ids)
+
+    # -------------------------------------------------------------------------
+    # Chunk Operations
+    # -------------------------------------------------------------------------
+
+    def insert_chunks(
+        self,
+        file_id: str,
+        chunks: list[dict],
+        embeddings: list[list[float]],
+        content_by_reference: bool = False,
+        file: dict | None = None,
+    ) -> int:
+        """
+        Batch insert chunks with embeddings for a file, and add them to the vector index.
+
+        Args:
+            file_id: UUID of the parent file
+            chunks: List of chunk dicts with 'content', 'chunk_index', 'chunk_metadata'
+            embeddings: List of embedding vectors (must match length of chunks)
+            content_by_reference: Leave chunks.content NULL; the text is read back
+                from file_contents through the chunk's char offsets
+            file: The parent file's record, if at hand (fetched otherwise)
+
+        Returns:
+            Number of chunks inserted
+        """
+        if len(chunks) != len(embeddings):
+            raise ValueError(
+                f"Mismatch: {len(chunks)} chunks but {len(embeddings)} embeddings")
+
+        created_at = datetime.now().isoformat()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "file_id": file_id,
+                "chunk_index": chunk["chunk_index"],
+                "content": None if content_by_reference else chunk["content"],
+                "chunk_metadata": chunk["chunk_metadata"],
+            }
+            for chunk in chunks
+        ]
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT INTO chunks (id, file_id, chunk_index, content, embedding, "
+                "chunk_metadata, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (row["id"], file_id, row["chunk_index"], row["content"],
+                     np.asarray(embedding, dtype=np.float32).tobytes(),
+                     json.dumps(row["chunk_metadata"]), created_at)
+                    for row, embedding in zip(rows, embeddings)
+                ],
+            )
+
+        file = file or self.get_file(file_id=file_id)
+        self._vector_store.add(
+            [
+                {
+                    "chunk_id": row["id"],
+                    "file_id": file_id,
+                    "chunk_index": row["chunk_index"],
+                    "content": row["content"],
+                    "chunk_metadata": row["chunk_metadata"],
+                    "file_name": file["file_name"],
+                    "file_path": file["file_path"],
+                    "mime_type": file["mime_type"],
+                }
+                for row in rows
+            ],
+            embeddings,
+        )
+        return len(rows)
+
+    def get_chunks(self, file_id: str) -> list[dict]:
+        """
+        Get all chunks for a file.
+
+        Args:
+            file_id: UUID of the parent file
+
+        Returns:
+            List of chunk records ordered by chunk_index
+        """
+        rows = self._connection().execute(
+            "SELECT * FROM chunks WHERE file_id = ? ORDER BY chunk_index", (file_id,)).fetchall()
+        return self._hydrate_chunks([_chunk_row(row) for row in rows])
+
+    def insert_file_content(self, file_id: str, content: str) -> None:
+        """
+        Store the source text of a file, compressed, for chunks stored by reference.
+
+        Args:
+            file_id: UUID of the parent file
+            content: Text the chunk offsets point into
+        """
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO file_contents (file_id, content, char_count) VALUES (?, ?, ?)",
+                (file_id, zlib.compress(content.encode("utf-8"), 9), len(content)),
+            )
+
+    def get_file_contents(self, file_ids: list[str]) -> dict[str, str]:
+        """
+        Get the decompressed source text of files stored by reference.
+
+        Args:
+            file_ids: UUIDs of the files
+
+        Returns:
+            Dict of file ID to text, for the files that have stored content
+        """
+        if not file_ids:
+            return {}
+        placeholders = ", ".join("?" * len(file_ids))
+        rows = self._connection().execute(
+            f"SELECT file_id, content FROM file_contents WHERE file_id IN ({placeholders})",
+            file_ids,
+        )
+        return {row["file_id"]: zlib.decompress(row["content"]).decode("utf-8") for row in rows}
+
+    def _hydrate_chunks(self, rows: list[dict]) -> list[dict]:
+        """Fill in the text of chunks stored by reference."""
+        file_ids = sorted({row["file_id"]
+                          for row in rows if row.get("content") is None})
+        if not file_ids:
+            return rows
+        return hydrate_chunks(rows, self.get_file_contents(file_ids))
+
+    def get_chunk_embeddings(self, page_size: int = 1000) -> list[tuple[str, list[float]]]:
+        """
+        Get the full-precision embedding of every chunk.
+
+        Args:
+            page_size: Unused; kept for parity with SupabaseClient
+
+        Returns:
+            List of (chunk_id, embedding) tuples
+        """
+        rows = self._connection().execute(
+            "SELECT id, embedding FROM chunks WHERE embedding IS NOT NULL ORDER BY id")
+        return [(row["id"], np.frombuffer(row["embedding"], dtype=np.float32).tolist())
+                for row in rows]
+
+    def get_chunk_rows(self, page_size: int = 1000) -> list[tuple[dict, list[float]]]:
+        """
+        Get every chunk with its file's name, path and MIME type and its full-precision embedding.
+
+        Args:
+            page_size: Unused; kept for parity with SupabaseClient
+
+        Returns:
+            List of (row, embedding) tuples, rows shaped like query_files results
+        """
+        rows = self._connection().execute(
+            "SELECT c.id AS chunk_id, c.file_id, c.chunk_index, c.content, c.chunk_metadata, "
+            "c.embedding, f.file_name, f.file_path, f.mime_type "
+            "FROM chunks c JOIN files f ON c.file_id = f.id "
+            "WHERE c.embedding IS NOT NULL ORDER BY c.id")
+        result = []
+        for row in rows:
+            row = dict(row)
+            embedding = np.frombuffer(row.pop("embedding"), dtype=np.float32).tolist()
+            row["chunk_metadata"] = json.loads(row["chunk_metadata"])
+            result.append((row, embedding))
+        return result
+
+    def update_chunk_pca_embeddings(
+        self,
+        chunk_ids: list[str],
+        embeddings: list[list[float]],
+    ) -> int:
+        """Compact storage profiles are pgvector columns; SQLite keeps full-precision embeddings only."""
+        raise ValueError("Embedding storage profiles only apply to the Supabase database")
+
+    def backfill_chunk_half_embeddings(self, batch_size: int = 5000) -> int:
+        """See update_chunk_pca_embeddings."""
+        raise ValueError("Embedding storage profiles only apply to the Supabase database")
+
+    def rebuild_chunk_embedding_index(self, profile: str) -> int:
+        """See update_chunk_pca_embeddings."""
+        raise ValueError("Embedding storage profiles only apply to the Supabase database")
+
+    def process_file(
+        self,
+        file_path: str,
+        file_name: str,
+        mime_type: str,
+        file_hash: str,
+        last_modified_at: datetime,
+        chunks: list[dict],
+        embeddings: list[list[float]],
+        file_size: int | None = None,
+        metadata: dict | None = None,
+        content: str | None = None,
+        content_storage: str = CHUNK_CONTENT_STORAGE,
+    ) -> str:
+        """
+        High-level function to insert a file and its chunks in one operation.
+
+        Same behaviour as SupabaseClient.process_file.
+
+        Returns:
+            The UUID of the file record
+
+        Raises:
+            ValueError: If file already exists
+        """
+        if content_storage not in CONTENT_STORAGE_MODES:
+            raise ValueError(
+                f"Unknown content storage '{content_storage}', expected one of {CONTENT_STORAGE_MODES}")
+        if self.file_exists(file_hash=file_hash):
+            raise ValueError(f"File with hash {file_hash} already exists")
+
+        by_reference = (
+            content_storage == "reference"
+            and content is not None
+            and all(has_offsets(chunk) for chunk in chunks)
+        )
+
+        file_id = self.insert_file(
+            file_path=file_path,
+            file_name=file_name,
+            mime_type=mime_type,
+            file_hash=file_hash,
+            last_modified_at=last_modified_at,
+            file_size=file_size,
+            metadata=metadata,
+        )
+
+        if by_reference:
+            self.insert_file_content(file_id, content)
+        self.insert_chunks(file_id, chunks, embeddings,
+                           content_by_reference=by_reference,
+                           file={"file_name": file_name, "file_path": file_path, "mime_type": mime_type})
+        self.update_file_status(file_id, "completed", datetime.now())
+
+        return file_id
+
+    # query function given text prompt
+
+    def query_files(self, query: str, match_threshold: float = DEFAULT_MATCH_THRESHOLD, match_count: int = 10, archived_folders: list[str] = None, search_mode: str = VECTOR_SEARCH_MODE) -> list[dict]:
+        """Query the local vector index for matching file chunks, excluding archived folders.
+
+        Args:
+            query: Natural language search query
+            match_threshold: Minimum similarity score (0-1)
+            match_count: Maximum number of results
+            archived_folders: List of folder paths to exclude from results
+            search_mode: Ignored; the local index has a single access path
+        Returns:
+            List of matching chunk records
+        """
+        query_embedding = get_embedding(query)
+        results = self._vector_store.search(
+            query_embedding,
+            match_threshold=match_threshold,
+            match_count=match_count,
+            archived_folders=archived_folders,
+        )
+        return self._hydrate_chunks(results)
+
+
+def get_sqlite_client() -> SQLiteClient:
+    """Get the singleton SQLiteClient instance."""
+    return SQLiteClient.get_instance()
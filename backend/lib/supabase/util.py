@@ -1,11 +1,21 @@
 # Supabase database utility functions for inserting and querying files/chunks.
 
 import os
+import json
 from datetime import datetime
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from lib.constants import DEFAULT_MATCH_THRESHOLD
+from lib.constants import DEFAULT_MATCH_THRESHOLD, VECTOR_SEARCH_MODE, CHUNK_CONTENT_STORAGE
 from lib.util.embedding import get_embedding
+from lib.util.embedding_storage import storage_columns
+from lib.util.vector_store import create_vector_store
+from lib.util.content_storage import (
+    CONTENT_STORAGE_MODES,
+    encode_content,
+    decode_content,
+    has_offsets,
+    hydrate_chunks,
+)
 
 load_dotenv()
 
@@ -22,6 +32,7 @@ class SupabaseClient:
             raise ValueError(
                 "SUPABASE_URL and SUPABASE_SECRET_KEY must be set in .env")
         self._client: Client = create_client(url, key)
+        self._vector_store = create_vector_store(self._client)
 
     @classmethod
     def get_instance(cls) -> "SupabaseClient":
@@ -155,6 +166,29 @@ class SupabaseClient:
 
         self._client.table("files").update(data).eq("id", file_id).execute()
 
+    def update_file_metadata(self, file_id: str, metadata: dict) -> dict:
+        """
+        Merge keys into a file's metadata.
+
+        Args:
+            file_id: UUID of the file
+            metadata: Keys to add or replace in the metadata JSONB
+
+        Returns:
+            The updated metadata
+
+        Raises:
+            ValueError: If the file does not exist
+        """
+        file = self.get_file(file_id=file_id)
+        if file is None:
+            raise ValueError(f"File {file_id} not found")
+
+        merged = {**(file.get("metadata") or {}), **metadata}
+        self._client.table("files").update(
+            {"metadata": merged}).eq("id", file_id).execute()
+        return merged
+
     def delete_file(
         self,
         *,
@@ -187,6 +221,7 @@ class SupabaseClient:
             raise ValueError("Must provide file_id, file_hash, or file_path")
 
         result = query.execute()
+        self._vector_store.delete_files([row["id"] for row in result.data])
         return len(result.data) > 0
 
     def delete_all_files(self) -> int:
@@ -204,6 +239,7 @@ class SupabaseClient:
             .neq("id", "00000000-0000-0000-0000-000000000000")
             .execute()
         )
+        self._vector_store.clear()
         return len(result.data)
 
     def delete_files_by_folder(self, folder_path: str) -> int:
@@ -238,6 +274,7 @@ class SupabaseClient:
             .in_("id", file_ids)
             .execute()
         )
+        self._vector_store.delete_files(file_ids)
 
         return len(delete_result.data)
 
@@ -250,14 +287,19 @@ class SupabaseClient:
         file_id: str,
         chunks: list[dict],
         embeddings: list[list[float]],
+        content_by_reference: bool = False,
+        file: dict | None = None,
     ) -> int:
         """
-        Batch insert chunks with embeddings for a file.
+        Batch insert chunks with embeddings for a file, and add them to the vector store.
 
         Args:
             file_id: UUID of the parent file
             chunks: List of chunk dicts with 'content', 'chunk_index', 'chunk_metadata'
             embeddings: List of embedding vectors (must match length of chunks)
+            content_by_reference: Leave chunks.content NULL; the text is read back
+                from file_contents through the chunk's char offsets
+            file: The parent file's record, if at hand (fetched otherwise)
 
         Returns:
             Number of chunks inserted
@@ -270,14 +312,32 @@ class SupabaseClient:
             {
                 "file_id": file_id,
                 "chunk_index": chunk["chunk_index"],
-                "content": chunk["content"],
-                "embedding": embedding,
+                "content": None if content_by_reference else chunk["content"],
                 "chunk_metadata": chunk["chunk_metadata"],
+                **embedding_columns,
             }
-            for chunk, embedding in zip(chunks, embeddings)
+            for chunk, embedding_columns in zip(chunks, storage_columns(embeddings))
         ]
 
         result = self._client.table("chunks").insert(rows).execute()
+
+        file = file or self.get_file(file_id=file_id)
+        self._vector_store.add(
+            [
+                {
+                    "chunk_id": row["id"],
+                    "file_id": file_id,
+                    "chunk_index": row["chunk_index"],
+                    "content": row["content"],
+                    "chunk_metadata": row["chunk_metadata"],
+                    "file_name": file["file_name"],
+                    "file_path": file["file_path"],
+                    "mime_type": file["mime_type"],
+                }
+                for row in result.data
+            ],
+            embeddings,
+        )
         return len(result.data)
 
     def get_chunks(self, file_id: str) -> list[dict]:
@@ -297,7 +357,159 @@ class SupabaseClient:
             .order("chunk_index")
             .execute()
         )
-        return result.data
+        return self._hydrate_chunks(result.data)
+
+    def insert_file_content(self, file_id: str, content: str) -> None:
+        """
+        Store the source text of a file, compressed, for chunks stored by reference.
+
+        Args:
+            file_id: UUID of the parent file
+            content: Text the chunk offsets point into
+        """
+        self._client.table("file_contents").insert({
+            "file_id": file_id,
+            "content": encode_content(content),
+            "char_count": len(content),
+        }).execute()
+
+    def get_file_contents(self, file_ids: list[str]) -> dict[str, str]:
+        """
+        Get the decompressed source text of files stored by reference.
+
+        Args:
+            file_ids: UUIDs of the files
+
+        Returns:
+            Dict of file ID to text, for the files that have stored content
+        """
+        if not file_ids:
+            return {}
+        result = (
+            self._client.table("file_contents")
+            .select("file_id, content")
+            .in_("file_id", file_ids)
+            .execute()
+        )
+        return {row["file_id"]: decode_content(row["content"]) for row in result.data}
+
+    def _hydrate_chunks(self, rows: list[dict]) -> list[dict]:
+        """Fill in the text of chunks stored by reference."""
+        file_ids = sorted({row["file_id"]
+                          for row in rows if row.get("content") is None})
+        if not file_ids:
+            return rows
+        return hydrate_chunks(rows, self.get_file_contents(file_ids))
+
+    def get_chunk_embeddings(self, page_size: int = 1000) -> list[tuple[str, list[float]]]:
+        """
+        Get the full-precision embedding of every chunk.
+
+        Args:
+            page_size: Number of rows fetched per request
+
+        Returns:
+            List of (chunk_id, embedding) tuples
+        """
+        rows = []
+        start = 0
+        while True:
+            result = (
+                self._client.table("chunks")
+                .select("id, embedding")
+                .not_.is_("embedding", "null")
+                .order("id")
+                .range(start, start + page_size - 1)
+                .execute()
+            )
+            # pgvector values come back in their text form, e.g. "[0.1,0.2]"
+            rows.extend((row["id"], json.loads(row["embedding"]))
+                        for row in result.data)
+            if len(result.data) < page_size:
+                return rows
+            start += page_size
+
+    def get_chunk_rows(self, page_size: int = 1000) -> list[tuple[dict, list[float]]]:
+        """
+        Get every chunk with its file's name, path and MIME type and its full-precision embedding.
+
+        Args:
+            page_size: Number of rows fetched per request
+
+        Returns:
+            List of (row, embedding) tuples, rows shaped like query_files results
+        """
+        rows = []
+        start = 0
+        while True:
+            result = (
+                self._client.table("chunks")
+                .select("id, file_id, chunk_index, content, chunk_metadata, embedding, "
+                        "files(file_name, file_path, mime_type)")
+                .not_.is_("embedding", "null")
+                .order("id")
+                .range(start, start + page_size - 1)
+                .execute()
+            )
+            for row in result.data:
+                file = row.pop("files")
+                embedding = json.loads(row.pop("embedding"))
+                row["chunk_id"] = row.pop("id")
+                rows.append(({**row, **file}, embedding))
+            if len(result.data) < page_size:
+                return rows
+            start += page_size
+
+    def update_chunk_pca_embeddings(
+        self,
+        chunk_ids: list[str],
+        embeddings: list[list[float]],
+    ) -> int:
+        """
+        Batch update the PCA-reduced embedding column of existing chunks.
+
+        Args:
+            chunk_ids: UUIDs of the chunks to update
+            embeddings: Reduced vectors (must match length of chunk_ids)
+
+        Returns:
+            Number of chunks updated
+        """
+        if len(chunk_ids) != len(embeddings):
+            raise ValueError(
+                f"Mismatch: {len(chunk_ids)} chunk ids but {len(embeddings)} embeddings")
+
+        result = self._client.rpc(
+            "update_chunk_pca_embeddings",
+            {
+                "updates": [
+                    {"id": chunk_id, "embedding": embedding}
+                    for chunk_id, embedding in zip(chunk_ids, embeddings)
+                ],
+            }
+        ).execute()
+        return result.data or 0
+
+    def backfill_chunk_half_embeddings(self, batch_size: int = 5000) -> int:
+        """
+        Fill the half-precision embedding column of chunks that lack it, one batch.
+
+        Returns:
+            Number of chunks updated (0 once every chunk has one)
+        """
+        return self._client.rpc(
+            "backfill_chunk_half_embeddings", {"batch_size": batch_size}).execute().data or 0
+
+    def rebuild_chunk_embedding_index(self, profile: str) -> int:
+        """
+        Build the ivfflat index of a storage profile on its current vectors,
+        dropping the other profiles' indexes.
+
+        Returns:
+            Number of IVF lists in the new index
+        """
+        return self._client.rpc(
+            "rebuild_chunk_embedding_index", {"profile": profile}).execute().data
 
     # -------------------------------------------------------------------------
     # High-Level Operations
@@ -314,6 +526,8 @@ class SupabaseClient:
         embeddings: list[list[float]],
         file_size: int | None = None,
         metadata: dict | None = None,
+        content: str | None = None,
+        content_storage: str = CHUNK_CONTENT_STORAGE,
     ) -> str:
         """
         High-level function to insert a file and its chunks in one operation.
@@ -321,6 +535,11 @@ class SupabaseClient:
         Checks if file already exists (by hash), inserts file record,
         inserts all chunks with embeddings, and updates status to completed.
 
+        With content_storage="reference", the source text is stored once in
+        file_contents and chunks keep only their offsets. This needs the
+        text the offsets point into and offsets on every chunk; otherwise
+        chunks are stored inline.
+
         Args:
             file_path: Full path to the file
             file_name: Name of the file
@@ -331,6 +550,8 @@ class SupabaseClient:
             embeddings: List of embedding vectors
             file_size: Size in bytes
             metadata: Additional metadata
+            content: Source text the chunks' char offsets point into
+            content_storage: "inline" or "reference" (see CHUNK_CONTENT_STORAGE)
 
         Returns:
             The UUID of the file record
@@ -338,9 +559,18 @@ class SupabaseClient:
         Raises:
             ValueError: If file already exists
         """
+        if content_storage not in CONTENT_STORAGE_MODES:
+            raise ValueError(
+                f"Unknown content storage '{content_storage}', expected one of {CONTENT_STORAGE_MODES}")
         if self.file_exists(file_hash=file_hash):
             raise ValueError(f"File with hash {file_hash} already exists")
 
+        by_reference = (
+            content_storage == "reference"
+            and content is not None
+            and all(has_offsets(chunk) for chunk in chunks)
+        )
+
         file_id = self.insert_file(
             file_path=file_path,
             file_name=file_name,
@@ -351,21 +581,26 @@ class SupabaseClient:
             metadata=metadata,
         )
 
-        self.insert_chunks(file_id, chunks, embeddings)
+        if by_reference:
+            self.insert_file_content(file_id, content)
+        self.insert_chunks(file_id, chunks, embeddings,
+                           content_by_reference=by_reference,
+                           file={"file_name": file_name, "file_path": file_path, "mime_type": mime_type})
         self.update_file_status(file_id, "completed", datetime.now())
 
         return file_id
 
     # query function given text prompt
 
-    def query_files(self, query: str, match_threshold: float = DEFAULT_MATCH_THRESHOLD, match_count: int = 10, archived_folders: list[str] = None) -> list[dict]:
+    def query_files(self, query: str, match_threshold: float = DEFAULT_MATCH_THRESHOLD, match_count: int = 10, archived_folders: list[str] = None, search_mode: str = VECTOR_SEARCH_MODE) -> list[dict]:
         """Query the database for matching file chunks, excluding archived folders.
 
         Args:
             query: Natural language search query
             match_threshold: Minimum similarity score (0-1)
             match_count: Maximum number of results
-            archived_folders: List of folder paths to exclude from results (filtering done in DB)
+            archived_folders: List of folder paths to exclude from results (filtering done in the vector store)
+            search_mode: "ann" or "binary_rerank" (see VECTOR_SEARCH_MODE; Supabase vector store only)
         Returns:
             List of matching chunk records
         """
@@ -375,19 +610,16 @@ class SupabaseClient:
         # Generate embedding for query
         query_embedding = get_embedding(query)
 
-        # Call the database function with archived folders filter
-        # The SQL function will filter out any files whose path starts with archived folders
-        result = self._client.rpc(
-            "query_file_chunks",
-            {
-                "query_embedding": query_embedding,
-                "match_threshold": match_threshold,
-                "match_count": match_count,
-                "archived_folders": archived_folders or [],
-            }
-        ).execute()
+        # Search the configured vector store (see VECTOR_STORE), excluding archived folders
+        results = self._vector_store.search(
+            query_embedding,
+            match_threshold=match_threshold,
+            match_count=match_count,
+            archived_folders=archived_folders,
+            search_mode=search_mode,
+        )
 
-        return result.data or []
+        return self._hydrate_chunks(results)
 
 # Convenience function to get the singleton instance
 
@@ -0,0 +1,248 @@
+# This utility file is a size-bounded disk cache of extraction artifacts keyed by file content hash.
+# Ingestion writes what it extracts (PDF text and page map, image captions, audio
+# transcripts) and later readers such as /summarize-file/ reuse it instead of re-running
+# PyMuPDF, BLIP or Whisper on the same bytes.
+#
+# Layout: <directory>/<hash[:2]>/<hash>.<kind>, one file per artifact. When the cache
+# grows past max_bytes, the least recently used artifacts are deleted.
+#
+# Several processes (the API server, seed_database) share the directory. An artifact
+# another process wrote is adopted on first read; after every write the index is re-read
+# from disk under an exclusive lock file, so eviction sees every process's artifacts and
+# the size bound holds across processes. File mtimes record the shared LRU order.
+
+import os
+import json
+import fcntl
+import threading
+from contextlib import contextmanager
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+from lib.constants import ARTIFACT_CACHE_ENABLED, ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES
+from lib.util.folder_extraction import hash_file
+
+
+class ArtifactCache:
+    """Content-addressed artifact files with least-recently-used eviction."""
+
+    def __init__(
+        self,
+        directory: Path | str = ARTIFACT_CACHE_DIR,
+        max_bytes: int = ARTIFACT_CACHE_MAX_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock_path = self.directory / ".lock"
+
+        self._lock = threading.Lock()
+        # path -> size in bytes, least recently used first
+        self._entries: OrderedDict[Path, int] = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._file_lock():
+            self._load_entries()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared with other processes using the directory."""
+        with self._lock_path.open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load_entries(self) -> None:
+        """Index the artifacts on disk, ordered by last access (mtime)."""
+        files = []
+        for path in self.directory.glob("*/*"):
+            if path.name.endswith(".tmp"):
+                if _is_stale_tmp(path):
+                    path.unlink(missing_ok=True)  # left behind by an interrupted write
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # deleted by another process in the meantime
+                continue
+            files.append((stat.st_mtime, path, stat.st_size))
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._total_bytes += size
+
+    def _path(self, key: str, kind: str) -> Path:
+        return self.directory / key[:2] / f"{key}.{kind}"
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_path(self, key: str, kind: str) -> Path | None:
+        """
+        Path of a cached artifact, marking it as recently used.
+
+        Returns:
+            The artifact's path, or None if it is not cached
+        """
+        path = self._path(key, kind)
+        with self._lock:
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                self._forget(path)
+                self.misses += 1
+                return None
+            if path not in self._entries:
+                # Written by another process since the index was read
+                self._entries[path] = size
+                self._total_bytes += size
+            self._entries.move_to_end(path)
+            self.hits += 1
+        # mtime records the access order across processes and restarts
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # evicted by another process in the meantime
+            return None
+        return path
+
+    def get_bytes(self, key: str, kind: str) -> bytes | None:
+        path = self.get_path(key, kind)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:  # evicted by another process in the meantime
+            return None
+
+    def put_bytes(self, key: str, kind: str, data: bytes) -> Path:
+        """Store an artifact, replacing any previous version, and evict if over budget."""
+        return self._put(key, kind, lambda tmp_path: tmp_path.write_bytes(data))
+
+    def _put(self, key: str, kind: str, write: Callable[[Path], Any]) -> Path:
+        path = self._path(key, kind)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)  # readers never see a partial file
+
+        # Other processes write here too: evict against what is on disk
+        with self._lock, self._file_lock():
+            self._load_entries()
+            self._evict()
+        return path
+
+    def get_json(self, key: str, kind: str) -> Any | None:
+        data = self.get_bytes(key, f"{kind}.json")
+        return json.loads(data) if data is not None else None
+
+    def put_json(self, key: str, kind: str, value: Any) -> Path:
+        return self.put_bytes(key, f"{kind}.json", json.dumps(value).encode("utf-8"))
+
+    def get_array(self, key: str, kind: str) -> np.ndarray | None:
+        """
+        Memory-map a cached array without reading it.
+
+        The map is copy-on-write: the array is writable, but changes stay
+        in this process and never reach the file.
+        """
+        path = self.get_path(key, f"{kind}.npy")
+        if path is None:
+            return None
+        try:
+            return np.load(path, mmap_mode="c")
+        except FileNotFoundError:  # evicted by another process in the meantime
+            return None
+
+    def put_array(self, key: str, kind: str, array: np.ndarray) -> Path:
+        """Store an array as .npy, written straight to disk."""
+        def write(tmp_path: Path) -> None:
+            with tmp_path.open("wb") as f:
+                np.save(f, array)
+        return self._put(key, f"{kind}.npy", write)
+
+    def delete(self, key: str, kind_prefix: str = "") -> int:
+        """
+        Delete the artifacts of a key whose kind starts with kind_prefix.
+
+        Returns:
+            Number of artifacts deleted
+        """
+        deleted = 0
+        with self._lock:
+            for path in (self.directory / key[:2]).glob(f"{key}.{kind_prefix}*"):
+                if path.name.endswith(".tmp"):
+                    continue
+                self._forget(path)
+                path.unlink(missing_ok=True)
+                deleted += 1
+        return deleted
+
+    def _forget(self, path: Path) -> None:
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self) -> None:
+        """Delete least recently used artifacts until the cache fits max_bytes."""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            path.unlink(missing_ok=True)
+
+
+def _is_stale_tmp(path: Path) -> bool:
+    """Whether a temporary file's writer (the pid in its name) is gone."""
+    try:
+        os.kill(int(path.name.rsplit(".", 2)[-2]), 0)
+    except (ValueError, IndexError, ProcessLookupError):
+        return True
+    except PermissionError:
+        pass  # alive, owned by another user
+    return False
+
+
+_cache: ArtifactCache | None = None
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """Lazy open the artifact cache."""
+    global _cache
+    if _cache is None:
+        _cache = ArtifactCache()
+    return _cache
+
+
+def cached_json_artifact(
+    file_path: str,
+    kind: str,
+    compute: Callable[[], Any],
+    file_hash: str | None = None,
+) -> Any:
+    """
+    Get a JSON artifact of a file from the cache, computing and storing it on a miss.
+
+    Args:
+        file_path: File the artifact is derived from
+        kind: Artifact name, e.g. "pdf_text" (include any parameters that change it)
+        compute: Produces the artifact from the file
+        file_hash: SHA-256 of the file, if already known (hashed otherwise)
+    """
+    if not ARTIFACT_CACHE_ENABLED:
+        return compute()
+
+    cache = get_artifact_cache()
+    key = file_hash or hash_file(file_path)
+    value = cache.get_json(key, kind)
+    if value is None:
+        value = compute()
+        cache.put_json(key, kind, value)
+    return value
@@ -0,0 +1,50 @@
+# This utility file stores chunk text by reference instead of inline.
+# The source text of a file is kept once, zlib-compressed, in file_contents, and each
+# chunk row keeps only its char_start/char_end offsets into it. Overlapping chunks then
+# cost a few bytes of metadata instead of a full copy of their text.
+
+import zlib
+
+CONTENT_STORAGE_MODES = ("inline", "reference")
+
+
+def encode_content(text: str) -> str:
+    """Compress text into a bytea literal (hex format) for PostgREST."""
+    return "\\x" + zlib.compress(text.encode("utf-8"), 9).hex()
+
+
+def decode_content(value: str) -> str:
+    """Inverse of encode_content for a bytea value read back from PostgREST."""
+    return zlib.decompress(bytes.fromhex(value.removeprefix("\\x"))).decode("utf-8")
+
+
+def has_offsets(chunk: dict) -> bool:
+    """Whether a chunk records where its text lies in the source."""
+    metadata = chunk.get("chunk_metadata") or {}
+    return "char_start" in metadata and "char_end" in metadata
+
+
+def hydrate_chunks(rows: list[dict], source_texts: dict[str, str]) -> list[dict]:
+    """
+    Fill in the content of chunks stored by reference, in place.
+
+    The snippet is the exact source text between the chunk's offsets, so its
+    whitespace follows the source rather than the single spaces the chunker
+    joins sentences with.
+
+    Args:
+        rows: Chunk rows with 'file_id', 'content' and 'chunk_metadata'
+        source_texts: Decompressed source text by file ID
+
+    Returns:
+        The same rows
+    """
+    for row in rows:
+        if row.get("content") is not None:
+            continue
+        text = source_texts.get(row["file_id"])
+        if text is None:
+            continue
+        metadata = row["chunk_metadata"]
+        row["content"] = text[metadata["char_start"]:metadata["char_end"]]
+    return rows
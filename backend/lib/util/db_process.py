@@ -1,12 +1,17 @@
-from lib.constants import SUPPORTED_MIME_TYPES
-from lib.util.preprocessing.image import generateImageCaption
-from lib.util.preprocessing.pdf import extract_pdf_text
+from lib.constants import SUPPORTED_MIME_TYPES, EMBEDDING_POOL_MIN_FILES, IMAGE_DEDUP_ENABLED, IMAGE_DEDUP_MAX_DISTANCE
+from lib.util.preprocessing.image import generateImageCaption, generateImageCaptions
+from lib.util.preprocessing.image_hash import PerceptualHashIndex, perceptual_hash, format_hash
+from lib.util.preprocessing.pdf import extract_pdf_document
 from lib.util.preprocessing.audio import transcribe_audio
-from lib.supabase.util import get_supabase_client
+from lib.database import get_database_client
 from lib.util.folder_extraction import get_valid_file_from_folder, getFileProperties, read_text_file_content
 from lib.util.embedding import get_embeddings
-from lib.util.preprocessing.semantic_chunking import semantic_chunk_text
+from lib.util.embedding_pool import bulk_embedding
+from lib.util.preprocessing.semantic_chunking import iter_semantic_chunks
 import sys
+import json
+import mimetypes
+from contextlib import nullcontext
 from pathlib import Path
 from pydantic import FilePath
 
@@ -21,14 +26,29 @@ AUDIO_MIME_TYPES = {
     'audio/x-m4a',
 }
 
+IMAGE_MIME_TYPES = {'image/jpeg', 'image/png'}
+
 # Add backend directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
-def process_image_file(file_path: str, file_props, client):
-    """Process an image file: generate caption, generate embedding, and insert to DB."""
-    caption = generateImageCaption(file_path)
-    embedding = get_embeddings([caption])
+def process_image_file(
+    file_path: str,
+    file_props,
+    client,
+    caption: str | None = None,
+    embedding: list[float] | None = None,
+    phash: int | None = None,
+    duplicate_of: dict | None = None,
+):
+    """Process an image file: generate caption and embedding (unless given), and insert to DB.
+
+    phash and duplicate_of (the near-duplicate this image reuses the caption of)
+    are recorded in the file's metadata.
+    """
+    if caption is None:
+        caption = generateImageCaption(file_path, file_props.file_hash)
+    embedding = [embedding] if embedding is not None else get_embeddings([caption])
 
     # Since image captions are very small, we use a single chunk
     chunks_data = [
@@ -46,6 +66,10 @@ def process_image_file(file_path: str, file_props, client):
         "char_count": len(caption),
         "format": "image"
     }
+    if phash is not None:
+        metadata["phash"] = format_hash(phash)
+    if duplicate_of is not None:
+        metadata["duplicate_of"] = duplicate_of
 
     file_id = client.process_file(
         file_path=file_props.path,
@@ -63,7 +87,7 @@ def process_image_file(file_path: str, file_props, client):
 
 def process_audio_file(file_path: str, file_props, client):
     """Process an audio file: transcribe, chunk, generate embeddings, and insert to DB."""
-    chunks_data = transcribe_audio(file_path)
+    chunks_data = transcribe_audio(file_path, file_props.file_hash)
 
     # Extract content for embedding generation
     contents = [chunk["content"] for chunk in chunks_data]
@@ -96,16 +120,16 @@ def process_audio_file(file_path: str, file_props, client):
 def process_text_file(file_path: str, file_props, client):
     """Process a text file: read, chunk semantically, generate embeddings, and insert to DB."""
     contents = read_text_file_content(file_path)
-    chunks = semantic_chunk_text(contents)
-    embeddings = get_embeddings(chunks)
+    chunks = list(iter_semantic_chunks([contents]))
+    embeddings = get_embeddings([chunk.content for chunk in chunks])
 
     chunks_data = [
         {
             "chunk_index": i,
-            "content": chunk.get("text") if isinstance(chunk, dict) else chunk,
+            "content": chunk.content,
             "chunk_metadata": {
-                "char_start": chunk.get("start", 0) if isinstance(chunk, dict) else 0,
-                "char_end": chunk.get("end", len(chunk.get("text", chunk))) if isinstance(chunk, dict) else len(chunk)
+                "char_start": chunk.char_start,
+                "char_end": chunk.char_end,
             }
         }
         for i, chunk in enumerate(chunks)
@@ -125,14 +149,16 @@ def process_text_file(file_path: str, file_props, client):
         chunks=chunks_data,
         embeddings=embeddings,
         file_size=file_props.file_size,
-        metadata=metadata
+        metadata=metadata,
+        content=contents,
     )
     return file_id
 
 
 def process_pdf_file(file_path: str, file_props, client):
     """Process a PDF file: extract text with page metadata, generate embeddings, and insert to DB."""
-    chunks = extract_pdf_text(Path(file_path))
+    chunks, full_text = extract_pdf_document(
+        Path(file_path), file_props.file_hash)
     # Already has chunk_index and chunk_metadata (page info)
     chunks_data = chunks
 
@@ -160,10 +186,74 @@ def process_pdf_file(file_path: str, file_props, client):
         chunks=chunks_data,
         embeddings=embeddings,
         file_size=file_props.file_size,
-        metadata=metadata
+        metadata=metadata,
+        content=full_text,
     )
     return file_id
 
+
+def load_image_hash_index(client) -> PerceptualHashIndex:
+    """Index the perceptual hashes of indexed images that are not duplicates themselves."""
+    index = PerceptualHashIndex()
+    for file in client.get_all_files():
+        metadata = file.get("metadata") or {}
+        if metadata.get("phash") and not metadata.get("duplicate_of"):
+            index.add(int(metadata["phash"], 16), {
+                "file_id": file["id"],
+                "file_path": file["file_path"],
+                "file_hash": file["file_hash"],
+            })
+    return index
+
+
+def find_image_duplicates(file_props_by_path: dict, client) -> tuple[dict, dict]:
+    """
+    Match new images against indexed images, and each other, by perceptual hash.
+
+    Images are visited in the order of file_props_by_path, the order push_to_db
+    inserts them, so a new original comes before its duplicates.
+
+    Returns:
+        Tuple of (phashes, duplicates): the hash of each image that could be
+        hashed, and for near-duplicates a (original entry, distance) tuple.
+        The original is an indexed file (with file_id) or an earlier new image.
+        Flat images get no hash and are never duplicates.
+    """
+    index = load_image_hash_index(client)
+    phashes = {}
+    duplicates = {}
+    for file_path in file_props_by_path:
+        try:
+            phash = perceptual_hash(file_path)
+        except Exception:
+            continue  # captioning reports unreadable images
+        if phash is None:
+            continue
+        phashes[file_path] = phash
+        match = index.find(phash, IMAGE_DEDUP_MAX_DISTANCE)
+        if match is not None:
+            duplicates[file_path] = match
+        else:
+            index.add(phash, {
+                "file_id": None,
+                "file_path": file_path,
+                "file_hash": file_props_by_path[file_path].file_hash,
+            })
+    return phashes, duplicates
+
+
+def _original_caption(client, original: dict, captions: dict) -> tuple[str | None, list[float] | None]:
+    """Caption and embedding of a duplicate's original, if they are available."""
+    if original["file_id"] is None:
+        # New in this run: its caption is in this batch, its embedding in the embedding store
+        return captions.get(original["file_path"]), None
+    chunks = client.get_chunks(original["file_id"])
+    if not chunks:
+        return None, None
+    embedding = chunks[0].get("embedding")
+    # pgvector values come back in their text form, e.g. "[0.1,0.2]"
+    return chunks[0]["content"], json.loads(embedding) if embedding else None
+
 #
 # insertions into db
 
@@ -172,11 +262,14 @@ def push_to_db(folder_path: str) -> dict:
     """Process files from folder and return summary with failed files.
 
     Returns:
-        dict: Contains processed count, failed files list with error messages, and status
+        dict: Contains processed count, failed files list with error messages, status,
+            and the processed files (id, path, name, hash) for later stages
     """
-    client = get_supabase_client()
+    client = get_database_client()
     failed_files = []
+    processed_files = []
     processed_count = 0
+    inserted_hashes = set()
 
     filtered_files = get_valid_file_from_folder(
         # THIS IS CURRENTLY HARD-CODED, CHANGE THIS LATER
@@ -192,43 +285,127 @@ def push_to_db(folder_path: str) -> dict:
             "status": "success",
             "processed_count": 0,
             "failed_files": [],
+            "processed_files": [],
             "message": "No files found to process"
         }
 
-    for file_path in filtered_files:
-        try:
-            # Get file properties
-            file_props = getFileProperties(file_path)
+    # Large jobs spread embedding over a process pool that exits when done
+    embedding_context = (
+        bulk_embedding()
+        if len(filtered_files) >= EMBEDDING_POOL_MIN_FILES
+        else nullcontext()
+    )
 
-            # Check if file already exists (by hash)
+    # Caption new images up front in batches, so BLIP runs once per batch rather than per file
+    # The main loop reuses these properties and existence checks for images
+    file_props_by_path, existing_hashes = {}, set()
+    for file_path in filtered_files:
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if mime_type in IMAGE_MIME_TYPES:
+            try:
+                file_props = getFileProperties(file_path)
+            except Exception:
+                continue  # reported by the main loop
+            file_props_by_path[file_path] = file_props
             if client.file_exists(file_hash=file_props.file_hash):
-                print(f"Skipping {file_path} - already exists in database")
-                continue
-
-            # Process based on file type
-            if file_props.mime_type == 'application/pdf':
-                file_id = process_pdf_file(file_path, file_props, client)
-            elif file_props.mime_type in ('image/jpeg', 'image/png'):
-                file_id = process_image_file(file_path, file_props, client)
-            elif file_props.mime_type in AUDIO_MIME_TYPES:
-                file_id = process_audio_file(file_path, file_props, client)
-            else:
-                file_id = process_text_file(file_path, file_props, client)
-
-            print(f"✓ Successfully processed {file_path} (ID: {file_id})")
-            processed_count += 1
+                existing_hashes.add(file_props.file_hash)
+    new_images = {path: props for path, props in file_props_by_path.items()
+                  if props.file_hash not in existing_hashes}
+    # Near-duplicates of an indexed or earlier image are not captioned again
+    phashes, duplicates = {}, {}
+    if IMAGE_DEDUP_ENABLED and new_images:
+        try:
+            phashes, duplicates = find_image_duplicates(new_images, client)
         except Exception as e:
-            error_msg = str(e)
-            print(f"✗ Failed to process {file_path}: {error_msg}")
-            failed_files.append({
-                "file_path": file_path,
-                "error": error_msg
-            })
+            print(f"⚠️  Image deduplication failed, captioning every image: {e}")
+    originals = {path: props for path, props in new_images.items()
+                 if path not in duplicates}
+    captions = {}
+    if originals:
+        try:
+            captions = generateImageCaptions(
+                list(originals),
+                [file_props.file_hash for file_props in originals.values()],
+            )
+        except Exception as e:
+            # Images without a caption are captioned one by one in the main loop,
+            # so a failure is recorded against the file that causes it
+            print(f"⚠️  Batch captioning failed, captioning images one by one: {e}")
+    if duplicates:
+        print(f"Reusing captions for {len(duplicates)} near-duplicate images")
+
+    with embedding_context:
+        for file_path in filtered_files:
+            try:
+                # Get file properties
+                file_props = file_props_by_path.get(
+                    file_path) or getFileProperties(file_path)
+
+                # Check if file already exists (by hash). Images were checked
+                # in the pre-pass; copies inserted since are in inserted_hashes
+                if file_path in file_props_by_path:
+                    exists = (file_props.file_hash in existing_hashes
+                              or file_props.file_hash in inserted_hashes)
+                else:
+                    exists = client.file_exists(file_hash=file_props.file_hash)
+                if exists:
+                    print(f"Skipping {file_path} - already exists in database")
+                    continue
+
+                # Process based on file type
+                if file_props.mime_type == 'application/pdf':
+                    file_id = process_pdf_file(file_path, file_props, client)
+                elif file_props.mime_type in IMAGE_MIME_TYPES:
+                    caption, embedding, duplicate_of = captions.get(file_path), None, None
+                    original, distance = duplicates.get(file_path, (None, None))
+                    # An original new in this run is only reused once it is in the database
+                    if original is not None and (
+                        original["file_id"] is not None or original["file_hash"] in inserted_hashes
+                    ):
+                        caption, embedding = _original_caption(
+                            client, original, captions)
+                        if caption is not None:
+                            duplicate_of = {
+                                "file_hash": original["file_hash"],
+                                "file_path": original["file_path"],
+                                "distance": distance,
+                            }
+                    file_id = process_image_file(
+                        file_path,
+                        file_props,
+                        client,
+                        caption,
+                        embedding,
+                        phash=phashes.get(file_path),
+                        duplicate_of=duplicate_of,
+                    )
+                elif file_props.mime_type in AUDIO_MIME_TYPES:
+                    file_id = process_audio_file(file_path, file_props, client)
+                else:
+                    file_id = process_text_file(file_path, file_props, client)
+
+                print(f"✓ Successfully processed {file_path} (ID: {file_id})")
+                processed_count += 1
+                inserted_hashes.add(file_props.file_hash)
+                processed_files.append({
+                    "file_id": file_id,
+                    "file_path": file_path,
+                    "file_name": file_props.file_name,
+                    "file_hash": file_props.file_hash,
+                })
+            except Exception as e:
+                error_msg = str(e)
+                print(f"✗ Failed to process {file_path}: {error_msg}")
+                failed_files.append({
+                    "file_path": file_path,
+                    "error": error_msg
+                })
 
     return {
         "status": "success" if not failed_files else "partial",
         "processed_count": processed_count,
         "failed_files": failed_files,
+        "processed_files": processed_files,
         "total_attempted": len(filtered_files)
     }
 
@@ -2,7 +2,11 @@
 
 from sentence_transformers import SentenceTransformer
 
-from lib.constants import EMBEDDING_MODEL, EMBEDDING_DIMENSION
+import numpy as np
+
+from lib.constants import EMBEDDING_MODEL, EMBEDDING_DIMENSION, EMBEDDING_POOL_MIN_TEXTS, EMBEDDING_STORE_ENABLED
+from lib.util.embedding_pool import get_active_pool
+from lib.util.embedding_store import get_embedding_store
 
 # Load model once at module level for efficiency
 _model: SentenceTransformer | None = None
@@ -31,19 +35,83 @@ def get_embedding(text: str) -> list[float]:
     return embedding.tolist()
 
 
+def get_token_budget() -> int:
+    """
+    Number of text tokens the embedding model reads before truncating.
+
+    This is the model's max_seq_length (384 for all-mpnet-base-v2) minus the
+    special tokens the tokenizer adds around every input.
+    """
+    model = _get_model()
+    return model.max_seq_length - model.tokenizer.num_special_tokens_to_add()
+
+
+def count_tokens(texts: list[str]) -> list[int]:
+    """Number of embedding-model tokens in each text, without special tokens."""
+    if not texts:
+        return []
+    encoded = _get_model().tokenizer(
+        texts, add_special_tokens=False, truncation=False)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def split_by_tokens(text: str, max_tokens: int) -> list[tuple[int, int]]:
+    """
+    Split text into pieces of at most max_tokens embedding-model tokens.
+
+    Returns:
+        (start, end) character offsets of each piece in text
+    """
+    offsets = _get_model().tokenizer(
+        text, add_special_tokens=False, truncation=False,
+        return_offsets_mapping=True)["offset_mapping"]
+    if len(offsets) <= max_tokens:
+        return [(0, len(text))]
+    return [
+        (offsets[i][0], offsets[min(i + max_tokens, len(offsets)) - 1][1])
+        for i in range(0, len(offsets), max_tokens)
+    ]
+
+
 def get_embeddings(texts: list[str]) -> list[list[float]]:
     """
     Generate embeddings for multiple texts in a batch (more efficient).
 
+    Texts already in the local embedding store are read from disk; the
+    rest are computed and written through to it. Inside a bulk_embedding()
+    block, large batches are spread over the multi-process embedding pool.
+
     Args:
         texts: List of texts to embed
 
     Returns:
         List of embeddings, each with length EMBEDDING_DIMENSION (512)
     """
+    if not EMBEDDING_STORE_ENABLED:
+        return _compute_embeddings(texts).tolist()
+
+    store = get_embedding_store()
+    embeddings = store.get_many(texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        computed = _compute_embeddings(missing_texts)
+        store.put_many(missing_texts, computed)
+        for i, embedding in zip(missing, computed):
+            embeddings[i] = embedding
+
+    return [embedding.tolist() for embedding in embeddings]
+
+
+def _compute_embeddings(texts: list[str]) -> np.ndarray:
+    """Run the embedding model, through the process pool when one is active."""
+    pool = get_active_pool()
+    if pool is not None and len(texts) >= EMBEDDING_POOL_MIN_TEXTS:
+        return pool.encode(texts)
+
     model = _get_model()
-    embeddings = model.encode(texts, convert_to_numpy=True)
-    return embeddings.tolist()
+    return model.encode(texts, convert_to_numpy=True)
 
 
 if __name__ == "__main__":
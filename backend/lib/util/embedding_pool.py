@@ -0,0 +1,177 @@
+# This utility file runs sentence-transformers encoding across a pool of worker processes.
+# One PyTorch process does not scale linearly with cores, so bulk ingestion shards its
+# inputs over several processes, each holding its own copy of the model with a fixed
+# number of intra-op threads.
+
+import os
+import math
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+import numpy as np
+
+from lib.constants import (
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_POOL_IDLE_TIMEOUT_SEC,
+    EMBEDDING_POOL_THREADS_PER_WORKER,
+)
+
+# Model held by each worker process (set by _init_worker)
+_worker_model = None
+
+
+def _init_worker(model_name: str, num_threads: int) -> None:
+    """Load the model once per worker and pin its thread counts."""
+    global _worker_model
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(num_threads)
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_shard(texts: list[str], batch_size: int) -> np.ndarray:
+    return _worker_model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    ).astype(np.float32)
+
+
+class EmbeddingPool:
+    """Pool of worker processes that each hold the embedding model."""
+
+    def __init__(
+        self,
+        num_workers: int | None = None,
+        threads_per_worker: int = EMBEDDING_POOL_THREADS_PER_WORKER,
+        idle_timeout: float = EMBEDDING_POOL_IDLE_TIMEOUT_SEC,
+        model_name: str = EMBEDDING_MODEL,
+    ):
+        if num_workers is None:
+            num_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker
+        self.idle_timeout = idle_timeout
+        self.model_name = model_name
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._idle_timer: threading.Timer | None = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the workers on first use (or after an idle shutdown)."""
+        if self._executor is None:
+            print(f"Starting embedding pool: {self.num_workers} workers x "
+                  f"{self.threads_per_worker} threads")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                # fork is unsafe once torch has started its thread pools
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.threads_per_worker),
+            )
+        return self._executor
+
+    def _reset_idle_timer(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._generation += 1
+        self._idle_timer = threading.Timer(
+            self.idle_timeout, self._on_idle, args=(self._generation,))
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _on_idle(self, generation: int) -> None:
+        with self._lock:
+            # A timer that fired while encode() held the lock is stale
+            if generation != self._generation:
+                return
+            # Under the same lock, so an encode() cannot start in between
+            self._shutdown_locked()
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Embed texts across the worker processes.
+
+        Inputs are split into contiguous shards, one per worker, and the
+        results are concatenated back in input order.
+
+        Returns:
+            Array of shape (len(texts), EMBEDDING_DIMENSION)
+        """
+        if not texts:
+            return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+
+        shard_size = max(batch_size, math.ceil(len(texts) / self.num_workers))
+        shards = [texts[i:i + shard_size]
+                  for i in range(0, len(texts), shard_size)]
+
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+            executor = self._get_executor()
+            # map yields results in submission order
+            results = list(executor.map(
+                _encode_shard, shards, [batch_size] * len(shards)))
+            self._reset_idle_timer()
+
+        return np.concatenate(results, axis=0)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes. They restart on the next encode."""
+        with self._lock:
+            self._shutdown_locked()
+
+    def _shutdown_locked(self) -> None:
+        """shutdown() for callers that already hold self._lock."""
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if self._executor is not None:
+            print("Shutting down embedding pool")
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_pool: EmbeddingPool | None = None
+
+
+def get_active_pool() -> EmbeddingPool | None:
+    """Get the pool of the running bulk-embedding job, if any."""
+    return _pool
+
+
+@contextmanager
+def bulk_embedding(
+    num_workers: int | None = None,
+    threads_per_worker: int = EMBEDDING_POOL_THREADS_PER_WORKER,
+) -> Iterator[EmbeddingPool]:
+    """
+    Route large get_embeddings calls through a process pool for the duration of the block.
+
+    Usage:
+        with bulk_embedding():
+            ...ingest files...
+    """
+    global _pool
+    if _pool is not None:
+        # Nested jobs share the outer pool
+        yield _pool
+        return
+
+    _pool = EmbeddingPool(num_workers, threads_per_worker)
+    try:
+        yield _pool
+    finally:
+        _pool.shutdown()
+        _pool = None
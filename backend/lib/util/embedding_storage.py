@@ -0,0 +1,196 @@
+# This utility file maps full-precision embeddings onto the configured storage profile.
+# See EMBEDDING_STORAGE_PROFILE in lib/constants.py for the available profiles.
+
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+
+from lib.constants import (
+    BINARY_CANDIDATE_MULTIPLIER,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_PCA_DIMENSION,
+    EMBEDDING_PCA_PATH,
+    EMBEDDING_STORAGE_PROFILE,
+    VECTOR_SEARCH_MODE,
+)
+
+STORAGE_PROFILES = ("full", "halfvec", "pca")
+SEARCH_MODES = ("ann", "binary_rerank")
+
+# Database function used to search each profile
+PROFILE_QUERY_FUNCTIONS = {
+    "full": "query_file_chunks",
+    "halfvec": "query_file_chunks_half",
+    "pca": "query_file_chunks_pca",
+}
+
+
+@dataclass
+class PCAProjection:
+    """Linear projection fitted on the corpus embeddings."""
+    mean: np.ndarray        # (EMBEDDING_DIMENSION,)
+    components: np.ndarray  # (n_components, EMBEDDING_DIMENSION)
+    explained_variance_ratio: float
+
+    @property
+    def dimension(self) -> int:
+        return self.components.shape[0]
+
+    def project(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Project embeddings onto the principal components.
+
+        Output rows are L2-normalized so cosine distance stays meaningful
+        after the dimensionality reduction.
+        """
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        reduced = (embeddings - self.mean) @ self.components.T
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return reduced / norms
+
+    def save(self, path: Path | str = EMBEDDING_PCA_PATH) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            mean=self.mean,
+            components=self.components,
+            explained_variance_ratio=self.explained_variance_ratio,
+        )
+
+    @classmethod
+    def load(cls, path: Path | str = EMBEDDING_PCA_PATH) -> "PCAProjection":
+        path = Path(path)
+        if not path.exists():
+            raise ValueError(
+                f"No PCA projection at {path}. "
+                "Run `python -m lib.scripts.migrate_embedding_storage --profile pca` first.")
+        data = np.load(path)
+        return cls(
+            mean=data["mean"],
+            components=data["components"],
+            explained_variance_ratio=float(data["explained_variance_ratio"]),
+        )
+
+
+def fit_pca(
+    embeddings: np.ndarray,
+    n_components: int = EMBEDDING_PCA_DIMENSION,
+    max_samples: int = 50_000,
+    seed: int = 0,
+) -> PCAProjection:
+    """
+    Fit a PCA projection on a sample of corpus embeddings.
+
+    Args:
+        embeddings: Array of shape (n, EMBEDDING_DIMENSION)
+        n_components: Target dimension
+        max_samples: Upper bound on rows used for the fit (randomly sampled)
+        seed: Seed for the sampling
+
+    Returns:
+        The fitted PCAProjection
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2 or embeddings.shape[1] != EMBEDDING_DIMENSION:
+        raise ValueError(
+            f"Expected embeddings of shape (n, {EMBEDDING_DIMENSION}), got {embeddings.shape}")
+    if len(embeddings) < n_components:
+        raise ValueError(
+            f"Need at least {n_components} embeddings to fit PCA, got {len(embeddings)}")
+
+    if len(embeddings) > max_samples:
+        rng = np.random.default_rng(seed)
+        embeddings = embeddings[rng.choice(
+            len(embeddings), max_samples, replace=False)]
+
+    mean = embeddings.mean(axis=0)
+    # Rows of vt are the principal axes, ordered by singular value
+    _, singular_values, vt = np.linalg.svd(
+        embeddings - mean, full_matrices=False)
+    variance = singular_values ** 2
+    explained = float(variance[:n_components].sum() / variance.sum())
+
+    return PCAProjection(
+        mean=mean,
+        components=vt[:n_components].astype(np.float32),
+        explained_variance_ratio=explained,
+    )
+
+
+_projection: PCAProjection | None = None
+
+
+def _get_projection() -> PCAProjection:
+    """Lazy load the PCA projection."""
+    global _projection
+    if _projection is None:
+        _projection = PCAProjection.load()
+    return _projection
+
+
+def _check_profile(profile: str) -> None:
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(
+            f"Unknown embedding storage profile '{profile}', expected one of {STORAGE_PROFILES}")
+
+
+def storage_columns(
+    embeddings: list[list[float]],
+    profile: str = EMBEDDING_STORAGE_PROFILE,
+) -> list[dict]:
+    """
+    Build the per-row embedding columns to insert for a storage profile.
+
+    The full-precision column is always included; the profile's compact
+    column is added next to it. Other profiles' columns are left NULL and
+    filled by migrate_embedding_storage when switching to them.
+
+    Returns:
+        One dict of column values per embedding
+    """
+    _check_profile(profile)
+    rows = [{"embedding": embedding} for embedding in embeddings]
+
+    if profile == "halfvec":
+        # Postgres casts the float list to halfvec on insert
+        for row, embedding in zip(rows, embeddings):
+            row["embedding_half"] = embedding
+    elif profile == "pca" and embeddings:
+        reduced = _get_projection().project(np.asarray(embeddings))
+        for row, vector in zip(rows, reduced.tolist()):
+            row["embedding_pca"] = vector
+
+    return rows
+
+
+def query_function_args(
+    query_embedding: list[float],
+    profile: str = EMBEDDING_STORAGE_PROFILE,
+    search_mode: str = VECTOR_SEARCH_MODE,
+) -> tuple[str, dict]:
+    """
+    Get the database function name and its vector arguments.
+
+    The binary rerank path always searches the full-precision column, so it
+    ignores the storage profile.
+
+    Returns:
+        Tuple of (function_name, params) where params holds query_embedding
+        (projected for the profile) plus any access-path specific arguments
+    """
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(
+            f"Unknown vector search mode '{search_mode}', expected one of {SEARCH_MODES}")
+    if search_mode == "binary_rerank":
+        return "query_file_chunks_binary", {
+            "query_embedding": query_embedding,
+            "candidate_multiplier": BINARY_CANDIDATE_MULTIPLIER,
+        }
+
+    _check_profile(profile)
+    if profile == "pca":
+        query_embedding = _get_projection().project(
+            np.asarray(query_embedding))[0].tolist()
+    return PROFILE_QUERY_FUNCTIONS[profile], {"query_embedding": query_embedding}
@@ -0,0 +1,203 @@
+# This utility file is a persistent, append-only store of embeddings keyed by content hash.
+# Ingestion writes every computed embedding through to it, so wiping and re-seeding the
+# database only re-reads vectors from disk instead of re-running the model.
+#
+# Layout (one pair of files per model):
+#   <model>.f32  raw float32 rows, memory-mapped for reads
+#   <model>.idx  32-byte SHA-256 digest per row, in row order
+#   <model>.lock held exclusively while appending
+#
+# Several processes (the API server, seed_database) can share the store. Appends hold
+# the lock file and first read the rows other processes added, so every row index is
+# assigned once. Readers take no lock: vectors are written before their digests, so
+# every digest on disk points at a complete row.
+
+import re
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+
+from lib.constants import EMBEDDING_MODEL, EMBEDDING_DIMENSION, EMBEDDING_STORE_DIR
+
+_DIGEST_SIZE = 32
+
+
+def content_hash(text: str) -> bytes:
+    """SHA-256 digest of the text that was embedded."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingStore:
+    """Append-only memory-mapped vector file with a content-hash index."""
+
+    def __init__(
+        self,
+        directory: Path | str = EMBEDDING_STORE_DIR,
+        model_name: str = EMBEDDING_MODEL,
+        dimension: int = EMBEDDING_DIMENSION,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.dimension = dimension
+
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self._vectors_path = self.directory / f"{safe_name}.f32"
+        self._index_path = self.directory / f"{safe_name}.idx"
+        self._lock_path = self.directory / f"{safe_name}.lock"
+        self._row_bytes = dimension * np.dtype(np.float32).itemsize
+
+        self._lock = threading.Lock()
+        self._mmap: np.memmap | None = None
+        self._rows: dict[bytes, int] = {}
+        self._count = 0  # rows read from the index so far
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    @contextmanager
+    def _append_lock(self):
+        """Exclusive lock shared with other processes appending to the store."""
+        with self._lock_path.open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load_index(self) -> None:
+        """Read the digest index, dropping any half-written tail from a crash."""
+        self._vectors_path.touch(exist_ok=True)
+        self._index_path.touch(exist_ok=True)
+        with self._append_lock():
+            self._refresh(repair=True)
+
+    def _refresh(self, repair: bool = False) -> None:
+        """
+        Read the digests of rows appended since the last read, by any process.
+
+        Args:
+            repair: Truncate a half-written tail left by a crashed writer
+                (only while holding the append lock)
+        """
+        vector_rows = self._vectors_path.stat().st_size // self._row_bytes
+        index_rows = self._index_path.stat().st_size // _DIGEST_SIZE
+        count = min(vector_rows, index_rows)
+
+        if repair:
+            # Vectors are appended before their digests, so truncating both to the
+            # shorter file leaves only complete entries
+            with self._vectors_path.open("r+b") as f:
+                f.truncate(count * self._row_bytes)
+            with self._index_path.open("r+b") as f:
+                f.truncate(count * _DIGEST_SIZE)
+
+        if count < self._count:  # the files were deleted or replaced
+            self._rows = {}
+            self._count = 0
+            self._mmap = None
+        if count == self._count:
+            return
+
+        with self._index_path.open("rb") as f:
+            f.seek(self._count * _DIGEST_SIZE)
+            digests = f.read((count - self._count) * _DIGEST_SIZE)
+        for offset in range(count - self._count):
+            digest = digests[offset * _DIGEST_SIZE:(offset + 1) * _DIGEST_SIZE]
+            self._rows.setdefault(digest, self._count + offset)
+        self._count = count
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _vectors(self) -> np.memmap:
+        """Memory map over all rows read so far (remapped after appends)."""
+        if self._mmap is None or len(self._mmap) != self._count:
+            self._mmap = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self._count, self.dimension),
+            )
+        return self._mmap
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """
+        Look up stored embeddings for texts.
+
+        Returns:
+            One embedding per text, or None where the text is not stored
+        """
+        with self._lock:
+            self._refresh()
+            if not self._rows:
+                self.misses += len(texts)
+                return [None] * len(texts)
+
+            vectors = self._vectors()
+            results = []
+            for text in texts:
+                row = self._rows.get(content_hash(text))
+                if row is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(np.array(vectors[row]))
+            return results
+
+    def put_many(self, texts: list[str], embeddings: np.ndarray) -> int:
+        """
+        Append embeddings for texts that are not stored yet.
+
+        Returns:
+            Number of new rows written
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(texts) != len(embeddings):
+            raise ValueError(
+                f"Mismatch: {len(texts)} texts but {len(embeddings)} embeddings")
+        if embeddings.size and embeddings.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected embeddings of dimension {self.dimension}, got {embeddings.shape[1]}")
+
+        with self._lock, self._append_lock():
+            # Rows appended by other processes take the next indices first
+            self._refresh(repair=True)
+            new_digests = []
+            new_rows = []
+            pending = set()
+            for text, embedding in zip(texts, embeddings):
+                digest = content_hash(text)
+                if digest in self._rows or digest in pending:
+                    continue
+                pending.add(digest)
+                new_digests.append(digest)
+                new_rows.append(embedding)
+
+            if not new_rows:
+                return 0
+
+            with self._vectors_path.open("ab") as f:
+                f.write(np.stack(new_rows).tobytes())
+            with self._index_path.open("ab") as f:
+                f.write(b"".join(new_digests))
+
+            for offset, digest in enumerate(new_digests):
+                self._rows[digest] = self._count + offset
+            self._count += len(new_digests)
+            return len(new_rows)
+
+
+_store: EmbeddingStore | None = None
+
+
+def get_embedding_store() -> EmbeddingStore:
+    """Lazy open the embedding store for the active embedding model."""
+    global _store
+    if _store is None:
+        _store = EmbeddingStore()
+    return _store
@@ -6,6 +6,8 @@ import hashlib
 from datetime import datetime
 import mimetypes
 
+from lib.util.preprocessing.text_normalization import sanitize_text
+
 # plug and play below
 
 
@@ -19,6 +21,16 @@ class UserFile(BaseModel):
     file_hash: str
 
 
+def hash_file(path: str | Path, algorithm="sha256") -> str:
+    h = hashlib.new(algorithm)
+    path = Path(path)
+
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(8192), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 """
 this method is solely for getting the properties of the file
 params: folder path -> str
@@ -27,15 +39,6 @@ params: folder path -> str
 
 
 def getFileProperties(file_path: str) -> UserFile:
-    def hash_file(path: str | Path, algorithm="sha256") -> str:
-        h = hashlib.new(algorithm)
-        path = Path(path)
-
-        with path.open("rb") as f:
-            for chunk in iter(lambda: f.read(8192), b""):
-                h.update(chunk)
-        return h.hexdigest()
-
     p = Path(file_path).absolute()
     mime_type, _ = mimetypes.guess_type(file_path)
     res = UserFile(
@@ -52,7 +55,7 @@ def getFileProperties(file_path: str) -> UserFile:
 
 def read_text_file_content(file_path: str) -> str:
     with open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
+        return sanitize_text(f.read())
 
 
 """
@@ -1,7 +1,31 @@
 # This utility file is for processing audio files.
 # The goal is to take in an audio file and return a transcription of the audio (with OpenAI Whisper), including timestamps.
-
-from lib.constants import AUDIO_OVERLAP_DURATION_SEC, AUDIO_TARGET_DURATION_SEC
+#
+# Before transcription, an energy-based voice activity pass finds the speech regions.
+# Only those are transcribed (joined into one shorter recording), which saves compute on
+# silence and keeps Whisper from hallucinating text there; segment timestamps are mapped
+# back to the original file.
+
+from lib.constants import (
+    AUDIO_OVERLAP_DURATION_SEC,
+    AUDIO_TARGET_DURATION_SEC,
+    AUDIO_VAD_ENABLED,
+    AUDIO_VAD_FRAME_SEC,
+    AUDIO_VAD_SILENCE_DB,
+    AUDIO_VAD_MIN_RANGE_DB,
+    AUDIO_VAD_MIN_SILENCE_SEC,
+    AUDIO_VAD_PAD_SEC,
+    AUDIO_PCM_CACHE_ENABLED,
+    AUDIO_PCM_CACHE_DIR,
+    AUDIO_PCM_CACHE_MAX_BYTES,
+    AUDIO_PCM_CACHE_DTYPE,
+)
+from lib.util.preprocessing.text_normalization import sanitize_text
+from lib.util.preprocessing.audio_transcription import SAMPLE_RATE, transcribe, transcript_config_name
+from lib.util.artifact_cache import ArtifactCache, cached_json_artifact
+from lib.util.folder_extraction import hash_file
+import bisect
+import numpy as np
 import whisper
 from pydantic import FilePath
 from dataclasses import dataclass
@@ -16,10 +40,147 @@ class TranscriptChunk:
     chunk_index: int
 
 
-def _get_audio_transcript(file_path: FilePath) -> dict:
-    print(whisper.available_models())
-    model = whisper.load_model("base")
-    result = model.transcribe(str(file_path))
+_pcm_cache: ArtifactCache | None = None
+
+
+def _get_pcm_cache() -> ArtifactCache:
+    """Lazy open the decoded audio cache (separate from the artifact cache, so recordings
+    do not evict captions and transcripts)."""
+    global _pcm_cache
+    if _pcm_cache is None:
+        _pcm_cache = ArtifactCache(AUDIO_PCM_CACHE_DIR, AUDIO_PCM_CACHE_MAX_BYTES)
+    return _pcm_cache
+
+
+def load_audio(file_path: FilePath, file_hash: str | None = None) -> np.ndarray:
+    """
+    Decode an audio file to 16 kHz mono float32, as Whisper expects.
+
+    The decoded samples are cached per file hash. Cached float32 audio is
+    memory-mapped rather than read, so transcription starts without
+    running ffmpeg or copying the samples.
+    """
+    if not AUDIO_PCM_CACHE_ENABLED:
+        return whisper.load_audio(str(file_path))
+
+    cache = _get_pcm_cache()
+    file_hash = file_hash or hash_file(file_path)
+    kind = f"pcm{SAMPLE_RATE}_{AUDIO_PCM_CACHE_DTYPE}"
+    pcm = cache.get_array(file_hash, kind)
+    if pcm is not None:
+        if AUDIO_PCM_CACHE_DTYPE == "int16":
+            return pcm.astype(np.float32) / 32768
+        return pcm
+
+    audio = whisper.load_audio(str(file_path))
+    if AUDIO_PCM_CACHE_DTYPE == "int16":
+        cache.put_array(file_hash, kind, np.clip(
+            np.round(audio * 32768), -32768, 32767).astype(np.int16))
+    else:
+        cache.put_array(file_hash, kind, audio)
+    return audio
+
+
+def _get_audio_transcript(file_path: FilePath, file_hash: str | None = None) -> dict:
+    """
+    Transcribe an audio file, reusing the cached transcript for the same file contents.
+
+    Returns:
+        Dict with 'text', 'language', 'model' and 'segments' (each with 'start', 'end', 'text')
+    """
+    def transcribe_file() -> dict:
+        audio = load_audio(file_path, file_hash)
+        if not AUDIO_VAD_ENABLED:
+            # Long recordings are transcribed in overlapping windows across processes
+            return transcribe(audio)
+        return _transcribe_speech(audio)
+
+    kind = f"transcript_{transcript_config_name()}" + ("_vad" if AUDIO_VAD_ENABLED else "")
+    return cached_json_artifact(str(file_path), kind, transcribe_file, file_hash)
+
+
+def detect_speech_regions(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> list[tuple[int, int]]:
+    """
+    Find the regions of a recording that contain speech, by frame energy.
+
+    A frame is speech if it is louder than halfway (in dB) between the noise
+    floor and the speech level of the recording. Pauses shorter than
+    AUDIO_VAD_MIN_SILENCE_SEC are kept, and every region is padded by
+    AUDIO_VAD_PAD_SEC so word onsets and endings are not cut.
+
+    Returns:
+        List of (start_sample, end_sample), in order and not overlapping.
+        The whole recording if it is quiet throughout or has no clear silence.
+    """
+    frame = int(AUDIO_VAD_FRAME_SEC * sample_rate)
+    num_frames = len(audio) // frame
+    if num_frames == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    frames = audio[:num_frames * frame].reshape(num_frames, frame)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    noise_floor, speech_level = np.percentile(energy_db, [10, 90])
+    if speech_level < AUDIO_VAD_SILENCE_DB or speech_level - noise_floor < AUDIO_VAD_MIN_RANGE_DB:
+        # A quiet recording, or one without clear silence, is left to Whisper whole
+        return [(0, len(audio))]
+
+    threshold = max((noise_floor + speech_level) / 2, AUDIO_VAD_SILENCE_DB)
+    speech = np.flatnonzero(energy_db > threshold)
+
+    pad = int(AUDIO_VAD_PAD_SEC * sample_rate)
+    min_gap = int(AUDIO_VAD_MIN_SILENCE_SEC * sample_rate)
+    regions = []
+    for index in speech.tolist():
+        start = max(index * frame - pad, 0)
+        end = min((index + 1) * frame + pad, len(audio))
+        if regions and start - regions[-1][1] < min_gap:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    if regions and len(audio) - regions[-1][1] < frame:
+        regions[-1] = (regions[-1][0], len(audio))  # trailing partial frame
+    return regions
+
+
+def _transcribe_speech(audio: np.ndarray) -> dict:
+    """Transcribe only the speech regions of a recording, with timestamps in the original file."""
+    regions = detect_speech_regions(audio)
+    if not regions:
+        # Nothing recognized as speech: transcribe everything rather than store an empty transcript
+        return transcribe(audio)
+
+    speech_samples = sum(end - start for start, end in regions)
+    if speech_samples < len(audio):
+        print(f"Skipping {(len(audio) - speech_samples) / SAMPLE_RATE:.0f}s of silence "
+              f"({1 - speech_samples / len(audio):.0%} of the recording)")
+
+    # The model size is picked by the length of the speech, not of the file
+    result = transcribe(np.concatenate(
+        [audio[start:end] for start, end in regions]))
+
+    # Start of each region in the joined audio and in the original file, in seconds
+    joined_starts = []
+    original_starts = []
+    offset = 0
+    for start, end in regions:
+        joined_starts.append(offset / SAMPLE_RATE)
+        original_starts.append(start / SAMPLE_RATE)
+        offset += end - start
+
+    def to_original(t: float, is_end: bool) -> float:
+        # A segment ending exactly where a region starts belongs to the region before
+        find = bisect.bisect_left if is_end else bisect.bisect_right
+        i = max(find(joined_starts, t) - 1, 0)
+        return original_starts[i] + t - joined_starts[i]
+
+    result["segments"] = [
+        {
+            "start": to_original(seg["start"], is_end=False),
+            "end": to_original(seg["end"], is_end=True),
+            "text": seg["text"],
+        }
+        for seg in result["segments"]
+    ]
     return result
 
 
@@ -112,7 +273,8 @@ def _create_chunk(
         raise ValueError("Cannot create chunk from empty segments")
 
     # Content includes overlap for context
-    content = " ".join(seg["text"].strip() for seg in chunk_segments)
+    content = sanitize_text(
+        " ".join(seg["text"].strip() for seg in chunk_segments))
 
     # Timestamps are for the true (non-overlapping) section only
     true_start_time = chunk_segments[overlap_start_index]["start"] if overlap_start_index < len(
@@ -169,8 +331,8 @@ def _chunks_to_json(chunks: list[TranscriptChunk]) -> list[dict]:
     ]
 
 
-def transcribe_audio(file_path: FilePath) -> dict:
-    transcription = _get_audio_transcript(file_path)
+def transcribe_audio(file_path: FilePath, file_hash: str | None = None) -> dict:
+    transcription = _get_audio_transcript(file_path, file_hash)
 
     # Chunk the transcript
     chunks = _chunk_transcript(
@@ -0,0 +1,278 @@
+# This utility file runs Whisper, keeping models loaded between files.
+# Long recordings are split into overlapping windows transcribed by worker processes,
+# each with its own resident model. Every window owns the part of the timeline closer
+# to it than to its neighbours; its segments are shifted to global timestamps and kept
+# if their midpoint falls in that part, so the overlap is transcribed but not duplicated.
+#
+# The model size and precision are configurable (see WHISPER_MODEL and WHISPER_PRECISION
+# in lib.constants): the size can be picked by recording length, and int8 dynamic
+# quantization is available for CPU-only hosts.
+
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import torch
+import whisper
+
+from lib.constants import (
+    WHISPER_MODEL,
+    WHISPER_MODEL_POLICY,
+    WHISPER_MODEL_LONG,
+    WHISPER_PRECISION,
+    WHISPER_THREADS,
+    AUDIO_PARALLEL_MIN_SEC,
+    AUDIO_WINDOW_SEC,
+    AUDIO_WINDOW_OVERLAP_SEC,
+    AUDIO_TRANSCRIBE_MAX_WORKERS,
+)
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE  # 16 kHz mono, what Whisper decodes to
+
+WHISPER_PRECISIONS = ("auto", "fp32", "fp16", "int8")
+
+# (model size, device, precision) -> loaded model
+_models: dict[tuple[str, str, str], whisper.Whisper] = {}
+_models_lock = threading.Lock()
+
+
+def choose_model(duration_sec: float) -> str:
+    """Model size for a recording: WHISPER_MODEL if set, otherwise by length."""
+    if WHISPER_MODEL:
+        return WHISPER_MODEL
+    for max_sec, model_name in WHISPER_MODEL_POLICY:
+        if duration_sec <= max_sec:
+            return model_name
+    return WHISPER_MODEL_LONG
+
+
+def transcript_config_name(precision: str = WHISPER_PRECISION) -> str:
+    """Name of the model configuration, for caching transcripts it produced."""
+    return f"{WHISPER_MODEL or 'auto'}_{resolve_whisper_config(precision)[1]}"
+
+
+def resolve_whisper_config(precision: str = WHISPER_PRECISION) -> tuple[str, str]:
+    """
+    Pick the device and a precision it can run.
+
+    Returns:
+        Tuple of (device, precision) with "auto" resolved
+
+    Raises:
+        ValueError: For an unknown precision or one the device does not support
+    """
+    if precision not in WHISPER_PRECISIONS:
+        raise ValueError(
+            f"Unknown Whisper precision {precision!r}, expected one of {WHISPER_PRECISIONS}")
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    if precision == "int8":
+        device = "cpu"  # dynamic quantization only has CPU kernels
+    elif precision == "fp16" and device == "cpu":
+        raise ValueError("fp16 transcription needs CUDA; use fp32 or int8 on CPU")
+    elif precision == "auto":
+        precision = "fp16" if device == "cuda" else "fp32"
+    return device, precision
+
+
+def _quantize_int8(model: whisper.Whisper) -> whisper.Whisper:
+    """
+    Dynamic int8 quantization of the Linear layers.
+
+    quantize_dynamic matches modules by exact type and Whisper's layers are
+    whisper.model.Linear, a subclass, so they are first swapped for plain
+    nn.Linear sharing the same weights; otherwise nothing would be quantized.
+    """
+    for module in list(model.modules()):
+        for name, child in module.named_children():
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                linear = torch.nn.Linear(
+                    child.in_features, child.out_features, bias=child.bias is not None, device="meta")
+                linear.weight = child.weight
+                linear.bias = child.bias
+                setattr(module, name, linear)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def get_whisper_model(model_name: str, precision: str = WHISPER_PRECISION) -> whisper.Whisper:
+    """Lazy load a Whisper model in a precision."""
+    device, precision = resolve_whisper_config(precision)
+    key = (model_name, device, precision)
+    with _models_lock:
+        if key not in _models:
+            if WHISPER_THREADS:
+                torch.set_num_threads(WHISPER_THREADS)
+            model = whisper.load_model(model_name, device=device)
+            if precision == "int8":
+                model = _quantize_int8(model)
+            _models[key] = model
+    return _models[key]
+
+
+def _transcribe_array(
+    audio: np.ndarray,
+    model_name: str,
+    precision: str = WHISPER_PRECISION,
+    language: str | None = None,
+) -> dict:
+    model = get_whisper_model(model_name, precision)
+    fp16 = resolve_whisper_config(precision)[1] == "fp16"
+    return model.transcribe(audio, language=language, fp16=fp16)
+
+
+def _segments(result: dict, offset: float = 0.0) -> list[dict]:
+    return [
+        {"start": seg["start"] + offset, "end": seg["end"] + offset, "text": seg["text"]}
+        for seg in result["segments"]
+    ]
+
+
+def detect_language(audio: np.ndarray, model_name: str, precision: str = WHISPER_PRECISION) -> str:
+    """Language of the first 30 seconds, so every window is decoded in the same language."""
+    model = get_whisper_model(model_name, precision)
+    mel = whisper.log_mel_spectrogram(
+        whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+
+def window_bounds(
+    num_samples: int,
+    window_sec: float = AUDIO_WINDOW_SEC,
+    overlap_sec: float = AUDIO_WINDOW_OVERLAP_SEC,
+) -> list[tuple[int, int, float, float]]:
+    """
+    Overlapping windows covering the audio.
+
+    Returns:
+        List of (start_sample, end_sample, owned_start_sec, owned_end_sec): the
+        samples transcribed and the part of the timeline whose segments are kept
+    """
+    window = int(window_sec * SAMPLE_RATE)
+    step = window - int(overlap_sec * SAMPLE_RATE)
+    starts = list(range(0, max(num_samples - window, 0) + 1, step))
+    if starts[-1] + window < num_samples:
+        starts.append(starts[-1] + step)
+
+    half_overlap = overlap_sec / 2
+    windows = []
+    for i, start in enumerate(starts):
+        end = min(start + window, num_samples)
+        owned_start = 0.0 if i == 0 else start / SAMPLE_RATE + half_overlap
+        owned_end = float("inf") if i == len(starts) - 1 else end / SAMPLE_RATE - half_overlap
+        windows.append((start, end, owned_start, owned_end))
+    return windows
+
+
+def _init_worker(num_threads: int) -> None:
+    torch.set_num_threads(WHISPER_THREADS or num_threads)
+
+
+def _transcribe_window(
+    audio: np.ndarray,
+    model_name: str,
+    precision: str,
+    language: str,
+    offset: float,
+    owned_start: float,
+    owned_end: float,
+) -> list[dict]:
+    """Transcribe one window (in a worker) and keep the segments it owns."""
+    segments = _segments(_transcribe_array(
+        audio, model_name, precision, language), offset)
+    return [
+        seg for seg in segments
+        if owned_start <= (seg["start"] + seg["end"]) / 2 < owned_end
+    ]
+
+
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+
+
+def _get_executor(num_workers: int) -> ProcessPoolExecutor:
+    """Start the worker processes once; each loads Whisper on its first window and keeps it."""
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != num_workers:
+        shutdown_pool()
+        _executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            # fork is unsafe once torch has started its thread pools
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(max(1, (os.cpu_count() or 1) // num_workers),),
+        )
+        _executor_workers = num_workers
+    return _executor
+
+
+@atexit.register
+def shutdown_pool() -> None:
+    """Stop the transcription workers. They restart on the next long recording."""
+    global _executor, _executor_workers
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        _executor_workers = 0
+
+
+def transcribe(
+    audio: np.ndarray,
+    model_name: str | None = None,
+    precision: str = WHISPER_PRECISION,
+    num_workers: int | None = None,
+    min_parallel_sec: float = AUDIO_PARALLEL_MIN_SEC,
+) -> dict:
+    """
+    Transcribe 16 kHz mono audio.
+
+    Recordings of at least min_parallel_sec are split into overlapping windows
+    transcribed by a process pool; shorter ones are transcribed in this process.
+
+    Args:
+        audio: float32 samples at SAMPLE_RATE
+        model_name: Whisper model size (default: choose_model by length)
+        precision: Model precision (see WHISPER_PRECISION)
+        num_workers: Worker processes (default: cores, up to AUDIO_TRANSCRIBE_MAX_WORKERS);
+            1 transcribes in this process
+
+    Returns:
+        Dict with 'text', 'language', 'model' and 'segments' (each with 'start', 'end', 'text')
+    """
+    duration = len(audio) / SAMPLE_RATE
+    model_name = model_name or choose_model(duration)
+    if num_workers is None:
+        num_workers = min(os.cpu_count() or 1, AUDIO_TRANSCRIBE_MAX_WORKERS)
+
+    start_time = time.perf_counter()
+    if num_workers <= 1 or duration < min_parallel_sec:
+        result = _transcribe_array(audio, model_name, precision)
+        language, segments = result.get("language"), _segments(result)
+    else:
+        language = detect_language(audio, model_name, precision)
+        windows = window_bounds(len(audio))
+        results = _get_executor(num_workers).map(
+            _transcribe_window,
+            [audio[start:end] for start, end, _, _ in windows],
+            [model_name] * len(windows),
+            [precision] * len(windows),
+            [language] * len(windows),
+            [start / SAMPLE_RATE for start, _, _, _ in windows],
+            [owned_start for _, _, owned_start, _ in windows],
+            [owned_end for _, _, _, owned_end in windows],
+        )
+        segments = [seg for window_segments in results for seg in window_segments]
+
+    elapsed = time.perf_counter() - start_time
+    if duration > 0:
+        print(f"Transcribed {duration:.0f}s of audio with {model_name} in {elapsed:.1f}s "
+              f"(real-time factor {elapsed / duration:.2f})")
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "language": language,
+        "model": model_name,
+        "segments": segments,
+    }
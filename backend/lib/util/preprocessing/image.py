@@ -1,8 +1,40 @@
+# This utility file captions images with BLIP.
+# The model is loaded once and stays resident. Ingestion captions its new images in
+# batches: worker threads decode and resize the next images while the model generates
+# captions for the current batch.
+#
+# The model runs on CUDA when available, otherwise on CPU in the precision picked by
+# IMAGE_CAPTION_PRECISION (see lib.constants). Inputs are cast to the model's dtype.
+#
+# Images are decoded at reduced size (JPEG draft mode, integer box reduction otherwise).
+# Captions are cached per file hash and precision.
+
 from transformers import BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import torch
 
+from lib.constants import (
+    ARTIFACT_CACHE_ENABLED,
+    IMAGE_CAPTION_MODEL,
+    IMAGE_CAPTION_MAX_NEW_TOKENS,
+    IMAGE_CAPTION_BATCH_SIZE,
+    IMAGE_DECODE_WORKERS,
+    IMAGE_CAPTION_PRECISION,
+    IMAGE_CAPTION_THREADS,
+)
 from lib.util.embedding import get_embedding
+from lib.util.preprocessing.text_normalization import sanitize_text
+from lib.util.artifact_cache import cached_json_artifact, get_artifact_cache
+
+CAPTION_PRECISIONS = ("auto", "fp32", "bf16", "fp16", "int8")
+
+# (device, precision) -> loaded processor and model
+_captioners: dict[tuple[str, str], tuple[BlipProcessor, BlipForConditionalGeneration]] = {}
+_model_lock = threading.Lock()
 
 # this is the entry point
 
@@ -12,22 +44,216 @@ def image_to_embedding(file_path: str):
     embedding = get_embedding(caption)
 
 
-def generateImageCaption(file_path: str) -> str:
-    model_name = "Salesforce/blip-image-captioning-base"  # around 1 GB download size
-    processor = BlipProcessor.from_pretrained(
-        "Salesforce/blip-image-captioning-base")
-    model = BlipForConditionalGeneration.from_pretrained(
-        "Salesforce/blip-image-captioning-base")
+def _cpu_supports_bf16() -> bool:
+    """Whether the CPU has native bfloat16 instructions (AVX512-BF16 or AMX)."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def resolve_caption_config(precision: str = IMAGE_CAPTION_PRECISION) -> tuple[str, str]:
+    """
+    Pick the device and a precision it can run efficiently.
+
+    Returns:
+        Tuple of (device, precision) with "auto" resolved
+
+    Raises:
+        ValueError: For an unknown precision or one the device does not support
+    """
+    if precision not in CAPTION_PRECISIONS:
+        raise ValueError(
+            f"Unknown caption precision {precision!r}, expected one of {CAPTION_PRECISIONS}")
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    if precision == "int8":
+        device = "cpu"  # dynamic quantization only has CPU kernels
+    elif precision == "fp16" and device == "cpu":
+        raise ValueError("fp16 captioning needs CUDA; use fp32 or bf16 on CPU")
+    elif precision == "auto":
+        if device == "cuda":
+            precision = "fp16"
+        else:
+            precision = "bf16" if _cpu_supports_bf16() else "fp32"
+    return device, precision
+
+
+def _get_captioner(
+    precision: str = IMAGE_CAPTION_PRECISION,
+) -> tuple[BlipProcessor, BlipForConditionalGeneration]:
+    """Lazy load the BLIP processor and model for a precision."""
+    config = resolve_caption_config(precision)
+    with _model_lock:
+        if config not in _captioners:
+            device, precision = config
+            if IMAGE_CAPTION_THREADS:
+                torch.set_num_threads(IMAGE_CAPTION_THREADS)
+
+            processor = BlipProcessor.from_pretrained(IMAGE_CAPTION_MODEL)
+            model = BlipForConditionalGeneration.from_pretrained(
+                IMAGE_CAPTION_MODEL)
+            model.eval()
+            if precision == "int8":
+                model = torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8)
+            elif precision == "bf16":
+                model = model.to(torch.bfloat16)
+            elif precision == "fp16":
+                model = model.to(torch.float16)
+            _captioners[config] = (processor, model.to(device))
+    return _captioners[config]
+
+
+def caption_kind(precision: str = IMAGE_CAPTION_PRECISION) -> str:
+    """Artifact name of captions generated in a precision (after resolving "auto")."""
+    return f"caption_{resolve_caption_config(precision)[1]}"
+
+
+def generateImageCaption(file_path: str, file_hash: str | None = None) -> str:
+    """Caption an image, reusing the cached caption for the same file contents."""
+    artifact = cached_json_artifact(
+        file_path, caption_kind(), lambda: {"caption": _caption_image(file_path)}, file_hash)
+    return artifact["caption"]
+
+
+def open_image(file_path: str, size: tuple[int, int]) -> Image.Image:
+    """
+    Decode an image as RGB at no less than size, but not much more.
+
+    JPEGs are decoded by libjpeg directly at a reduced scale (draft mode).
+    Other formats are decoded in full and then box-reduced by the largest
+    integer factor that keeps them at least size, so the processor's resize
+    works on a small image.
+
+    Args:
+        file_path: Path to the image
+        size: (width, height) the image is resized to afterwards
+    """
+    image = Image.open(file_path)
+    if image.format == "JPEG":
+        image.draft("RGB", size)
+    image = image.convert("RGB")
+    factor = min(image.width // size[0], image.height // size[1])
+    if factor >= 2:
+        image = image.reduce(factor)
+    return image
+
+
+def _load_image(file_path: str, precision: str = IMAGE_CAPTION_PRECISION) -> torch.Tensor:
+    """BLIP pixel values of an image, decoded at reduced size and resized."""
+    processor, _ = _get_captioner(precision)
+    size = processor.image_processor.size
+    image = open_image(file_path, (size["width"], size["height"]))
+    return processor(images=image, return_tensors="pt")["pixel_values"][0]
+
+
+def _generate_captions(
+    pixel_values: list[torch.Tensor],
+    precision: str = IMAGE_CAPTION_PRECISION,
+) -> list[str]:
+    """Caption a batch of preprocessed images with one generate call."""
+    processor, model = _get_captioner(precision)
+    # BLIP resizes every image to the same size, so the batch stacks without padding;
+    # generate pads the shorter captions with the pad token
+    batch = torch.stack(pixel_values).to(model.device, model.dtype)
+    with torch.inference_mode():
+        generated_ids = model.generate(
+            pixel_values=batch, max_new_tokens=IMAGE_CAPTION_MAX_NEW_TOKENS)
+    captions = processor.batch_decode(generated_ids, skip_special_tokens=True)
+    return [sanitize_text(caption) for caption in captions]
+
+
+def _caption_image(file_path: str, precision: str = IMAGE_CAPTION_PRECISION) -> str:
+    return _generate_captions([_load_image(file_path, precision)], precision)[0]
+
+
+def caption_images(
+    file_paths: list[str],
+    batch_size: int = IMAGE_CAPTION_BATCH_SIZE,
+    decode_workers: int = IMAGE_DECODE_WORKERS,
+    precision: str = IMAGE_CAPTION_PRECISION,
+) -> dict[str, str]:
+    """
+    Caption many images in batches.
+
+    Args:
+        file_paths: Images to caption
+        batch_size: Images per generate call
+        decode_workers: Threads decoding images ahead of the model
+        precision: Captioner precision (see IMAGE_CAPTION_PRECISION)
+
+    Returns:
+        Dict of file path to caption. Images that fail to decode are left out
+        (and reported), so callers can retry them one by one.
+    """
+    if not file_paths:
+        return {}
+    _get_captioner(precision)  # load before the decode threads all wait on it
+
+    captions = {}
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=decode_workers) as executor:
+        pending = deque()
+        paths = iter(file_paths)
+
+        def submit_next():
+            path = next(paths, None)
+            if path is not None:
+                pending.append((path, executor.submit(_load_image, path, precision)))
+
+        # Keep up to two batches decoding while the model works
+        for _ in range(2 * batch_size):
+            submit_next()
+
+        batch_paths, batch_pixels = [], []
+        while pending:
+            path, future = pending.popleft()
+            submit_next()
+            try:
+                batch_pixels.append(future.result())
+                batch_paths.append(path)
+            except Exception as e:
+                print(f"✗ Failed to decode {path}: {e}")
+            if len(batch_pixels) == batch_size or (not pending and batch_pixels):
+                captions.update(
+                    zip(batch_paths, _generate_captions(batch_pixels, precision)))
+                batch_paths, batch_pixels = [], []
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Captioned {len(captions)} images in {elapsed:.1f}s "
+          f"({len(captions) / elapsed:.2f} images/s)")
+    return captions
+
 
-    image = Image.open(file_path).convert("RGB")
+def generateImageCaptions(
+    file_paths: list[str],
+    file_hashes: list[str],
+    batch_size: int = IMAGE_CAPTION_BATCH_SIZE,
+) -> dict[str, str]:
+    """
+    Caption many images in batches, reusing cached captions and caching new ones.
 
-    inputs = processor(images=image, return_tensors="pt").to(
-        model.device, torch.float16)
-    # more token, longer caption
-    generated_ids = model.generate(**inputs, max_new_tokens=30)
-    caption = processor.decode(generated_ids[0], skip_special_tokens=True)
+    Returns:
+        Dict of file path to caption, without images that failed to decode
+    """
+    cache = get_artifact_cache() if ARTIFACT_CACHE_ENABLED else None
+    kind = caption_kind()
+    captions = {}
+    missing = []
+    for path, file_hash in zip(file_paths, file_hashes):
+        artifact = cache.get_json(file_hash, kind) if cache is not None else None
+        if artifact is not None:
+            captions[path] = artifact["caption"]
+        else:
+            missing.append((path, file_hash))
 
-    # print(caption)
-    return caption
+    new_captions = caption_images([path for path, _ in missing], batch_size)
+    for path, file_hash in missing:
+        if path in new_captions:
+            captions[path] = new_captions[path]
+            if cache is not None:
+                cache.put_json(file_hash, kind, {"caption": new_captions[path]})
+    return captions
 
 # generateImageCaption("test_files/image/jail_cell.jpg")
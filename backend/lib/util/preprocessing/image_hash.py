@@ -0,0 +1,78 @@
+# This utility file computes perceptual hashes of images to find near-duplicates.
+# A difference hash (dHash) compares neighbouring pixels of a tiny grayscale thumbnail,
+# so re-encodes, resizes and burst shots of the same scene land within a few bits of
+# each other even though their SHA-256 differ.
+#
+# Flat images (blank slides, solid backgrounds) get no hash: their neighbouring pixels
+# differ only by noise, so their bits are near-random or all zero and would match
+# unrelated flat images.
+
+from PIL import Image
+import numpy as np
+
+from lib.constants import IMAGE_DEDUP_MIN_STDDEV
+
+HASH_SIZE = 8  # 8x8 comparisons -> 64-bit hash
+
+
+def perceptual_hash(file_path: str, min_stddev: float = IMAGE_DEDUP_MIN_STDDEV) -> int | None:
+    """
+    64-bit difference hash of an image.
+
+    Each bit records whether a pixel is brighter than its right neighbour
+    in a 9x8 grayscale thumbnail.
+
+    Returns:
+        The hash, or None if the thumbnail's grey levels vary by less than
+        min_stddev (too flat to hash reliably)
+    """
+    image = Image.open(file_path)
+    if image.format == "JPEG":
+        image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    image = image.convert("L").resize(
+        (HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    pixels = np.asarray(image, dtype=np.int16)
+    if pixels.std() < min_stddev:
+        return None
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def format_hash(phash: int) -> str:
+    """Hash as 16 hex digits, as stored in files.metadata."""
+    return f"{phash:016x}"
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class PerceptualHashIndex:
+    """In-memory index of image hashes, searched by Hamming distance."""
+
+    def __init__(self):
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._entries: list[dict] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, phash: int, entry: dict) -> None:
+        self._hashes = np.append(self._hashes, np.uint64(phash))
+        self._entries.append(entry)
+
+    def find(self, phash: int, max_distance: int) -> tuple[dict, int] | None:
+        """
+        Closest indexed image within max_distance bits.
+
+        Returns:
+            Tuple of (entry, distance), or None if no image is close enough
+        """
+        if not self._entries:
+            return None
+        xor = self._hashes ^ np.uint64(phash)
+        distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        i = int(distances.argmin())
+        if distances[i] > max_distance:
+            return None
+        return self._entries[i], int(distances[i])
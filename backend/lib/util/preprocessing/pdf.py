@@ -1,11 +1,14 @@
 import os
 import sys
 import re
+from bisect import bisect_right
 from collections import Counter
 from dataclasses import dataclass
 from pydantic import FilePath
 import fitz  # PyMuPDF
-from lib.util.preprocessing.semantic_chunking import semantic_chunk_text
+from lib.util.preprocessing.semantic_chunking import iter_semantic_chunks
+from lib.util.preprocessing.pdf_pages import extract_pages
+from lib.util.artifact_cache import cached_json_artifact
 
 # This utility file is for processing PDF files.
 # The goal is to take in a PDF file and return text chunks with page metadata.
@@ -20,21 +23,8 @@ class PDFChunk:
     chunk_index: int
     page_start: int  # 1-indexed page number where chunk starts
     page_end: int    # 1-indexed page number where chunk ends
-
-
-def _sanitize_text(text: str) -> str:
-    """
-    Remove problematic Unicode characters that cause database errors.
-
-    Removes null bytes (\x00, \u0000) and other control characters
-    that PostgreSQL cannot store in text columns.
-    """
-    # Remove null bytes
-    text = text.replace('\x00', '')
-    # Remove other problematic control characters (except newline, tab, carriage return)
-    text = ''.join(char for char in text if char == '\n' or char ==
-                   '\t' or char == '\r' or not (0 <= ord(char) < 32))
-    return text
+    char_start: int  # offset of the chunk in the extracted full text
+    char_end: int    # offset just past the chunk in the extracted full text
 
 
 def _strip_headers_footers(pages: list[tuple[int, str]], min_occurrences: int = 2) -> list[tuple[int, str]]:
@@ -109,25 +99,35 @@ def _extract_text_by_page(file_path: FilePath) -> list[tuple[int, str]]:
     """
     Extract text from each page of a PDF.
 
+    Large PDFs are extracted page-parallel in worker processes (see pdf_pages).
+
     Returns:
         List of tuples (page_number, page_text) where page_number is 1-indexed.
     """
-    doc = fitz.open(str(file_path))
-    pages = []
+    return extract_pages(file_path)
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text = page.get_text()
-        # Sanitize text to remove null bytes and other problematic characters
-        text = _sanitize_text(text)
-        if text.strip():  # Only include pages with text
-            pages.append((page_num + 1, text))  # 1-indexed page numbers
 
-    doc.close()
-    return pages
+class PageIndex:
+    """
+    Maps character offsets in a PDF's extracted full text to page numbers.
+
+    Page start offsets are sorted, so each lookup is a binary search
+    instead of a scan over all pages.
+    """
 
+    def __init__(self, page_boundaries: list[tuple[int, int]]):
+        # (page_number, char_offset) tuples in text order
+        self.page_boundaries = page_boundaries
+        self._pages = [page_num for page_num, _ in page_boundaries]
+        self._offsets = [offset for _, offset in page_boundaries]
 
-def _extract_full_text(file_path: FilePath, strip_headers: bool = True) -> tuple[str, list[tuple[int, int]]]:
+    def page_at(self, position: int) -> int:
+        """Find which page a character position falls on (1 before the first page)."""
+        i = bisect_right(self._offsets, position) - 1
+        return self._pages[i] if i >= 0 else 1
+
+
+def _extract_full_text(file_path: FilePath, strip_headers: bool = True) -> tuple[str, PageIndex]:
     """
     Extract all text from a PDF and track page boundaries.
 
@@ -136,8 +136,8 @@ def _extract_full_text(file_path: FilePath, strip_headers: bool = True) -> tuple
         strip_headers: Whether to strip repeated headers/footers (default True)
 
     Returns:
-        Tuple of (full_text, page_boundaries) where page_boundaries is a list of
-        (page_number, char_offset) tuples indicating where each page starts.
+        Tuple of (full_text, page_index) where page_index maps character
+        offsets in full_text to page numbers.
     """
     pages = _extract_text_by_page(file_path)
 
@@ -145,100 +145,55 @@ def _extract_full_text(file_path: FilePath, strip_headers: bool = True) -> tuple
     if strip_headers:
         pages = _strip_headers_footers(pages)
 
-    full_text = ""
+    parts = []
     page_boundaries = []  # (page_number, char_offset)
+    offset = 0
 
     for page_num, page_text in pages:
-        page_boundaries.append((page_num, len(full_text)))
-        full_text += page_text + "\n"
+        page_boundaries.append((page_num, offset))
+        parts.append(page_text + "\n")
+        offset += len(page_text) + 1
 
-    return full_text, page_boundaries
-
-
-def _find_page_for_position(position: int, page_boundaries: list[tuple[int, int]]) -> int:
-    """Find which page a character position falls on."""
-    page_num = 1
-    for boundary_page, boundary_offset in page_boundaries:
-        if position >= boundary_offset:
-            page_num = boundary_page
-        else:
-            break
-    return page_num
-
-
-def _find_chunk_pages(
-    chunk_text: str,
-    full_text: str,
-    search_start: int,
-    page_boundaries: list[tuple[int, int]]
-) -> tuple[int, int, int]:
-    """
-    Find the page range for a chunk and its position in the full text.
-
-    Returns:
-        Tuple of (page_start, page_end, chunk_end_position)
-    """
-    # Find where this chunk appears in the full text
-    chunk_start = full_text.find(chunk_text, search_start)
-    if chunk_start == -1:
-        # Fallback: try to find a prefix match (chunks may have been modified)
-        chunk_start = search_start
-
-    chunk_end = chunk_start + len(chunk_text)
-
-    page_start = _find_page_for_position(chunk_start, page_boundaries)
-    page_end = _find_page_for_position(chunk_end - 1, page_boundaries)
-
-    return page_start, page_end, chunk_end
+    return "".join(parts), PageIndex(page_boundaries)
 
 
 def _chunk_pdf_text(
-    file_path: FilePath,
+    full_text: str,
+    page_index: PageIndex,
     similarity_threshold: float = 0.7,
     min_sentences_per_chunk: int = 4,
     max_sentences_per_chunk: int = 20,
 ) -> list[PDFChunk]:
     """
-    Extract and semantically chunk text from a PDF.
+    Semantically chunk the extracted text of a PDF.
 
     Uses semantic chunking to create coherent chunks, then maps each chunk
-    back to its source page(s) in the PDF.
+    back to its source page(s) through the chunk's character offsets.
     """
-    # Extract full text with page tracking
-    full_text, page_boundaries = _extract_full_text(file_path)
-
     if not full_text.strip():
         return []
 
     # Use semantic chunking
-    text_chunks = semantic_chunk_text(
-        full_text,
+    text_chunks = iter_semantic_chunks(
+        [full_text],
         similarity_threshold=similarity_threshold,
         min_sentences_per_chunk=min_sentences_per_chunk,
         max_sentences_per_chunk=max_sentences_per_chunk,
         overlap_sentences=2
     )
 
-    if not text_chunks:
-        return []
-
     # Map chunks back to pages
-    pdf_chunks = []
-    search_position = 0
-
-    for idx, chunk_text in enumerate(text_chunks):
-        page_start, page_end, search_position = _find_chunk_pages(
-            chunk_text, full_text, search_position, page_boundaries
-        )
-
-        pdf_chunks.append(PDFChunk(
-            content=chunk_text,
+    return [
+        PDFChunk(
+            content=chunk.content,
             chunk_index=idx,
-            page_start=page_start,
-            page_end=page_end,
-        ))
-
-    return pdf_chunks
+            page_start=page_index.page_at(chunk.char_start),
+            page_end=page_index.page_at(chunk.char_end - 1),
+            char_start=chunk.char_start,
+            char_end=chunk.char_end,
+        )
+        for idx, chunk in enumerate(text_chunks)
+    ]
 
 
 def _chunks_to_json(chunks: list[PDFChunk]) -> list[dict]:
@@ -248,7 +203,7 @@ def _chunks_to_json(chunks: list[PDFChunk]) -> list[dict]:
     Returns list of dicts with:
     - content: str (the text)
     - chunk_index: int
-    - chunk_metadata: dict with page info
+    - chunk_metadata: dict with page info and char offsets into the extracted text
     """
     return [
         {
@@ -257,6 +212,8 @@ def _chunks_to_json(chunks: list[PDFChunk]) -> list[dict]:
             "chunk_metadata": {
                 "page_start": chunk.page_start,
                 "page_end": chunk.page_end,
+                "char_start": chunk.char_start,
+                "char_end": chunk.char_end,
             },
         }
         for chunk in chunks
@@ -289,7 +246,29 @@ def get_pdf_metadata(file_path: FilePath) -> dict:
     }
 
 
-def extract_pdf_text(file_path: FilePath) -> list[dict]:
+def extract_pdf_full_text(file_path: FilePath, file_hash: str | None = None) -> tuple[str, PageIndex]:
+    """
+    Extract all text from a PDF with its page index, through the artifact cache.
+
+    Args:
+        file_path: Path to the PDF file
+        file_hash: SHA-256 of the file, if already known
+
+    Returns:
+        Tuple of (full_text, page_index) as returned by _extract_full_text
+    """
+    def extract() -> dict:
+        full_text, page_index = _extract_full_text(file_path)
+        return {"text": full_text, "page_boundaries": page_index.page_boundaries}
+
+    artifact = cached_json_artifact(
+        str(file_path), "pdf_text", extract, file_hash)
+    page_boundaries = [tuple(boundary)
+                       for boundary in artifact["page_boundaries"]]
+    return artifact["text"], PageIndex(page_boundaries)
+
+
+def extract_pdf_text(file_path: FilePath, file_hash: str | None = None) -> list[dict]:
     """
     Main entry point for PDF processing.
 
@@ -297,12 +276,28 @@ def extract_pdf_text(file_path: FilePath) -> list[dict]:
 
     Args:
         file_path: Path to the PDF file
+        file_hash: SHA-256 of the file, if already known
 
     Returns:
         List of dicts with content, chunk_index, and chunk_metadata (page info)
     """
-    chunks = _chunk_pdf_text(file_path)
-    return _chunks_to_json(chunks)
+    chunks, _ = extract_pdf_document(file_path, file_hash)
+    return chunks
+
+
+def extract_pdf_document(file_path: FilePath, file_hash: str | None = None) -> tuple[list[dict], str]:
+    """
+    Like extract_pdf_text, but also returns the extracted full text.
+
+    The chunks' char_start/char_end offsets point into this text, so it can
+    be stored once in place of the chunk contents.
+
+    Returns:
+        Tuple of (chunks in database format, full_text)
+    """
+    full_text, page_index = extract_pdf_full_text(file_path, file_hash)
+    chunks = _chunk_pdf_text(full_text, page_index)
+    return _chunks_to_json(chunks), full_text
 
 
 if __name__ == "__main__":
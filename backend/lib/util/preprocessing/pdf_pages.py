@@ -0,0 +1,111 @@
+# This utility file extracts the text of PDF pages, across worker processes for large PDFs.
+# Each worker opens its own fitz document and extracts a contiguous page range; results
+# are merged back in page order. The module imports only PyMuPDF so spawned workers
+# start quickly.
+
+import os
+import math
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+
+from lib.constants import PDF_PARALLEL_MIN_PAGES, PDF_EXTRACT_MAX_WORKERS
+from lib.util.preprocessing.text_normalization import sanitize_text
+
+# Page ranges handed out per worker, so a few slow pages do not stall one worker
+_RANGES_PER_WORKER = 4
+
+
+def get_page_count(file_path: str) -> int:
+    with fitz.open(str(file_path)) as doc:
+        return len(doc)
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> list[tuple[int, str]]:
+    """
+    Extract text from pages [start, end) of a PDF.
+
+    Returns:
+        List of tuples (page_number, page_text) where page_number is 1-indexed.
+        Pages without text are skipped.
+    """
+    doc = fitz.open(str(file_path))
+    pages = []
+
+    for page_num in range(start, end):
+        page = doc[page_num]
+        text = page.get_text()
+        # Sanitize text to remove null bytes and other problematic characters
+        text = sanitize_text(text)
+        if text.strip():  # Only include pages with text
+            pages.append((page_num + 1, text))  # 1-indexed page numbers
+
+    doc.close()
+    return pages
+
+
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+
+
+def _get_executor(num_workers: int) -> ProcessPoolExecutor:
+    """Start the worker processes once and reuse them for later PDFs."""
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != num_workers:
+        shutdown_pool()
+        _executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            # fork is unsafe once torch has started its thread pools
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _executor_workers = num_workers
+    return _executor
+
+
+@atexit.register
+def shutdown_pool() -> None:
+    """Stop the extraction workers. They restart on the next large PDF."""
+    global _executor, _executor_workers
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        _executor_workers = 0
+
+
+def extract_pages(
+    file_path: str,
+    num_workers: int | None = None,
+    min_parallel_pages: int = PDF_PARALLEL_MIN_PAGES,
+) -> list[tuple[int, str]]:
+    """
+    Extract text from each page of a PDF, in page order.
+
+    PDFs with at least min_parallel_pages pages are split into contiguous
+    page ranges extracted by a process pool; the output is identical to the
+    serial path.
+
+    Args:
+        file_path: Path to the PDF file
+        num_workers: Worker processes (default: cores, up to PDF_EXTRACT_MAX_WORKERS);
+            1 extracts serially in this process
+
+    Returns:
+        List of tuples (page_number, page_text) where page_number is 1-indexed.
+    """
+    file_path = str(file_path)
+    page_count = get_page_count(file_path)
+    if num_workers is None:
+        num_workers = min(os.cpu_count() or 1, PDF_EXTRACT_MAX_WORKERS)
+
+    if num_workers <= 1 or page_count < min_parallel_pages:
+        return extract_page_range(file_path, 0, page_count)
+
+    range_size = math.ceil(page_count / (num_workers * _RANGES_PER_WORKER))
+    starts = list(range(0, page_count, range_size))
+    ends = [min(start + range_size, page_count) for start in starts]
+
+    # map yields results in submission order, i.e. page order
+    results = _get_executor(num_workers).map(
+        extract_page_range, [file_path] * len(starts), starts, ends)
+    return [page for pages in results for page in pages]
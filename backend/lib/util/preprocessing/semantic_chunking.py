@@ -2,16 +2,22 @@
 
 
 from sentence_transformers import SentenceTransformer
-from nltk.tokenize import sent_tokenize
+from dataclasses import dataclass
+from typing import Iterable, Iterator
 import os
 import numpy as np
 
 # -------- Sentence splitting --------
-import nltk
-nltk.download("punkt_tab", quiet=True)
+from lib.constants import SENTENCE_SEGMENTER
+from lib.util.preprocessing.sentence_segmentation import get_segmenter
+from lib.util.embedding import count_tokens, get_token_budget, split_by_tokens
 
 # -------- Embeddings --------
 
+# A trailing sentence longer than this is emitted even if the next block
+# might continue it, so one runaway "sentence" cannot grow the buffer forever
+_MAX_PENDING_SENTENCE_CHARS = 100_000
+
 
 def read_txt_file(path: str) -> str:
     if not os.path.exists(path):
@@ -20,6 +26,357 @@ def read_txt_file(path: str) -> str:
         return f.read()
 
 
+class _ChunkBoundaries:
+    """
+    Decides where chunks split, given sentence embeddings in order.
+
+    The open chunk is always a contiguous sentence range, so its embedding
+    sum is a difference of prefix sums over a preallocated array and each
+    centroid similarity costs O(d) instead of re-averaging the whole chunk.
+    Between two splits, the similarities are computed in one vectorized
+    step; only the split decisions walk the sentences one by one.
+
+    Chunks are returned as (start, end) sentence index ranges; with overlap,
+    a chunk starts inside the previous one.
+
+    With max_tokens_per_chunk set, feed() also takes each sentence's token
+    count and a chunk splits before the sentence that would push it over
+    the budget; the overlap carried into the next chunk shrinks if needed.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float,
+        min_sentences_per_chunk: int,
+        max_sentences_per_chunk: int,
+        overlap_sentences: int,
+        shift_patience: int,
+        similarities: list | None = None,
+        max_tokens_per_chunk: int | None = None,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.min_sentences_per_chunk = min_sentences_per_chunk
+        self.max_sentences_per_chunk = max_sentences_per_chunk
+        self.overlap_sentences = overlap_sentences
+        self.shift_patience = shift_patience
+        self.similarities = similarities
+        self.max_tokens_per_chunk = max_tokens_per_chunk
+
+        self._offset = 0  # global index of the first sentence of the next batch
+        self._start: int | None = None  # global index of the open chunk's first sentence
+        self._shift_count = 0
+        # Running sum and count of open-chunk embeddings from earlier batches
+        self._carry: np.ndarray | None = None
+        self._carry_count = 0
+        # Last overlap_sentences embeddings of earlier batches
+        self._tail: np.ndarray | None = None
+        # Token count of the open chunk and of the last overlap_sentences sentences
+        self._chunk_tokens = 0
+        self._tail_tokens: list[int] = []
+
+    @property
+    def open_start(self) -> int | None:
+        """Global index of the open chunk's first sentence."""
+        return self._start
+
+    # Prefix sums are built per block so they stay cache-resident
+    _BLOCK_SIZE = 256
+
+    def feed(self, embeddings: np.ndarray, token_counts: list[int] | None = None) -> list[tuple[int, int]]:
+        """Consume the next sentence embeddings and return the chunks they close."""
+        embeddings = np.asarray(embeddings)
+        if self.max_tokens_per_chunk is not None:
+            if token_counts is None or len(token_counts) != len(embeddings):
+                raise ValueError(
+                    "token_counts must give one count per sentence when max_tokens_per_chunk is set")
+        closed = []
+        for block_start in range(0, len(embeddings), self._BLOCK_SIZE):
+            block_end = block_start + self._BLOCK_SIZE
+            closed.extend(self._feed_block(
+                embeddings[block_start:block_end],
+                token_counts[block_start:block_end] if token_counts is not None else None))
+        return closed
+
+    def _feed_block(self, embeddings: np.ndarray, tokens: list[int] | None) -> list[tuple[int, int]]:
+        embeddings = embeddings.astype(np.float64)
+        n = len(embeddings)
+        if n == 0:
+            return []
+        max_tokens = self.max_tokens_per_chunk
+
+        offset = self._offset
+        max_len = self.max_sentences_per_chunk
+        closed = []
+
+        # prefix[j] = sum of embeddings[:j]; row_dot[j] = prefix[j] . embeddings[j]
+        prefix = np.zeros((n + 1, embeddings.shape[1]), dtype=np.float64)
+        np.cumsum(embeddings, axis=0, out=prefix[1:])
+        row_dot = np.einsum("ij,ij->i", prefix[:n], embeddings)
+
+        i = 0
+        if self._start is None:
+            # The very first sentence opens a chunk without a comparison
+            self._start = offset
+            if max_tokens is not None:
+                self._chunk_tokens = tokens[0]
+            i = 1
+
+        while i < n:
+            # Open chunk = carried part + in-batch sentences [first, j)
+            first = max(0, self._start - offset)
+            carry_count = self._carry_count if self._start < offset else 0
+            chunk_len = carry_count + i - first
+            # Sentences up to the one where the chunk is forced to split at max size
+            stop = min(n, i + max(1, max_len - chunk_len + 1))
+
+            # centroid(j) . e_j = (carry + prefix[j] - prefix[first]) . e_j / chunk_len(j)
+            if carry_count:
+                dots = embeddings[i:stop] @ (self._carry - prefix[first])
+            else:
+                dots = -(embeddings[i:stop] @ prefix[first])
+            dots += row_dot[i:stop]
+
+            split_at = None
+            for j, dot in enumerate(dots.tolist(), start=i):
+                chunk_len = carry_count + j - first
+                similarity = dot / chunk_len
+                if self.similarities is not None:
+                    self.similarities.append(similarity)
+
+                if (
+                    similarity < self.similarity_threshold
+                    and chunk_len >= self.min_sentences_per_chunk
+                ):
+                    self._shift_count += 1
+                else:
+                    self._shift_count = 0
+
+                if (
+                    self._shift_count >= self.shift_patience
+                    or chunk_len >= max_len
+                    or (max_tokens is not None and self._chunk_tokens + tokens[j] > max_tokens)
+                ):
+                    split_at = j
+                    break
+                if max_tokens is not None:
+                    self._chunk_tokens += tokens[j]
+
+            if split_at is None:
+                i = stop
+                continue
+
+            # Close [start, split_at) and open the next chunk with the overlap;
+            # sentence split_at then joins it without a comparison
+            end = offset + split_at
+            closed.append((self._start, end))
+            keep = min(self.overlap_sentences, chunk_len)
+            if max_tokens is not None:
+                recent = (self._tail_tokens + tokens[:split_at])[-keep:] if keep else []
+                # Drop overlap sentences until the next sentence fits beside them
+                while keep and sum(recent[len(recent) - keep:]) + tokens[split_at] > max_tokens:
+                    keep -= 1
+                self._chunk_tokens = sum(
+                    recent[len(recent) - keep:]) + tokens[split_at]
+            if keep > split_at:
+                # Part of the overlap lies in earlier batches
+                from_tail = keep - split_at
+                self._carry = self._tail[len(self._tail) - from_tail:].sum(
+                    axis=0, dtype=np.float64)
+                self._carry_count = from_tail
+            self._start = end - keep
+            self._shift_count = 0
+            i = split_at + 1
+
+        # Fold the in-batch part of the open chunk into the carry
+        first = max(0, self._start - offset)
+        if self._start < offset:
+            self._carry = self._carry + (prefix[n] - prefix[first])
+            self._carry_count += n - first
+        else:
+            self._carry = prefix[n] - prefix[first]
+            self._carry_count = n - first
+
+        if self.overlap_sentences > 0:
+            recent = embeddings[-self.overlap_sentences:]
+            if self._tail is not None and len(recent) < self.overlap_sentences:
+                recent = np.concatenate([self._tail, recent])
+            self._tail = recent[-self.overlap_sentences:]
+            if max_tokens is not None:
+                self._tail_tokens = (
+                    self._tail_tokens + list(tokens))[-self.overlap_sentences:]
+        self._offset += n
+        return closed
+
+    def flush(self) -> tuple[int, int] | None:
+        """Close the open chunk, if any."""
+        if self._start is None or self._start == self._offset:
+            return None
+        chunk = (self._start, self._offset)
+        self._start = None
+        self._carry = None
+        self._carry_count = 0
+        self._shift_count = 0
+        self._chunk_tokens = 0
+        return chunk
+
+
+@dataclass
+class TextChunk:
+    """A chunk of text with its position in the source."""
+    content: str  # sentences joined with single spaces
+    char_start: int  # offset of the first sentence in the source text
+    char_end: int  # offset just past the last sentence in the source text
+
+
+_models: dict[str, SentenceTransformer] = {}
+
+
+def _get_model(model_name: str) -> SentenceTransformer:
+    """Lazy load a sentence embedding model, once per name."""
+    if model_name not in _models:
+        _models[model_name] = SentenceTransformer(model_name)
+    return _models[model_name]
+
+
+def read_txt_blocks(path: str, block_size: int = 1 << 20) -> Iterator[str]:
+    """Read a text file lazily in blocks of block_size characters."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for block in iter(lambda: f.read(block_size), ""):
+            yield block
+
+
+def iter_semantic_chunks(
+    blocks: Iterable[str],
+    model_name: str = "all-MiniLM-L6-v2",
+    similarity_threshold: float = 0.7,
+    min_sentences_per_chunk: int = 4,
+    max_sentences_per_chunk: int = 20,
+    overlap_sentences: int = 0,
+    shift_patience: int = 2,
+    window_sentences: int = 256,
+    segmenter: str = SENTENCE_SEGMENTER,
+    similarities: list | None = None,
+    max_tokens_per_chunk: int | None = None,
+) -> Iterator[TextChunk]:
+    """
+    Stream semantically coherent chunks out of text arriving in blocks.
+
+    Sentences are embedded window_sentences at a time and each chunk is
+    yielded as soon as it closes, so memory stays bounded by the window and
+    the longest sentence rather than the input size. Offsets are character
+    positions in the concatenation of all blocks.
+
+    No chunk exceeds the token budget of the embedding model that indexes
+    it, so nothing stored is silently truncated: chunks split before the
+    sentence that would overflow, and a single sentence longer than the
+    budget is cut into budget-sized pieces.
+
+    Args:
+        blocks: Pieces of the source text, in order (e.g. read_txt_blocks(path))
+        window_sentences: Sentences embedded per model call
+        segmenter: Sentence segmenter name ("punkt" or "regex")
+        similarities: Optional list collecting every centroid similarity
+        max_tokens_per_chunk: Token budget per chunk (default: the window of
+            EMBEDDING_MODEL, see get_token_budget)
+
+    Yields:
+        TextChunk objects in source order
+    """
+    model = _get_model(model_name)
+    sentence_spans = get_segmenter(segmenter).span_tokenize
+    if max_tokens_per_chunk is None:
+        max_tokens_per_chunk = get_token_budget()
+    boundaries = _ChunkBoundaries(
+        similarity_threshold=similarity_threshold,
+        min_sentences_per_chunk=min_sentences_per_chunk,
+        max_sentences_per_chunk=max_sentences_per_chunk,
+        overlap_sentences=overlap_sentences,
+        shift_patience=shift_patience,
+        similarities=similarities,
+        max_tokens_per_chunk=max_tokens_per_chunk,
+    )
+
+    # Sentences not yet part of a closed chunk: (text, char_start, char_end, tokens),
+    # where sentences[0] has global index first_sentence
+    sentences: list[tuple[str, int, int, int]] = []
+    first_sentence = 0
+    embedded = 0  # sentences already fed to the boundaries
+
+    def to_chunk(start: int, end: int) -> TextChunk:
+        members = sentences[start - first_sentence:end - first_sentence]
+        return TextChunk(
+            content=" ".join(text for text, *_ in members).strip(),
+            char_start=members[0][1],
+            char_end=members[-1][2],
+        )
+
+    def embed_pending(final: bool) -> Iterator[TextChunk]:
+        nonlocal first_sentence, embedded
+        while embedded - first_sentence < len(sentences):
+            pending = len(sentences) - (embedded - first_sentence)
+            if pending < window_sentences and not final:
+                return
+            window = sentences[embedded - first_sentence:][:window_sentences]
+            embeddings = model.encode(
+                [text for text, *_ in window],
+                normalize_embeddings=True,
+                batch_size=32,
+                show_progress_bar=False,
+            )
+            embedded += len(window)
+            token_counts = [tokens for *_, tokens in window]
+            for start, end in boundaries.feed(embeddings, token_counts):
+                yield to_chunk(start, end)
+            # Sentences before the open chunk are no longer needed
+            keep_from = boundaries.open_start - first_sentence
+            del sentences[:keep_from]
+            first_sentence += keep_from
+
+    def add_sentences(text: str, spans: list[tuple[int, int]], text_offset: int) -> None:
+        texts = [text[start:end] for start, end in spans]
+        for (start, end), sentence, tokens in zip(spans, texts, count_tokens(texts)):
+            if tokens <= max_tokens_per_chunk:
+                sentences.append(
+                    (sentence, text_offset + start, text_offset + end, tokens))
+                continue
+            # Too long to embed whole: cut at token boundaries
+            pieces = split_by_tokens(sentence, max_tokens_per_chunk)
+            piece_texts = [sentence[piece_start:piece_end]
+                           for piece_start, piece_end in pieces]
+            for (piece_start, piece_end), piece, piece_tokens in zip(
+                    pieces, piece_texts, count_tokens(piece_texts)):
+                sentences.append((
+                    piece,
+                    text_offset + start + piece_start,
+                    text_offset + start + piece_end,
+                    piece_tokens,
+                ))
+
+    buffer = ""
+    buffer_offset = 0  # global offset of buffer[0]
+    for block in blocks:
+        buffer += block
+        spans = sentence_spans(buffer)
+        # The last sentence may continue in the next block, unless it is huge
+        if spans and len(buffer) - spans[-1][0] < _MAX_PENDING_SENTENCE_CHARS:
+            spans = spans[:-1]
+        add_sentences(buffer, spans, buffer_offset)
+        if spans:
+            cut = spans[-1][1]
+            buffer = buffer[cut:]
+            buffer_offset += cut
+        yield from embed_pending(final=False)
+
+    add_sentences(buffer, sentence_spans(buffer), buffer_offset)
+    yield from embed_pending(final=True)
+
+    last = boundaries.flush()
+    if last:
+        yield to_chunk(*last)
+
+
 def semantic_chunk_text(
     text: str,
     model_name: str = "all-MiniLM-L6-v2",
@@ -28,83 +385,32 @@ def semantic_chunk_text(
     max_sentences_per_chunk: int = 20,
     overlap_sentences: int = 0,
     shift_patience: int = 2,
+    segmenter: str = SENTENCE_SEGMENTER,
+    max_tokens_per_chunk: int | None = None,
     debug_info: list = None,
 ) -> list[str]:
     """
     Returns a list of semantically coherent text chunks.
     Uses chunk-centroid similarity and persistent topic shift detection.
+    Chunks fit the embedding model's token budget (see iter_semantic_chunks).
     """
-
-    # 1. Sentence split
-    sentences = sent_tokenize(text)
-    if not sentences:
-        return []
-
-    # 2. Load local embedding model
-    model = SentenceTransformer(model_name)
-
-    # 3. Embed sentences
-    embeddings = model.encode(
-        sentences,
-        normalize_embeddings=True,
-        batch_size=32,
-        show_progress_bar=False,
-    )
-
-    chunks = []
-    current_chunk = [sentences[0]]
-    current_embeddings = [embeddings[0]]
-    previous_chunk_sentences = []
-
     similarities = []
-    shift_count = 0
-
-    for i in range(1, len(sentences)):
-        # Compute centroid of current chunk
-        centroid = np.mean(current_embeddings, axis=0)
-        similarity = float(np.dot(centroid, embeddings[i]))
-        similarities.append(similarity)
-
-        should_consider_split = (
-            similarity < similarity_threshold
-            and len(current_chunk) >= min_sentences_per_chunk
+    chunks = [
+        chunk.content
+        for chunk in iter_semantic_chunks(
+            [text],
+            model_name=model_name,
+            similarity_threshold=similarity_threshold,
+            min_sentences_per_chunk=min_sentences_per_chunk,
+            max_sentences_per_chunk=max_sentences_per_chunk,
+            overlap_sentences=overlap_sentences,
+            shift_patience=shift_patience,
+            segmenter=segmenter,
+            similarities=similarities,
+            max_tokens_per_chunk=max_tokens_per_chunk,
         )
-
-        if should_consider_split:
-            shift_count += 1
-        else:
-            shift_count = 0
-
-        # Final split decision
-        if (
-            shift_count >= shift_patience
-            or len(current_chunk) >= max_sentences_per_chunk
-        ):
-            chunks.append(" ".join(current_chunk))
-
-            # Overlap handling
-            previous_chunk_sentences = (
-                current_chunk[-overlap_sentences:]
-                if overlap_sentences > 0
-                else []
-            )
-            previous_chunk_embeddings = (
-                current_embeddings[-overlap_sentences:]
-                if overlap_sentences > 0
-                else []
-            )
-
-            current_chunk = previous_chunk_sentences.copy()
-            current_embeddings = previous_chunk_embeddings.copy()
-            shift_count = 0
-
-        current_chunk.append(sentences[i])
-        current_embeddings.append(embeddings[i])
-
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-
-    chunks = [chunk.strip() for chunk in chunks if chunk.strip()]
+    ]
+    chunks = [chunk for chunk in chunks if chunk]
 
     # Debug output
     if similarities and debug_info is not None:
@@ -137,9 +443,30 @@ def main():
                         help="Minimum sentences per chunk (default: 4)")
     parser.add_argument("--max-sentences", type=int, default=20,
                         help="Maximum sentences per chunk (default: 20)")
+    parser.add_argument("--max-tokens", type=int, default=None,
+                        help="Token budget per chunk (default: the embedding model's window)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read the file in blocks and print chunks with offsets as they close")
 
     args = parser.parse_args()
 
+    if args.stream:
+        chunks = iter_semantic_chunks(
+            read_txt_blocks(args.input_file),
+            similarity_threshold=args.threshold,
+            min_sentences_per_chunk=args.min_sentences,
+            max_sentences_per_chunk=args.max_sentences,
+            overlap_sentences=args.overlap,
+            max_tokens_per_chunk=args.max_tokens,
+        )
+        for i, chunk in enumerate(chunks, 1):
+            print(f"{'-'*80}")
+            print(f"Chunk {i} [{chunk.char_start}:{chunk.char_end}]")
+            print(f"{'-'*80}")
+            print(chunk.content)
+            print()
+        return
+
     text = read_txt_file(args.input_file)
 
     # Collect debug info
@@ -150,6 +477,7 @@ def main():
         min_sentences_per_chunk=args.min_sentences,
         max_sentences_per_chunk=args.max_sentences,
         overlap_sentences=args.overlap,
+        max_tokens_per_chunk=args.max_tokens,
         debug_info=debug_info
     )
 
@@ -0,0 +1,138 @@
+# This utility file splits text into sentences for the semantic chunker.
+# Segmenters return (start, end) character spans so chunks can point back into the source.
+#
+#   "punkt" - NLTK's Punkt model, loaded once from the vendored data directory
+#             (or NLTK's data path); "regex" is used instead when the data is missing
+#   "regex" - rule-based splitter, much faster, good enough for plain text and PDF text
+
+import re
+from pathlib import Path
+
+from nltk.data import path as nltk_data_path
+from nltk.tokenize.punkt import PunktTokenizer
+
+# Vendored NLTK data (tokenizers/punkt_tab/<language>/), populated by
+# `python -m lib.scripts.vendor_punkt_data` so air-gapped hosts never download
+VENDORED_NLTK_DATA_DIR = Path(__file__).resolve().parent / "nltk_data"
+
+SEGMENTERS = ("punkt", "regex")
+
+
+class SentenceSegmenter:
+    """Base class for sentence segmenters."""
+
+    name: str = ""
+
+    def span_tokenize(self, text: str) -> list[tuple[int, int]]:
+        """Split text into sentences, returned as (start, end) character offsets."""
+        raise NotImplementedError
+
+    def tokenize(self, text: str) -> list[str]:
+        """Split text into sentence strings."""
+        return [text[start:end] for start, end in self.span_tokenize(text)]
+
+
+class PunktSegmenter(SentenceSegmenter):
+    """NLTK Punkt sentence tokenizer using the vendored model data."""
+
+    name = "punkt"
+
+    def __init__(self, language: str = "english"):
+        if str(VENDORED_NLTK_DATA_DIR) not in nltk_data_path:
+            nltk_data_path.insert(0, str(VENDORED_NLTK_DATA_DIR))
+        try:
+            self._tokenizer = PunktTokenizer(language)
+        except LookupError as e:
+            raise LookupError(
+                f"Punkt data for '{language}' not found. Run "
+                "`python -m lib.scripts.vendor_punkt_data` on a machine with "
+                "network access to vendor it.") from e
+
+    def span_tokenize(self, text: str) -> list[tuple[int, int]]:
+        return list(self._tokenizer.span_tokenize(text))
+
+
+# Words that end with a period without ending the sentence (compared lowercased)
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e",
+    "cf", "al", "fig", "figs", "eq", "eqs", "no", "nos", "vol", "pp", "p", "ch",
+    "sec", "thm", "def", "approx", "dept", "inc", "ltd", "co", "corp", "jan",
+    "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+
+# Candidate boundary: terminal punctuation (plus closing quotes/brackets) followed
+# by whitespace and something that can start a sentence, or a blank line
+_BOUNDARY = re.compile(
+    r"""(?P<end>[.!?]+["'”’)\]]*)\s+(?=["'“‘(\[]?[A-Z0-9])"""
+    r"""|(?P<para>\n[ \t]*\n\s*)"""
+)
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+_LAST_WORD = re.compile(r"(\S+)$")
+
+
+class RegexSegmenter(SentenceSegmenter):
+    """Rule-based sentence splitter built on one compiled regular expression."""
+
+    name = "regex"
+
+    def _is_abbreviation(self, text: str, punct_start: int) -> bool:
+        """Whether the period at punct_start ends an abbreviation or initial."""
+        if text[punct_start] != ".":
+            return False
+        match = _LAST_WORD.search(text, max(0, punct_start - 32), punct_start)
+        if not match:
+            return False
+        word = match.group(1).lstrip("(\"'[").lower()
+        # Single letters are initials ("J. Smith", "A. B.")
+        return word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+    def span_tokenize(self, text: str) -> list[tuple[int, int]]:
+        spans = []
+        start = 0
+        for match in _BOUNDARY.finditer(text):
+            if match.group("end"):
+                if not self._is_abbreviation(text, match.start("end")):
+                    end = match.end("end")
+                else:
+                    # The whitespace after an abbreviation can still hold a paragraph break
+                    para = _PARAGRAPH_BREAK.search(text, match.end("end"), match.end())
+                    if para is None:
+                        continue
+                    end = para.start()
+            else:
+                end = match.start("para")
+            spans.append((start, end))
+            start = match.end()
+        spans.append((start, len(text)))
+
+        # Trim surrounding whitespace and drop empty spans
+        trimmed = []
+        for start, end in spans:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                trimmed.append((start, end))
+        return trimmed
+
+
+_segmenters: dict[str, SentenceSegmenter] = {}
+
+
+def get_segmenter(name: str = "punkt") -> SentenceSegmenter:
+    """Get a sentence segmenter by name, loading its model once."""
+    if name not in _segmenters:
+        if name == "punkt":
+            try:
+                _segmenters[name] = PunktSegmenter()
+            except LookupError as e:
+                # A host without the Punkt data still ingests, with the rule-based splitter
+                print(f"⚠️  {e} Falling back to the regex sentence segmenter.")
+                _segmenters[name] = get_segmenter("regex")
+        elif name == "regex":
+            _segmenters[name] = RegexSegmenter()
+        else:
+            raise ValueError(
+                f"Unknown sentence segmenter '{name}', expected one of {SEGMENTERS}")
+    return _segmenters[name]
@@ -0,0 +1,22 @@
+# This utility file normalizes extracted text before it is chunked and stored.
+# Shared by every extractor (PDF pages, text files, transcripts, captions) so the
+# database sees one consistent character set.
+#
+# str.translate with a prebuilt table runs in C, instead of a Python-level
+# per-character filter.
+
+# C0 control characters PostgreSQL cannot store or that are noise in text columns;
+# newline, tab and carriage return are kept
+_CONTROL_CHARS_TABLE = {
+    code: None for code in range(32) if chr(code) not in "\n\t\r"
+}
+
+
+def sanitize_text(text: str) -> str:
+    """
+    Remove problematic Unicode characters that cause database errors.
+
+    Removes null bytes (\\x00, \\u0000) and other control characters
+    that PostgreSQL cannot store in text columns.
+    """
+    return text.translate(_CONTROL_CHARS_TABLE)
@@ -0,0 +1,580 @@
+# This utility file is the vector search backend behind SupabaseClient.query_files.
+#
+#   "supabase" - search through the query_file_chunks* database functions (pgvector)
+#   "local"    - search an in-process index on disk, no network round trip
+#
+# The local index keeps L2-normalized embeddings in a memory-mapped matrix next to the
+# chunk rows search returns. Small indexes are scanned exactly; past
+# LOCAL_VECTOR_IVF_MIN_ROWS an IVF index (k-means lists, searching the nprobe nearest
+# lists) bounds the scan. Deleted rows are tombstoned and compacted away in bulk.
+#
+# Layout:
+#   vectors.f32   raw float32 rows, memory-mapped for reads
+#   rows.jsonl    one chunk row per line, in vector order
+#   deleted.json  row numbers of deleted chunks
+#   ivf.npz       IVF centroids and the list of every row as of the last training
+#   lock          held exclusively by writers, shared by searches
+#   generation    bumped whenever the files are rewritten rather than appended to
+#
+# Several processes (the API server, seed_database) can share the index. Each one
+# catches up under the lock before writing or searching: appended rows are read
+# incrementally, and a new generation triggers a full reload.
+
+import json
+import fcntl
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+
+from lib.constants import (
+    DEFAULT_MATCH_THRESHOLD,
+    EMBEDDING_DIMENSION,
+    LOCAL_VECTOR_IVF_MIN_ROWS,
+    LOCAL_VECTOR_IVF_NPROBE,
+    LOCAL_VECTOR_STORE_DIR,
+    VECTOR_SEARCH_MODE,
+    VECTOR_STORE,
+)
+from lib.util.embedding_storage import query_function_args
+
+VECTOR_STORES = ("supabase", "local")
+
+# Fields of a chunk row as returned by search (the columns of query_file_chunks)
+ROW_FIELDS = (
+    "chunk_id",
+    "file_id",
+    "chunk_index",
+    "content",
+    "chunk_metadata",
+    "file_name",
+    "file_path",
+    "mime_type",
+)
+
+
+class VectorStore:
+    """Nearest-neighbour search over chunk embeddings."""
+
+    def add(self, rows: list[dict], embeddings: list[list[float]]) -> None:
+        """
+        Index inserted chunks.
+
+        Args:
+            rows: One dict per chunk with the ROW_FIELDS
+            embeddings: Full-precision embedding of each chunk
+        """
+        raise NotImplementedError
+
+    def delete_files(self, file_ids: list[str]) -> None:
+        """Remove the chunks of deleted files from the index."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Remove every chunk from the index."""
+        raise NotImplementedError
+
+    def search(
+        self,
+        query_embedding: list[float],
+        match_threshold: float = DEFAULT_MATCH_THRESHOLD,
+        match_count: int = 10,
+        archived_folders: list[str] | None = None,
+        search_mode: str = VECTOR_SEARCH_MODE,
+    ) -> list[dict]:
+        """
+        Most similar chunks to a query.
+
+        Args:
+            query_embedding: Full-precision query embedding
+            match_threshold: Minimum cosine similarity
+            match_count: Maximum number of results
+            archived_folders: Folder paths whose files are excluded
+            search_mode: Access path, where the backend has several
+
+        Returns:
+            Chunk rows (ROW_FIELDS plus 'similarity'), most similar first
+        """
+        raise NotImplementedError
+
+
+class SupabaseVectorStore(VectorStore):
+    """pgvector search in the database; embeddings are written with the chunk rows."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def add(self, rows: list[dict], embeddings: list[list[float]]) -> None:
+        pass  # insert_chunks already wrote the embedding columns
+
+    def delete_files(self, file_ids: list[str]) -> None:
+        pass  # chunks are deleted with their file (ON DELETE CASCADE)
+
+    def clear(self) -> None:
+        pass
+
+    def search(
+        self,
+        query_embedding: list[float],
+        match_threshold: float = DEFAULT_MATCH_THRESHOLD,
+        match_count: int = 10,
+        archived_folders: list[str] | None = None,
+        search_mode: str = VECTOR_SEARCH_MODE,
+    ) -> list[dict]:
+        # Pick the search function (and project the query) for the storage profile
+        function_name, params = query_function_args(
+            query_embedding, search_mode=search_mode)
+
+        # The SQL function will filter out any files whose path starts with archived folders
+        result = self._client.rpc(
+            function_name,
+            {
+                **params,
+                "match_threshold": match_threshold,
+                "match_count": match_count,
+                "archived_folders": archived_folders or [],
+            }
+        ).execute()
+        return result.data or []
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def train_ivf(
+    vectors: np.ndarray,
+    n_lists: int,
+    iterations: int = 10,
+    max_samples: int = 50_000,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Spherical k-means centroids for an IVF index.
+
+    Args:
+        vectors: L2-normalized rows of shape (n, dimension)
+        n_lists: Number of inverted lists (centroids)
+
+    Returns:
+        L2-normalized centroids of shape (n_lists, dimension)
+    """
+    rng = np.random.default_rng(seed)
+    if len(vectors) > max_samples:
+        vectors = vectors[np.sort(rng.choice(len(vectors), max_samples, replace=False))]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)]
+
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = np.bincount(assignments, minlength=n_lists) == 0
+        # Lists that lost all their vectors restart from random vectors
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class LocalVectorStore(VectorStore):
+    """Memory-mapped embedding matrix with exact or IVF search and path filters."""
+
+    def __init__(
+        self,
+        directory: Path | str = LOCAL_VECTOR_STORE_DIR,
+        dimension: int = EMBEDDING_DIMENSION,
+        ivf_min_rows: int = LOCAL_VECTOR_IVF_MIN_ROWS,
+        nprobe: int = LOCAL_VECTOR_IVF_NPROBE,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+
+        self._vectors_path = self.directory / "vectors.f32"
+        self._rows_path = self.directory / "rows.jsonl"
+        self._deleted_path = self.directory / "deleted.json"
+        self._ivf_path = self.directory / "ivf.npz"
+        self._lock_path = self.directory / "lock"
+        self._generation_path = self.directory / "generation"
+        self._row_bytes = dimension * np.dtype(np.float32).itemsize
+
+        self._lock = threading.Lock()
+        self._mmap: np.memmap | None = None
+        self._rows: list[dict] = []
+        self._rows_offset = 0  # bytes of rows.jsonl read so far
+        self._generation = 0
+        self._deleted_stat: tuple[int, int] | None = None
+        self._alive = np.zeros(0, dtype=bool)
+        # Row -> index into _file_paths, for folder filters
+        self._row_files = np.zeros(0, dtype=np.int32)
+        self._file_paths: list[str] = []
+        self._file_index: dict[str, int] = {}
+        self._centroids: np.ndarray | None = None
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._trained_rows = 0
+        self._training = False  # a training run is in flight in this process
+        with self._file_lock(exclusive=True):
+            self._load(repair=True)
+
+    # -- persistence ----------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Lock shared with other processes using the index: exclusive to write, shared to read."""
+        with self._lock_path.open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_generation(self) -> int:
+        try:
+            return int(self._generation_path.read_text() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _bump_generation(self) -> None:
+        """Tell other processes the files were rewritten, not only appended to."""
+        self._generation = self._read_generation() + 1
+        self._generation_path.write_text(str(self._generation))
+
+    def _stat_deleted(self) -> tuple[int, int] | None:
+        try:
+            stat = self._deleted_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, repair: bool = False) -> None:
+        """
+        Read rows, tombstones and the IVF index from disk.
+
+        Args:
+            repair: Drop a half-written tail left by a crashed writer
+                (only while holding the exclusive lock)
+        """
+        self._vectors_path.touch(exist_ok=True)
+        self._rows_path.touch(exist_ok=True)
+        self._generation = self._read_generation()
+        self._mmap = None
+
+        # Only newline-terminated rows are complete
+        lines = self._rows_path.read_bytes().split(b"\n")[:-1]
+        vector_rows = self._vectors_path.stat().st_size // self._row_bytes
+        lines = lines[:vector_rows]
+        self._rows_offset = sum(len(line) + 1 for line in lines)
+        if repair:
+            self._truncate_tail(len(lines))
+
+        self._rows = []
+        self._row_files = np.zeros(0, dtype=np.int32)
+        self._file_paths = []
+        self._file_index = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._centroids = None
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._trained_rows = 0
+        if self._ivf_path.exists():
+            ivf = np.load(self._ivf_path)
+            # Lists are saved when the index is trained; later rows are assigned on load
+            if len(ivf["lists"]) <= len(lines):
+                self._centroids, self._lists = ivf["centroids"], ivf["lists"]
+                self._trained_rows = int(ivf["trained_rows"])
+        self._extend([json.loads(line) for line in lines])
+        self._load_deleted()
+
+    def _sync(self, repair: bool = False) -> None:
+        """
+        Pick up what other processes wrote since the last read (call holding the file lock).
+
+        Appended rows are read incrementally; rewritten files (compaction, clear,
+        retraining) are reloaded in full.
+        """
+        if self._read_generation() != self._generation:
+            self._load(repair)
+            return
+
+        if self._rows_path.stat().st_size > self._rows_offset:
+            with self._rows_path.open("rb") as f:
+                f.seek(self._rows_offset)
+                lines = f.read().split(b"\n")[:-1]
+            vector_rows = self._vectors_path.stat().st_size // self._row_bytes
+            lines = lines[:max(vector_rows - len(self._rows), 0)]
+            self._rows_offset += sum(len(line) + 1 for line in lines)
+            self._extend([json.loads(line) for line in lines])
+        if repair:
+            self._truncate_tail(len(self._rows))
+        if self._stat_deleted() != self._deleted_stat:
+            self._load_deleted()
+
+    def _truncate_tail(self, count: int) -> None:
+        # Vectors are appended before their rows, so truncating both to the
+        # complete rows leaves only complete entries
+        if self._vectors_path.stat().st_size > count * self._row_bytes:
+            with self._vectors_path.open("r+b") as f:
+                f.truncate(count * self._row_bytes)
+        if self._rows_path.stat().st_size > self._rows_offset:
+            with self._rows_path.open("r+b") as f:
+                f.truncate(self._rows_offset)
+
+    def _load_deleted(self) -> None:
+        self._deleted_stat = self._stat_deleted()
+        deleted = json.loads(self._deleted_path.read_text()) if self._deleted_stat else []
+        self._alive[:] = True
+        self._alive[[row for row in deleted if row < len(self._rows)]] = False
+
+    def _save_deleted(self) -> None:
+        self._deleted_path.write_text(json.dumps(np.flatnonzero(~self._alive).tolist()))
+        self._deleted_stat = self._stat_deleted()
+
+    def _save_ivf(self) -> None:
+        if self._centroids is None:
+            self._ivf_path.unlink(missing_ok=True)
+        else:
+            with self._ivf_path.open("wb") as f:
+                np.savez(f, centroids=self._centroids, lists=self._lists,
+                         trained_rows=self._trained_rows)
+
+    def _extend(self, rows: list[dict]) -> None:
+        """Index rows appended to the files, assigning them to IVF lists."""
+        if not rows:
+            return
+        file_indices = []
+        for row in rows:
+            path = row["file_path"]
+            if path not in self._file_index:
+                self._file_index[path] = len(self._file_paths)
+                self._file_paths.append(path)
+            file_indices.append(self._file_index[path])
+        self._rows.extend(rows)
+        self._row_files = np.concatenate(
+            [self._row_files, np.asarray(file_indices, dtype=np.int32)])
+        self._alive = np.concatenate([self._alive, np.ones(len(rows), dtype=bool)])
+        if self._centroids is not None and len(self._lists) < len(self._rows):
+            self._lists = np.concatenate(
+                [self._lists, self._assign_lists(self._vectors()[len(self._lists):])])
+
+    def _assign_lists(self, vectors: np.ndarray, centroids: np.ndarray | None = None) -> np.ndarray:
+        """Nearest IVF list of each vector."""
+        centroids = self._centroids if centroids is None else centroids
+        return np.concatenate([
+            np.argmax(np.asarray(vectors[start:start + 65536]) @ centroids.T, axis=1)
+            for start in range(0, len(vectors), 65536)
+        ] or [np.zeros(0)]).astype(np.int32)
+
+    def _vectors(self) -> np.ndarray:
+        """Memory map over all rows read so far (remapped after appends)."""
+        if not self._rows:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        if self._mmap is None or len(self._mmap) != len(self._rows):
+            self._mmap = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self._rows), self.dimension),
+            )
+        return self._mmap
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    # -- writes ---------------------------------------------------------------
+
+    def add(self, rows: list[dict], embeddings: list[list[float]]) -> None:
+        if len(rows) != len(embeddings):
+            raise ValueError(
+                f"Mismatch: {len(rows)} rows but {len(embeddings)} embeddings")
+        if not rows:
+            return
+        vectors = _normalize(embeddings)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected embeddings of dimension {self.dimension}, got {vectors.shape[1]}")
+        rows = [{field: row.get(field) for field in ROW_FIELDS} for row in rows]
+        data = "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+        with self._lock, self._file_lock(exclusive=True):
+            # Rows appended by other processes come first, so row numbers match the files
+            self._sync(repair=True)
+            with self._vectors_path.open("ab") as f:
+                f.write(vectors.tobytes())
+            with self._rows_path.open("ab") as f:
+                f.write(data)
+            self._rows_offset += len(data)
+            self._extend(rows)
+            snapshot = self._training_snapshot()
+        if snapshot is not None:
+            self._train(*snapshot)
+
+    def delete_files(self, file_ids: list[str]) -> None:
+        file_ids = set(file_ids)
+        if not file_ids:
+            return
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync(repair=True)
+            deleted = [i for i, row in enumerate(self._rows)
+                       if self._alive[i] and row["file_id"] in file_ids]
+            if not deleted:
+                return
+            self._alive[deleted] = False
+            if (~self._alive).sum() > len(self._rows) // 4:
+                self._compact()
+            else:
+                self._save_deleted()
+
+    def clear(self) -> None:
+        with self._lock, self._file_lock(exclusive=True):
+            self._mmap = None
+            for path in (self._vectors_path, self._rows_path, self._deleted_path, self._ivf_path):
+                path.unlink(missing_ok=True)
+            self._bump_generation()
+            self._load()
+
+    def _compact(self) -> None:
+        """Rewrite the index without deleted rows."""
+        keep = np.flatnonzero(self._alive)
+        vectors = np.array(self._vectors()[keep])
+        rows = [self._rows[i] for i in keep]
+        self._mmap = None
+
+        tmp_path = self._vectors_path.with_suffix(".tmp")
+        tmp_path.write_bytes(vectors.tobytes())
+        tmp_path.replace(self._vectors_path)
+        tmp_path = self._rows_path.with_suffix(".tmp")
+        tmp_path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+        tmp_path.replace(self._rows_path)
+        self._deleted_path.unlink(missing_ok=True)
+        if self._centroids is not None:
+            self._lists = self._lists[keep]
+            self._save_ivf()
+        self._bump_generation()
+        self._load()
+
+    def _training_snapshot(self) -> tuple[int, np.ndarray, np.ndarray] | None:
+        """
+        Decide whether the IVF index needs training, under both locks.
+
+        Training starts once the index is large enough, and again each time it
+        doubles. ivf.npz is only written when the centroids change; rows added
+        in between are assigned to lists when the index is loaded.
+
+        Returns:
+            (generation, vectors, alive) to train on outside the locks, or None
+        """
+        alive = len(self)
+        if alive < self.ivf_min_rows:
+            if self._centroids is not None:
+                self._centroids = None
+                self._lists = np.zeros(0, dtype=np.int32)
+                self._save_ivf()
+                self._bump_generation()
+            return None
+        if self._training or (self._centroids is not None and alive <= 2 * self._trained_rows):
+            return None
+        self._training = True
+        # The mapping keeps the current file contents even if a compaction replaces it
+        return self._generation, self._vectors(), self._alive.copy()
+
+    def _train(self, generation: int, vectors: np.ndarray, alive: np.ndarray) -> None:
+        """
+        Train centroids on a snapshot without holding the locks, so searches
+        and writes carry on meanwhile, then swap in the new index.
+
+        The result is dropped if the files were compacted, cleared or retrained
+        since the snapshot; the next add decides again.
+        """
+        try:
+            # About 4 * sqrt(n) lists, the usual IVF sizing
+            n_alive = int(alive.sum())
+            centroids = train_ivf(np.asarray(vectors[alive]), int(4 * np.sqrt(n_alive)))
+            lists = self._assign_lists(vectors, centroids)
+
+            with self._lock, self._file_lock(exclusive=True):
+                self._sync(repair=True)
+                if self._generation != generation:
+                    return
+                # Rows appended since the snapshot are few; assign them here
+                self._centroids = centroids
+                self._trained_rows = n_alive
+                self._lists = np.concatenate(
+                    [lists, self._assign_lists(self._vectors()[len(lists):])])
+                self._save_ivf()
+                self._bump_generation()
+        finally:
+            self._training = False
+
+    # -- search ---------------------------------------------------------------
+
+    def search(
+        self,
+        query_embedding: list[float],
+        match_threshold: float = DEFAULT_MATCH_THRESHOLD,
+        match_count: int = 10,
+        archived_folders: list[str] | None = None,
+        search_mode: str = VECTOR_SEARCH_MODE,
+    ) -> list[dict]:
+        query = _normalize(query_embedding)[0]
+        with self._lock, self._file_lock(exclusive=False):
+            self._sync()
+            if not self._rows:
+                return []
+            vectors = self._vectors()
+            mask = self._alive
+            if archived_folders:
+                archived = tuple(archived_folders)
+                excluded = [i for i, path in enumerate(self._file_paths)
+                            if path.startswith(archived)]
+                if excluded:
+                    mask = mask & ~np.isin(self._row_files, excluded)
+
+            if self._centroids is not None:
+                probes = np.argsort(self._centroids @ query)[-self.nprobe:]
+                candidates = np.flatnonzero(mask & np.isin(self._lists, probes))
+                scores = np.asarray(vectors[candidates]) @ query
+            else:
+                candidates = np.flatnonzero(mask)
+                scores = (np.asarray(vectors) @ query)[candidates]
+
+            keep = scores > match_threshold
+            candidates, scores = candidates[keep], scores[keep]
+            if len(candidates) > match_count:
+                top = np.argpartition(-scores, match_count)[:match_count]
+                candidates, scores = candidates[top], scores[top]
+            order = np.argsort(-scores)
+            return [
+                {**self._rows[candidates[i]], "similarity": float(scores[i])}
+                for i in order
+            ]
+
+
+_local_store: LocalVectorStore | None = None
+
+
+def get_local_vector_store() -> LocalVectorStore:
+    """Lazy open the local vector index."""
+    global _local_store
+    if _local_store is None:
+        _local_store = LocalVectorStore()
+    return _local_store
+
+
+def create_vector_store(client, backend: str = VECTOR_STORE) -> VectorStore:
+    """
+    Vector search backend for a database client.
+
+    Args:
+        client: Supabase client, used by the "supabase" backend
+        backend: "supabase" or "local" (see VECTOR_STORE)
+    """
+    if backend not in VECTOR_STORES:
+        raise ValueError(
+            f"Unknown vector store '{backend}', expected one of {VECTOR_STORES}")
+    if backend == "local":
+        return get_local_vector_store()
+    return SupabaseVectorStore(client)
@@ -0,0 +1,129 @@
+-- Compact embedding storage profiles (see EMBEDDING_STORAGE_PROFILE in backend/lib/constants.py).
+-- halfvec requires pgvector >= 0.7.0.
+--
+--   embedding_half: half-precision copy of embedding
+--   embedding_pca:  PCA-reduced copy (the projection is fitted on the corpus, so it
+--                   cannot be computed in SQL)
+--
+-- The columns stay empty until a profile is switched to with
+-- `python -m lib.scripts.migrate_embedding_storage --profile <profile>`, which fills the
+-- profile's column and builds its ANN index (see the embedding profile index migration).
+-- chunks.embedding stays the source of truth so profiles can be re-projected at any time.
+
+ALTER TABLE public.chunks ADD COLUMN IF NOT EXISTS embedding_half public.halfvec(768);
+ALTER TABLE public.chunks ADD COLUMN IF NOT EXISTS embedding_pca public.halfvec(256);
+
+
+-- Batch update used by the PCA migration script
+CREATE OR REPLACE FUNCTION update_chunk_pca_embeddings (
+  updates jsonb
+)
+RETURNS int
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE chunks c
+    SET embedding_pca = ((u ->> 'embedding')::public.halfvec(256))
+    FROM jsonb_array_elements(updates) AS u
+    WHERE c.id = (u ->> 'id')::uuid
+    RETURNING 1
+  )
+  SELECT count(*)::int FROM updated;
+$$;
+
+
+-- Same contract as query_file_chunks, searching embedding_half
+CREATE OR REPLACE FUNCTION query_file_chunks_half (
+  query_embedding halfvec(768),
+  match_threshold float DEFAULT 0.1,
+  match_count int DEFAULT 10,
+  archived_folders text[] DEFAULT array[]::text[]
+)
+RETURNS TABLE (
+  chunk_id uuid,
+  file_id uuid,
+  chunk_index int,
+  content text,
+  chunk_metadata jsonb,
+  file_name text,
+  file_path text,
+  mime_type text,
+  similarity float
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    c.id,
+    c.file_id,
+    c.chunk_index,
+    c.content,
+    c.chunk_metadata,
+    f.file_name,
+    f.file_path,
+    f.mime_type,
+    (1 - (c.embedding_half <=> query_embedding))::float
+  FROM chunks c
+  INNER JOIN files f ON c.file_id = f.id
+  WHERE c.embedding_half IS NOT NULL
+    AND (1 - (c.embedding_half <=> query_embedding)) > match_threshold
+    AND (
+      archived_folders = array[]::text[]
+      OR NOT EXISTS (
+        SELECT 1
+        FROM unnest(archived_folders) AS archived_path
+        WHERE f.file_path LIKE archived_path || '%'
+      )
+    )
+  ORDER BY c.embedding_half <=> query_embedding
+  LIMIT match_count;
+$$;
+
+
+-- Same contract as query_file_chunks, searching embedding_pca.
+-- query_embedding must already be projected with the same PCA fit.
+CREATE OR REPLACE FUNCTION query_file_chunks_pca (
+  query_embedding halfvec(256),
+  match_threshold float DEFAULT 0.1,
+  match_count int DEFAULT 10,
+  archived_folders text[] DEFAULT array[]::text[]
+)
+RETURNS TABLE (
+  chunk_id uuid,
+  file_id uuid,
+  chunk_index int,
+  content text,
+  chunk_metadata jsonb,
+  file_name text,
+  file_path text,
+  mime_type text,
+  similarity float
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    c.id,
+    c.file_id,
+    c.chunk_index,
+    c.content,
+    c.chunk_metadata,
+    f.file_name,
+    f.file_path,
+    f.mime_type,
+    (1 - (c.embedding_pca <=> query_embedding))::float
+  FROM chunks c
+  INNER JOIN files f ON c.file_id = f.id
+  WHERE c.embedding_pca IS NOT NULL
+    AND (1 - (c.embedding_pca <=> query_embedding)) > match_threshold
+    AND (
+      archived_folders = array[]::text[]
+      OR NOT EXISTS (
+        SELECT 1
+        FROM unnest(archived_folders) AS archived_path
+        WHERE f.file_path LIKE archived_path || '%'
+      )
+    )
+  ORDER BY c.embedding_pca <=> query_embedding
+  LIMIT match_count;
+$$;
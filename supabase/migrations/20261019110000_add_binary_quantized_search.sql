@@ -0,0 +1,75 @@
+-- Two-tier search: sign-bit binary codes prefilter, exact cosine rerank.
+-- Requires pgvector >= 0.7.0 (bit type, binary_quantize, hamming distance).
+--
+-- The codes are not stored; an expression index over binary_quantize(embedding)
+-- keeps them in sync with chunks.embedding automatically (96 bytes per chunk).
+
+CREATE INDEX IF NOT EXISTS chunks_embedding_binary_idx
+  ON public.chunks USING hnsw ((public.binary_quantize(embedding)::bit(768)) public.bit_hamming_ops);
+
+
+-- Same contract as query_file_chunks.
+-- ef_search bounds how many candidates the hnsw scan can return, so it must
+-- stay >= match_count * candidate_multiplier.
+CREATE OR REPLACE FUNCTION query_file_chunks_binary (
+  query_embedding vector(768),
+  match_threshold float DEFAULT 0.1,
+  match_count int DEFAULT 10,
+  archived_folders text[] DEFAULT array[]::text[],
+  candidate_multiplier int DEFAULT 4
+)
+RETURNS TABLE (
+  chunk_id uuid,
+  file_id uuid,
+  chunk_index int,
+  content text,
+  chunk_metadata jsonb,
+  file_name text,
+  file_path text,
+  mime_type text,
+  similarity float
+)
+LANGUAGE sql
+STABLE
+SET hnsw.ef_search = 400
+AS $$
+  WITH candidates AS (
+    SELECT
+      c.id,
+      c.file_id,
+      c.chunk_index,
+      c.content,
+      c.chunk_metadata,
+      c.embedding,
+      f.file_name,
+      f.file_path,
+      f.mime_type
+    FROM chunks c
+    INNER JOIN files f ON c.file_id = f.id
+    WHERE c.embedding IS NOT NULL
+      AND (
+        archived_folders = array[]::text[]
+        OR NOT EXISTS (
+          SELECT 1
+          FROM unnest(archived_folders) AS archived_path
+          WHERE f.file_path LIKE archived_path || '%'
+        )
+      )
+    ORDER BY public.binary_quantize(c.embedding)::bit(768) <~> public.binary_quantize(query_embedding)::bit(768)
+    LIMIT match_count * candidate_multiplier
+  )
+  SELECT
+    id,
+    file_id,
+    chunk_index,
+    content,
+    chunk_metadata,
+    file_name,
+    file_path,
+    mime_type,
+    (1 - (embedding <=> query_embedding))::float
+  FROM candidates
+  WHERE (1 - (embedding <=> query_embedding)) > match_threshold
+  ORDER BY embedding <=> query_embedding
+  LIMIT match_count;
+$$;
@@ -0,0 +1,28 @@
+-- Chunk content stored by reference (see CHUNK_CONTENT_STORAGE in backend/lib/constants.py).
+--
+-- file_contents holds the zlib-compressed source text of a file once; chunks stored by
+-- reference leave content NULL and are hydrated by the backend from the
+-- char_start/char_end offsets in chunk_metadata. Inline chunks are unchanged.
+
+CREATE TABLE IF NOT EXISTS public.file_contents (
+  file_id uuid PRIMARY KEY REFERENCES public.files(id) ON DELETE CASCADE,
+  encoding text NOT NULL DEFAULT 'zlib',
+  content bytea NOT NULL,
+  char_count integer NOT NULL,
+  created_at timestamp without time zone DEFAULT now()
+);
+
+ALTER TABLE public.file_contents ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "since local, give all perms"
+  ON public.file_contents
+  AS PERMISSIVE
+  FOR ALL
+  TO public
+  USING (true)
+  WITH CHECK (true);
+
+GRANT ALL ON TABLE public.file_contents TO anon, authenticated, service_role;
+
+-- Chunks stored by reference have no inline text
+ALTER TABLE public.chunks ALTER COLUMN content DROP NOT NULL;
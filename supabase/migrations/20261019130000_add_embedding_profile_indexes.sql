@@ -0,0 +1,80 @@
+-- Switching embedding storage profiles (run by lib.scripts.migrate_embedding_storage).
+--
+-- Only the active profile keeps an ivfflat index. A compact profile drops the
+-- full-precision index on chunks.embedding, which is what stops fitting in memory as
+-- the corpus grows; the column itself is kept as the source of truth for binary
+-- rerank and for re-projecting into another profile. Switching back to "full"
+-- rebuilds that index.
+--
+-- ivfflat lists are trained when the index is built, so indexes are built after the
+-- profile's column is filled, never on an empty column.
+
+
+-- Fill embedding_half for rows written while another profile was active, a batch at a
+-- time so each call stays within the statement timeout
+CREATE OR REPLACE FUNCTION backfill_chunk_half_embeddings (
+  batch_size int DEFAULT 5000
+)
+RETURNS int
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE public.chunks c
+    SET embedding_half = c.embedding::public.halfvec(768)
+    WHERE c.id IN (
+      SELECT id
+      FROM public.chunks
+      WHERE embedding IS NOT NULL AND embedding_half IS NULL
+      LIMIT batch_size
+    )
+    RETURNING 1
+  )
+  SELECT count(*)::int FROM updated;
+$$;
+
+
+-- (Re)build the ANN index of a profile on its current vectors and drop the others;
+-- lists follow pgvector's rows / 1000 guideline
+CREATE OR REPLACE FUNCTION rebuild_chunk_embedding_index (
+  profile text
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  target_column text;
+  target_index text;
+  opclass text;
+  n_lists int;
+BEGIN
+  CASE profile
+    WHEN 'full' THEN
+      target_column := 'embedding';
+      target_index := 'chunks_embedding_idx';
+      opclass := 'public.vector_cosine_ops';
+    WHEN 'halfvec' THEN
+      target_column := 'embedding_half';
+      target_index := 'chunks_embedding_half_idx';
+      opclass := 'public.halfvec_cosine_ops';
+    WHEN 'pca' THEN
+      target_column := 'embedding_pca';
+      target_index := 'chunks_embedding_pca_idx';
+      opclass := 'public.halfvec_cosine_ops';
+    ELSE
+      RAISE EXCEPTION 'Unknown embedding storage profile %', profile;
+  END CASE;
+
+  EXECUTE format(
+    'SELECT GREATEST(1, LEAST(count(*) / 1000, 1000))::int FROM public.chunks WHERE %I IS NOT NULL',
+    target_column)
+  INTO n_lists;
+
+  DROP INDEX IF EXISTS public.chunks_embedding_idx;
+  DROP INDEX IF EXISTS public.chunks_embedding_half_idx;
+  DROP INDEX IF EXISTS public.chunks_embedding_pca_idx;
+  EXECUTE format(
+    'CREATE INDEX %I ON public.chunks USING ivfflat (%I %s) WITH (lists = %s)',
+    target_index, target_column, opclass, n_lists);
+  RETURN n_lists;
+END;
+$$;
@@ -0,0 +1,80 @@
+-- query_file_chunks_binary pinned hnsw.ef_search to 400, which silently capped the
+-- prefilter at 400 candidates whenever match_count * candidate_multiplier was larger.
+-- ef_search is now set from the arguments on every call. The SET clause keeps the
+-- change local to the function: the setting is restored when it returns. The
+-- function is VOLATILE because it calls set_config.
+--
+-- pgvector caps ef_search at 1000; larger requests get 1000 candidates and a notice.
+
+CREATE OR REPLACE FUNCTION query_file_chunks_binary (
+  query_embedding vector(768),
+  match_threshold float DEFAULT 0.1,
+  match_count int DEFAULT 10,
+  archived_folders text[] DEFAULT array[]::text[],
+  candidate_multiplier int DEFAULT 4
+)
+RETURNS TABLE (
+  chunk_id uuid,
+  file_id uuid,
+  chunk_index int,
+  content text,
+  chunk_metadata jsonb,
+  file_name text,
+  file_path text,
+  mime_type text,
+  similarity float
+)
+LANGUAGE plpgsql
+VOLATILE
+SET hnsw.ef_search = 40
+AS $$
+DECLARE
+  n_candidates int := match_count * candidate_multiplier;
+BEGIN
+  IF n_candidates > 1000 THEN
+    RAISE NOTICE 'query_file_chunks_binary: % candidates requested, hnsw returns at most 1000', n_candidates;
+  END IF;
+  PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(n_candidates, 40), 1000)::text, true);
+
+  RETURN QUERY
+  WITH candidates AS (
+    SELECT
+      c.id,
+      c.file_id,
+      c.chunk_index,
+      c.content,
+      c.chunk_metadata,
+      c.embedding,
+      f.file_name,
+      f.file_path,
+      f.mime_type
+    FROM chunks c
+    INNER JOIN files f ON c.file_id = f.id
+    WHERE c.embedding IS NOT NULL
+      AND (
+        archived_folders = array[]::text[]
+        OR NOT EXISTS (
+          SELECT 1
+          FROM unnest(archived_folders) AS archived_path
+          WHERE f.file_path LIKE archived_path || '%'
+        )
+      )
+    ORDER BY public.binary_quantize(c.embedding)::bit(768) <~> public.binary_quantize(query_embedding)::bit(768)
+    LIMIT n_candidates
+  )
+  SELECT
+    cand.id,
+    cand.file_id,
+    cand.chunk_index,
+    cand.content,
+    cand.chunk_metadata,
+    cand.file_name,
+    cand.file_path,
+    cand.mime_type,
+    (1 - (cand.embedding <=> query_embedding))::float
+  FROM candidates cand
+  WHERE (1 - (cand.embedding <=> query_embedding)) > match_threshold
+  ORDER BY cand.embedding <=> query_embedding
+  LIMIT match_count;
+END;
+$$;